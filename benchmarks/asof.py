@@ -0,0 +1,93 @@
+"""Бенчмарк курса на момент: поиск по индексу при росте истории.
+
+Для каждого размера генерирует exchange_rates.json, строит индекс по
+времени и замеряет медиану запроса «курс пары на случайный момент» —
+она должна расти логарифмически, — а также один запрос полным
+просмотром истории для сравнения.
+
+Запуск из корня проекта:
+    python -m benchmarks.asof --points 1000,10000,100000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from valutatrade_hub.infra.jsonstream import iter_json_array, write_json_array
+from valutatrade_hub.infra.rate_index import RateHistoryIndex
+
+from .datagen import BASE_RATES, generate_history
+
+
+def scan_rate_at(path: str, pair: str, at: datetime) -> Optional[float]:
+    """Полный просмотр истории: последний курс пары не позже at."""
+    moment = at.strftime("%Y-%m-%dT%H:%M:%S")
+    best = None
+    with open(path, "r", encoding="utf-8") as f:
+        for record in iter_json_array(f):
+            if (
+                f"{record['from_currency']}_{record['to_currency']}" == pair
+                and record["timestamp"] <= moment
+                and (best is None or record["timestamp"] >= best[0])
+            ):
+                best = (record["timestamp"], record["rate"])
+    return best[1] if best else None
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", default="1000,10000,100000",
+                        help="размеры истории (отметок на пару) через запятую")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    end = datetime(2025, 1, 1)
+    step = timedelta(minutes=1)
+    pairs = [f"{code}_USD" for code in BASE_RATES]
+    for points in (int(value) for value in args.points.split(",")):
+        data_path = tempfile.mkdtemp(prefix="vt-asof-")
+        try:
+            history_path = os.path.join(data_path, "exchange_rates.json")
+            write_json_array(
+                history_path, generate_history(points, args.seed, end, step)
+            )
+            index = RateHistoryIndex(history_path)
+            start = time.perf_counter()
+            index.rebuild()
+            built = time.perf_counter() - start
+
+            rnd = random.Random(args.seed)
+            first = end - step * (points - 1)
+            span = int((end - first).total_seconds())
+            samples = []
+            for _ in range(args.lookups):
+                at = first + timedelta(seconds=rnd.randint(0, span))
+                pair = rnd.choice(pairs)
+                start = time.perf_counter()
+                found = index.rate_at(pair, at)
+                samples.append((time.perf_counter() - start) * 1_000_000)
+                assert found is not None
+            at = first + timedelta(seconds=span // 2)
+            start = time.perf_counter()
+            scanned = scan_rate_at(history_path, "BTC_USD", at)
+            scan_ms = (time.perf_counter() - start) * 1000
+            assert scanned == index.rate_at("BTC_USD", at)[0]
+            samples.sort()
+            print(f"{points * len(pairs)} записей: индекс {built:.2f} с, "
+                  f"запрос медиана {statistics.median(samples):.1f} мкс, "
+                  f"p99 {samples[int(len(samples) * 0.99)]:.1f} мкс; "
+                  f"просмотр истории {scan_ms:.0f} мс")
+        finally:
+            shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Бенчмарк бэктеста: год минутных курсов по всем парам.
+
+Записи истории генерируются потоком (как из exchange_rates.json, но без
+разбора JSON), замеряются построение сетки с forward fill и расчёт
+стоимости портфеля по сетке.
+
+Запуск из корня проекта:
+    python -m benchmarks.backtest --days 365
+"""
+import argparse
+import sys
+import time
+from datetime import timedelta
+from typing import List
+
+from valutatrade_hub.core.backtest import RateGrid, run_allocation, run_trades
+
+from .datagen import BASE_RATES, generate_history
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--step", type=int, default=60,
+                        help="шаг истории и сетки в секундах")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    points = args.days * 86400 // args.step
+    step = timedelta(seconds=args.step)
+    # генерация записей идёт внутри замера сетки — её время вычитается
+    start = time.perf_counter()
+    for _ in generate_history(points, args.seed, step=step):
+        pass
+    generated = time.perf_counter() - start
+    start = time.perf_counter()
+    grid = RateGrid.from_history(
+        generate_history(points, args.seed, step=step), step=args.step
+    )
+    built = time.perf_counter() - start - generated
+    print(f"Сетка: {len(grid)} узлов × {len(BASE_RATES)} пар "
+          f"({points * len(BASE_RATES)} записей) за {built:.1f} с "
+          f"(без генерации записей, {generated:.1f} с)")
+
+    holdings = {"BTC": 0.5, "ETH": 4.0, "SOL": 20.0, "EUR": 1000.0, "USD": 500.0}
+    start = time.perf_counter()
+    result = run_allocation(grid, holdings)
+    summary = result.summary()
+    print(f"Статичный портфель: {time.perf_counter() - start:.2f} с, "
+          f"доходность {summary['total_return_pct']:+.2f}%, "
+          f"просадка {summary['max_drawdown_pct']:.2f}%")
+
+    times = grid.times
+    trades = [
+        {
+            "timestamp": f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(t))}",
+            "currency": "BTC",
+            "side": "buy" if i % 2 == 0 else "sell",
+            "amount": 0.01,
+        }
+        for i, t in enumerate(times[::max(1, len(times) // 1000)])
+    ]
+    start = time.perf_counter()
+    result = run_trades(grid, trades, {"USD": 10000.0})
+    print(f"Повтор {result.trades_applied} сделок: "
+          f"{time.perf_counter() - start:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Генератор синтетических данных: пользователи, портфели и история курсов.
+
+Данные детерминированы зерном и пишутся в data_path в форматах проекта
+(users.json, portfolios.json, rates.json, exchange_rates.json).
+
+Запуск из корня проекта:
+    python -m benchmarks.datagen --data-path /tmp/vt-data --users 100000
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.models import Wallet
+from valutatrade_hub.infra.jsonstream import write_json_array
+
+CODES = ("USD", "EUR", "GBP", "RUB", "BTC", "ETH", "SOL")
+
+# Стартовые курсы к USD для случайного блуждания истории
+BASE_RATES: Dict[str, float] = {
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "RUB": 0.011,
+    "BTC": 60000.0,
+    "ETH": 3000.0,
+    "SOL": 150.0,
+}
+CRYPTO_CODES = ("BTC", "ETH", "SOL")
+
+PASSWORD = "password"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def username(user_id: int) -> str:
+    return f"user{user_id}"
+
+
+def generate_users(users: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Записи users.json; пароль у всех пользователей — PASSWORD."""
+    rnd = random.Random(seed)
+    reg_date = datetime(2025, 1, 1).strftime(TIMESTAMP_FORMAT)
+    for user_id in range(1, users + 1):
+        salt = f"{rnd.getrandbits(64):016x}"
+        yield {
+            "user_id": user_id,
+            "username": username(user_id),
+            "hashed_password": hashlib.sha256((PASSWORD + salt).encode()).hexdigest(),
+            "salt": salt,
+            "registration_date": reg_date,
+        }
+
+
+def generate_portfolios(users: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Записи portfolios.json (2–5 кошельков на пользователя).
+
+    Кошельки пишутся в текущем формате Wallet.to_dict: баланс в минимальных
+    единицах с точностью валюты из реестра.
+    """
+    rnd = random.Random(seed)
+    for user_id in range(1, users + 1):
+        codes = rnd.sample(CODES, rnd.randint(2, 5))
+        yield {
+            "user_id": user_id,
+            "wallets": {
+                code: Wallet.from_units(
+                    code, get_currency(code).to_units(rnd.random() * 1e4)
+                ).to_dict()
+                for code in codes
+            },
+        }
+
+
+def generate_history(
+        points: int,
+        seed: int = 42,
+        end: datetime = None,
+        step: timedelta = timedelta(hours=1),
+    ) -> Iterator[Dict[str, Any]]:
+    """Записи exchange_rates.json: points отметок по каждой паре к USD."""
+    rnd = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    rates = dict(BASE_RATES)
+    for i in range(points):
+        timestamp = (end - step * (points - 1 - i)).strftime(TIMESTAMP_FORMAT)
+        for code in rates:
+            volatility = 0.02 if code in CRYPTO_CODES else 0.002
+            rates[code] *= 1 + rnd.gauss(0, volatility)
+            source = "CoinGecko" if code in CRYPTO_CODES else "ExchangeRate-API"
+            yield {
+                "id": f"{code}_USD_{timestamp}",
+                "from_currency": code,
+                "to_currency": "USD",
+                "rate": round(rates[code], 8),
+                "timestamp": timestamp,
+                "source": source,
+                "meta": {"generated": True},
+            }
+
+
+def rates_snapshot(updated_at: datetime = None) -> Dict[str, Any]:
+    """Содержимое rates.json со свежими курсами (TTL не истёк)."""
+    updated_at = (updated_at or datetime.now()).strftime(TIMESTAMP_FORMAT)
+    return {
+        "pairs": {
+            f"{code}_USD": {
+                "rate": rate,
+                "updated_at": updated_at,
+                "source": "CoinGecko" if code in CRYPTO_CODES else "ExchangeRate-API",
+            }
+            for code, rate in BASE_RATES.items()
+        },
+        "last_refresh": updated_at,
+    }
+
+
+def generate(
+        data_path: str,
+        users: int,
+        history: int,
+        seed: int = 42,
+    ) -> Dict[str, int]:
+    """Заполняет data_path синтетическими данными; возвращает размеры наборов."""
+    os.makedirs(data_path, exist_ok=True)
+    counts = {
+        "users": write_json_array(
+            os.path.join(data_path, "users.json"), generate_users(users, seed)
+        ),
+        "portfolios": write_json_array(
+            os.path.join(data_path, "portfolios.json"),
+            generate_portfolios(users, seed),
+        ),
+        "history": write_json_array(
+            os.path.join(data_path, "exchange_rates.json"),
+            generate_history(history, seed),
+        ),
+    }
+    with open(os.path.join(data_path, "rates.json"), "w", encoding="utf-8") as f:
+        json.dump(rates_snapshot(), f, indent=4)
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-path", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=1000,
+                        help="отметок истории на каждую валютную пару")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    counts = generate(args.data_path, args.users, args.history, args.seed)
+    print(f"{args.data_path}: пользователей {counts['users']}, "
+          f"портфелей {counts['portfolios']}, записей истории {counts['history']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Бенчмарк индекса держателей: экспозиция по валюте против просмотра портфелей.
+
+Генерирует portfolios.json, строит индекс и сравнивает время запроса
+«кто держит валюту и сколько всего» по индексу и полным просмотром файла,
+а также время выдачи пользователей, затронутых обновлением одного курса.
+
+Запуск из корня проекта:
+    python -m benchmarks.exposure --users 100000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.models import Wallet
+from valutatrade_hub.infra.holders import HoldersIndex
+from valutatrade_hub.infra.jsonstream import write_json_array
+
+from .datagen import CRYPTO_CODES, generate_portfolios
+
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def scan_total(currency: str) -> int:
+    """Полный просмотр portfolios.json: сумма балансов валюты."""
+    total = 0
+    for record in usecases.get_db().iter_records("portfolios.json"):
+        w_data = record.get("wallets", {}).get(currency)
+        if w_data:
+            total += Wallet._from_stored(currency, w_data).units
+    return total
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    data_path = tempfile.mkdtemp(prefix="vt-exposure-")
+    try:
+        write_json_array(
+            os.path.join(data_path, "portfolios.json"),
+            generate_portfolios(args.users, args.seed),
+        )
+        usecases.get_db().set_data_path(data_path)
+        index = HoldersIndex()
+        start = time.perf_counter()
+        index.total_units("USD")
+        print(f"Построение индекса ({args.users} польз.): "
+              f"{time.perf_counter() - start:.2f} с")
+        for code in CRYPTO_CODES:
+            assert index.total_units(code) == scan_total(code)
+            holders = len(index.holders(code))
+            indexed = median_ms(lambda: index.holders(code), args.repeat)
+            scanned = median_ms(lambda: scan_total(code), 1)
+            print(f"{code}: держателей {holders}, индекс {indexed:.1f} мс, "
+                  f"просмотр портфелей {scanned:.0f} мс")
+        affected = median_ms(
+            lambda: usecases.users_affected_by_rates({"SOL_USD": {}}), args.repeat
+        )
+        print(f"Затронутые обновлением SOL_USD: {affected:.1f} мс")
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
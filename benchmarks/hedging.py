@@ -0,0 +1,86 @@
+"""Бенчмарк хеджированных запросов курсов на провайдерах-заменителях.
+
+Провайдеры отвечают за --latency, но с вероятностью --tail-probability
+задерживаются на --tail-latency. Сравниваются p50/p99 получения курсов:
+только основной провайдер, хеджирование запасным и медиана по кворуму.
+
+Запуск из корня проекта:
+    python -m benchmarks.hedging --requests 1000
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from valutatrade_hub.parser_service.hedging import HedgedFetcher, LatencyTracker
+
+from .standins import StandInClient
+
+
+def timed(fetch: Callable[[], Dict], requests: int) -> Dict[str, float]:
+    samples: List[float] = []
+    hedged = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        rates = fetch()
+        samples.append((time.perf_counter() - start) * 1000)
+        hedged += any(data["meta"].get("hedged") for data in rates.values())
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "max": samples[-1],
+        "hedged": hedged / requests,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--tail-latency", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.05)
+    parser.add_argument("--percentile", type=float, default=0.9,
+                        help="перцентиль задержки основного, после которого хеджируем")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    def provider(offset: int) -> StandInClient:
+        return StandInClient(
+            latency=args.latency,
+            seed=args.seed + offset,
+            tail_latency=args.tail_latency,
+            tail_probability=args.tail_probability,
+        )
+
+    primary = provider(0)
+    providers = [("Primary", primary), ("Secondary", provider(1)),
+                 ("Tertiary", provider(2))]
+    # прогрев окна задержек основного провайдера
+    LatencyTracker().reset()
+    warmup = HedgedFetcher(providers[:1])
+    for _ in range(40):
+        warmup.fetch()
+
+    scenarios = {
+        "только основной": primary.fetch_rates,
+        "хедж (2 провайдера)": HedgedFetcher(
+            providers[:2], percentile=args.percentile
+        ).fetch,
+        "кворум 2 из 3": HedgedFetcher(
+            providers, percentile=args.percentile, quorum=2
+        ).fetch,
+    }
+    print(f"Задержка {args.latency * 1000:.0f} мс, хвост "
+          f"{args.tail_latency * 1000:.0f} мс с вероятностью "
+          f"{args.tail_probability:.0%}, {args.requests} запросов")
+    for name, fetch in scenarios.items():
+        result = timed(fetch, args.requests)
+        print(f"{name:<22} p50 {result['p50']:7.1f} мс  p99 {result['p99']:7.1f} мс  "
+              f"max {result['max']:7.1f} мс  дублировано {result['hedged']:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Бенчмарк формата истории: размер и чтение до и после выноса метаданных.
+
+Генерирует exchange_rates.json прежнего формата, где в каждой записи
+повторяются метаданные получения (как их отдают CoinGecko и
+ExchangeRate-API), замеряет размер, полное чтение и построение индекса
+по времени, затем дописывает обновление — история переводится в формат
+с таблицей пакетов fetch_batches.json — и повторяет замеры; последним
+замеряется обычная перезапись истории в новом формате.
+
+Запуск из корня проекта:
+    python -m benchmarks.history_size --points 20000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from valutatrade_hub.infra.history_file import BATCHES_FILE, read_history
+from valutatrade_hub.infra.jsonstream import write_json_array
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.storage import Storage
+
+from .datagen import CRYPTO_CODES, TIMESTAMP_FORMAT, generate_history
+
+COIN_IDS = {"BTC": "bitcoin", "ETH": "ethereum", "SOL": "solana"}
+
+
+def with_provider_meta(
+        records: Iterator[Dict[str, Any]],
+        seed: int,
+    ) -> Iterator[Dict[str, Any]]:
+    """Записи generate_history с meta, как у настоящих провайдеров."""
+    rnd = random.Random(seed)
+    fetches: Dict[tuple, Dict[str, Any]] = {}
+    for record in records:
+        key = (record["timestamp"], record["source"])
+        fetch = fetches.get(key)
+        if fetch is None:
+            fetches.clear()
+            fetch = fetches[key] = {
+                "request_ms": rnd.uniform(50, 900),
+                "status_code": 200,
+            }
+            if record["source"] == "CoinGecko":
+                fetch["etag"] = f'W/"{rnd.getrandbits(64):016x}"'
+            else:
+                fetch["time_last_update_utc"] = datetime.fromisoformat(
+                    record["timestamp"]
+                ).strftime("%a, %d %b %Y 00:00:01 +0000")
+        code = record["from_currency"]
+        if code in CRYPTO_CODES:
+            own = {"raw_id": COIN_IDS[code]}
+        else:
+            own = {"raw_rate": 1 / record["rate"]}
+        yield {**record, "meta": {**own, **fetch}}
+
+
+def measure(storage: Storage) -> Dict[str, float]:
+    files = [storage.history_path, os.path.join(
+        os.path.dirname(storage.history_path), BATCHES_FILE
+    )]
+    size = sum(os.path.getsize(path) for path in files if os.path.exists(path))
+    start = time.perf_counter()
+    count = sum(1 for _ in read_history(storage.history_path))
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    storage.index.rebuild()
+    indexed = time.perf_counter() - start
+    return {"size": size, "records": count, "read": read, "index": indexed}
+
+
+def update(storage: Storage, timestamp: str) -> float:
+    """Одно обновление (6 курсов, два получения); время перезаписи истории."""
+    records = list(with_provider_meta(
+        generate_history(1, end=datetime.fromisoformat(timestamp)), seed=0
+    ))
+    start = time.perf_counter()
+    storage.append_history(records)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000,
+                        help="отметок истории (по 6 пар на отметку)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    end = datetime(2025, 1, 1)
+    data_path = tempfile.mkdtemp(prefix="vt-history-")
+    try:
+        config = ParserConfig(
+            EXCHANGERATE_API_KEY="stand-in",
+            RATES_FILE_PATH=os.path.join(data_path, "rates.json"),
+            HISTORY_FILE_PATH=os.path.join(data_path, "exchange_rates.json"),
+        )
+        write_json_array(config.HISTORY_FILE_PATH, with_provider_meta(
+            generate_history(args.points, args.seed, end, timedelta(minutes=1)),
+            args.seed,
+        ))
+        storage = Storage(config)
+        before = measure(storage)
+        migrated = update(
+            storage, (end + timedelta(minutes=1)).strftime(TIMESTAMP_FORMAT)
+        )
+        after = measure(storage)
+        rewrite = update(
+            storage, (end + timedelta(minutes=2)).strftime(TIMESTAMP_FORMAT)
+        )
+        assert after["records"] == before["records"] + 6, after["records"]
+
+        for name, result in (("прежний формат", before), ("с пакетами   ", after)):
+            print(f"{name}: {result['size'] / 2**20:.1f} МиБ, "
+                  f"{result['size'] / result['records']:.0f} Б/запись; "
+                  f"чтение {result['records']} записей {result['read']:.2f} с, "
+                  f"построение индекса {result['index']:.2f} с")
+        print(f"Размер: {after['size'] / before['size']:.0%} от прежнего; "
+              f"перевод при первой записи {migrated:.2f} с, "
+              f"следующая перезапись {rewrite:.2f} с")
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""Генератор конкурентной нагрузки: несколько клиентов торгуют одними данными.
+
+M процессов по N потоков выполняют смесь операций (buy/sell/show/rate) над
+общим data_path. Отчёт: пропускная способность, p50/p99 задержки по
+операциям, ожидание блокировки DatabaseManager и потерянные обновления —
+итоговые балансы сверяются с суммой успешно применённых сделок, а история
+сделок каждого пользователя из журнала — с числом его успешных сделок.
+Параллельно с клиентами каждый процесс дописывает --ledger-appends сделок
+прямо в журнал (без блокировок портфелей), чтобы дозапись из разных
+процессов действительно пересекалась.
+
+Запуск из корня проекта:
+    python -m benchmarks.loadgen --threads 8 --processes 2 --ops 200 \\
+        --mix buy=40,sell=20,show=30,rate=10
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.currencies import get_currency
+from valutatrade_hub.core.store import PortfolioStore
+from valutatrade_hub.infra.ledger import TradeLedger
+from valutatrade_hub.logging_config import flush_logging, setup_logging
+from valutatrade_hub.metrics import MetricsRegistry
+
+from .datagen import generate
+
+OPERATIONS = ("buy", "sell", "show", "rate")
+TRADE_CURRENCY = "BTC"
+TRADE_AMOUNT = 0.001
+LOCK_WAIT_METRIC = "valutatrade_db_lock_wait_seconds"
+
+
+def parse_mix(text: str) -> Dict[str, int]:
+    """Разбор смеси операций вида 'buy=40,sell=20,show=30,rate=10'."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Неизвестная операция '{name}'")
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError("Смесь операций пуста")
+    return mix
+
+
+def _client(
+        ops: int,
+        users: int,
+        mix: Dict[str, int],
+        seed: int,
+    ) -> Dict[str, Any]:
+    """Один клиент: ops операций над случайными пользователями."""
+    rnd = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    units = get_currency(TRADE_CURRENCY).to_units(TRADE_AMOUNT)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    outcomes: Dict[str, int] = defaultdict(int)
+    applied: Dict[int, int] = defaultdict(int)
+    trades: Dict[int, int] = defaultdict(int)
+    for _ in range(ops):
+        operation = rnd.choices(names, weights)[0]
+        user_id = rnd.randint(1, users)
+        start = time.perf_counter()
+        try:
+            if operation == "buy":
+                usecases.buy(user_id, TRADE_CURRENCY, TRADE_AMOUNT)
+                applied[user_id] += units
+                trades[user_id] += 1
+            elif operation == "sell":
+                usecases.sell(user_id, TRADE_CURRENCY, TRADE_AMOUNT)
+                applied[user_id] -= units
+                trades[user_id] += 1
+            elif operation == "show":
+                usecases.show_portfolio(user_id)
+            else:
+                usecases.get_rate(TRADE_CURRENCY, "EUR")
+            outcome = "ok"
+        except Exception as e:
+            outcome = type(e).__name__
+        latencies[operation].append(time.perf_counter() - start)
+        outcomes[f"{operation}:{outcome}"] += 1
+    return {
+        "latencies": latencies,
+        "outcomes": outcomes,
+        "applied": applied,
+        "trades": trades,
+    }
+
+
+def _appender(appends: int, users: int, seed: int) -> Dict[int, int]:
+    """Дозапись сделок прямо в журнал; число записей по пользователям."""
+    rnd = random.Random(seed)
+    trades: Dict[int, int] = defaultdict(int)
+    for _ in range(appends):
+        user_id = rnd.randint(1, users)
+        TradeLedger().append(user_id, TRADE_CURRENCY, "buy", TRADE_AMOUNT, None)
+        trades[user_id] += 1
+    return trades
+
+
+def run_process(
+        data_path: str,
+        threads: int,
+        ops: int,
+        users: int,
+        mix: Dict[str, int],
+        ledger_appends: int,
+        seed: int,
+    ) -> Dict[str, Any]:
+    """Запуск потоков-клиентов в текущем процессе; результат сериализуем."""
+    usecases.get_db().set_data_path(data_path)
+    setup_logging(
+        log_path=os.path.join(data_path, "logs"),
+        log_file=f"actions-{os.getpid()}.log",
+        console=False,
+    )
+    MetricsRegistry().reset()
+    results: List[Dict[str, Any]] = [None] * threads
+    appended: Dict[int, int] = {}
+
+    def target(index: int) -> None:
+        results[index] = _client(ops, users, mix, seed * 1000 + index)
+
+    def append_target() -> None:
+        appended.update(_appender(ledger_appends, users, seed * 1000 + threads))
+
+    workers = [
+        threading.Thread(target=target, args=(i,), name=f"client-{i}")
+        for i in range(threads)
+    ]
+    if ledger_appends:
+        workers.append(threading.Thread(target=append_target, name="appender"))
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    flush_logging()
+
+    merged = {
+        "elapsed": elapsed,
+        "latencies": defaultdict(list),
+        "outcomes": defaultdict(int),
+        "applied": defaultdict(int),
+        "trades": defaultdict(int),
+        "lock_wait": {},
+    }
+    for result in results:
+        for operation, samples in result["latencies"].items():
+            merged["latencies"][operation].extend(samples)
+        for key, count in result["outcomes"].items():
+            merged["outcomes"][key] += count
+        for user_id, delta in result["applied"].items():
+            merged["applied"][user_id] += delta
+        for user_id, count in result["trades"].items():
+            merged["trades"][user_id] += count
+    for user_id, count in appended.items():
+        merged["trades"][user_id] += count
+    for metric in MetricsRegistry().collect():
+        if metric.name == LOCK_WAIT_METRIC:
+            operation = dict(metric.labels)["operation"]
+            merged["lock_wait"][operation] = {
+                "count": metric.count,
+                "sum": metric.sum,
+                "p99": metric.quantile(0.99),
+            }
+    return {key: dict(value) if isinstance(value, defaultdict) else value
+            for key, value in merged.items()}
+
+
+def balances(data_path: str, users: int) -> Dict[int, int]:
+    """Баланс TRADE_CURRENCY каждого пользователя в минимальных единицах."""
+    with open(os.path.join(data_path, "portfolios.json"), "r", encoding="utf-8") as f:
+        store = PortfolioStore.from_records(json.load(f))
+    return {
+        user_id: store.get_units(user_id, TRADE_CURRENCY) or 0
+        for user_id in range(1, users + 1)
+    }
+
+
+def ledger_mismatches(
+        data_path: str,
+        users: int,
+        trades: Dict[int, int],
+    ) -> Dict[int, str]:
+    """Пользователи, чья история в журнале сделок не сходится с их сделками.
+
+    Смещение в индексе, записанное без межпроцессной блокировки, указывает
+    на чужую строку или в середину строки — такая история содержит чужие
+    сделки или не разбирается.
+    """
+    usecases.get_db().set_data_path(data_path)
+    mismatched = {}
+    for user_id in range(1, users + 1):
+        try:
+            history = TradeLedger().history(user_id)
+        except json.JSONDecodeError as e:
+            mismatched[user_id] = f"не разбирается: {e}"
+            continue
+        foreign = sum(1 for record in history if record["user_id"] != user_id)
+        if foreign or len(history) != trades.get(user_id, 0):
+            mismatched[user_id] = (
+                f"записей {len(history)} из {trades.get(user_id, 0)}, "
+                f"чужих {foreign}"
+            )
+    return mismatched
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def build_report(
+        parts: List[Dict[str, Any]],
+        initial: Dict[int, int],
+        final: Dict[int, int],
+        data_path: str,
+    ) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    outcomes: Dict[str, int] = defaultdict(int)
+    applied: Dict[int, int] = defaultdict(int)
+    trades: Dict[int, int] = defaultdict(int)
+    lock_wait: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {"count": 0, "sum": 0.0, "p99": 0.0}
+    )
+    for part in parts:
+        for operation, samples in part["latencies"].items():
+            latencies[operation].extend(samples)
+        for key, count in part["outcomes"].items():
+            outcomes[key] += count
+        for user_id, delta in part["applied"].items():
+            applied[int(user_id)] += delta
+        for user_id, count in part["trades"].items():
+            trades[int(user_id)] += count
+        for operation, stats in part["lock_wait"].items():
+            total = lock_wait[operation]
+            total["count"] += stats["count"]
+            total["sum"] += stats["sum"]
+            total["p99"] = max(total["p99"], stats["p99"] or 0.0)
+
+    elapsed = max(part["elapsed"] for part in parts)
+    total_ops = sum(len(samples) for samples in latencies.values())
+    unit = get_currency(TRADE_CURRENCY).to_units(TRADE_AMOUNT)
+    mismatched = {
+        user_id: initial[user_id] + applied.get(user_id, 0) - final[user_id]
+        for user_id in initial
+        if initial[user_id] + applied.get(user_id, 0) != final[user_id]
+    }
+    ledger = ledger_mismatches(data_path, len(initial), trades)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops": round(total_ops / elapsed, 1) if elapsed else 0.0,
+        "operations": {
+            operation: {
+                "count": len(samples),
+                "p50_ms": round(statistics.median(samples) * 1000, 3),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            }
+            for operation, samples in sorted(latencies.items())
+        },
+        "outcomes": dict(sorted(outcomes.items())),
+        "lock_wait": {
+            operation: {
+                "acquisitions": stats["count"],
+                "total_ms": round(stats["sum"] * 1000, 3),
+                "mean_ms": round(stats["sum"] / stats["count"] * 1000, 4)
+                if stats["count"] else 0.0,
+                "p99_le_ms": stats["p99"] * 1000,
+            }
+            for operation, stats in sorted(lock_wait.items())
+        },
+        "lost_updates": {
+            "users": len(mismatched),
+            "trades": round(sum(abs(d) for d in mismatched.values()) / unit),
+            "units_by_user": {str(k): v for k, v in sorted(mismatched.items())},
+        },
+        "ledger_mismatches": {str(k): v for k, v in sorted(ledger.items())},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Время: {report['elapsed_s']} с, "
+          f"пропускная способность: {report['throughput_ops']} оп/с")
+    print(f"{'операция':<8} {'кол-во':>8} {'p50, мс':>10} {'p99, мс':>10}")
+    for operation, stats in report["operations"].items():
+        print(f"{operation:<8} {stats['count']:>8} "
+              f"{stats['p50_ms']:>10.3f} {stats['p99_ms']:>10.3f}")
+    print("Результаты: " + ", ".join(
+        f"{key}={count}" for key, count in report["outcomes"].items()
+    ))
+    for operation, stats in report["lock_wait"].items():
+        print(f"Ожидание блокировки ({operation}): {stats['acquisitions']} захватов, "
+              f"всего {stats['total_ms']} мс, в среднем {stats['mean_ms']} мс, "
+              f"p99 ≤ {stats['p99_le_ms']} мс")
+    lost = report["lost_updates"]
+    if lost["users"]:
+        print(f"ПОТЕРЯННЫЕ ОБНОВЛЕНИЯ: {lost['trades']} сделок "
+              f"у {lost['users']} пользователей")
+    else:
+        print("Потерянных обновлений нет")
+    ledger = report["ledger_mismatches"]
+    if ledger:
+        print(f"ЖУРНАЛ СДЕЛОК РАСХОДИТСЯ у {len(ledger)} пользователей: "
+              + "; ".join(f"{user_id}: {text}" for user_id, text in ledger.items()))
+    else:
+        print("История сделок в журнале сходится")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4,
+                        help="потоков-клиентов в каждом процессе")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--ops", type=int, default=100,
+                        help="операций на клиента")
+    parser.add_argument("--users", type=int, default=20,
+                        help="пользователей, между которыми распределены сделки")
+    parser.add_argument("--mix", default="buy=40,sell=20,show=30,rate=10")
+    parser.add_argument("--ledger-appends", type=int, default=1000,
+                        help="сделок, дописываемых прямо в журнал каждым процессом")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-path",
+                        help="каталог данных (по умолчанию — временный)")
+    parser.add_argument("--output", help="записать отчёт в JSON")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    data_path = args.data_path or tempfile.mkdtemp(prefix="valutatrade-load-")
+    try:
+        generate(data_path, args.users, history=1, seed=args.seed)
+        initial = balances(data_path, args.users)
+        task = (
+            data_path, args.threads, args.ops, args.users, mix, args.ledger_appends
+        )
+        if args.processes <= 1:
+            parts = [run_process(*task, args.seed)]
+        else:
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                futures = [
+                    pool.submit(run_process, *task, args.seed + i)
+                    for i in range(args.processes)
+                ]
+                parts = [future.result() for future in futures]
+        report = build_report(
+            parts, initial, balances(data_path, args.users), data_path
+        )
+    finally:
+        if not args.data_path:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+    report["params"] = {**vars(args), "mix": mix}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 1 if report["lost_updates"]["users"] or report["ledger_mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Бенчмарк памяти: байт на пользователя у PortfolioStore и у объектной модели.
+
+Запуск из корня проекта:
+    python -m benchmarks.memory --users 1000000 --sample 20000
+"""
+import argparse
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import List
+
+from valutatrade_hub.core.models import Portfolio, User
+from valutatrade_hub.core.store import PortfolioStore
+
+from .datagen import generate_portfolios
+
+
+def measure_store(users: int, seed: int) -> int:
+    """Размер буферов хранилища (вся память на пользователя лежит в array)."""
+    store = PortfolioStore.from_records(generate_portfolios(users, seed))
+    assert len(store) == users
+    return (
+        sys.getsizeof(store._user_ids)
+        + sum(sys.getsizeof(column) for column in store._columns if column is not None)
+        + sys.getsizeof(store._columns)
+        + sys.getsizeof(store._row_index or {})
+    )
+
+
+def measure_objects(users: int, seed: int) -> int:
+    reg_date = datetime(2025, 1, 1)
+    tracemalloc.start()
+    portfolios: List[Portfolio] = []
+    for data in generate_portfolios(users, seed):
+        user = User(data["user_id"], f"user{data['user_id']}", "", "", reg_date)
+        portfolios.append(Portfolio.from_dict(data, user))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(portfolios) == users
+    return current
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=20_000,
+                        help="пользователей для замера объектной модели")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    store_bytes = measure_store(args.users, args.seed)
+    object_bytes = measure_objects(args.sample, args.seed)
+    print(f"PortfolioStore, {args.users} польз.: {store_bytes / 2**20:.1f} МиБ, "
+          f"{store_bytes / args.users:.1f} байт/польз.")
+    print(f"Portfolio/Wallet, {args.sample} польз.: "
+          f"{object_bytes / args.sample:.1f} байт/польз. "
+          f"(≈{object_bytes / args.sample * args.users / 2**20:.0f} МиБ "
+          f"на {args.users})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Бенчмарк книги ордеров: проверка срабатываний при 1M отложенных ордеров.
+
+Сравнивает выборку пересечённых порогов (bisect, O(log n + k)) с полным
+просмотром всех ордеров на каждое обновление курса.
+
+Запуск из корня проекта:
+    python -m benchmarks.orders --orders 1000000 --updates 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+from valutatrade_hub.core.orders import (
+    BELOW,
+    ORDER_KINDS,
+    ORDER_SIDES,
+    Order,
+    OrderBook,
+    trigger_direction,
+)
+
+from .datagen import BASE_RATES
+
+CODES = ("BTC", "ETH", "SOL")
+
+
+def generate_orders(count: int, seed: int = 42) -> List[Order]:
+    """Отложенные (ещё не сработавшие) ордера в пределах 20% от курса."""
+    rnd = random.Random(seed)
+    orders = []
+    for order_id in range(1, count + 1):
+        code = rnd.choice(CODES)
+        side, kind = rnd.choice(ORDER_SIDES), rnd.choice(ORDER_KINDS)
+        if trigger_direction(side, kind) == BELOW:
+            factor = rnd.uniform(0.8, 0.999)
+        else:
+            factor = rnd.uniform(1.001, 1.2)
+        orders.append(Order(
+            order_id,
+            rnd.randint(1, 100_000),
+            code,
+            side,
+            kind,
+            round(BASE_RATES[code] * factor, 2),
+            round(rnd.uniform(0.001, 1.0), 4),
+            created_at="2025-01-01T00:00:00",
+        ))
+    return orders
+
+
+def naive_crossed(orders: List[Order], code: str, rate: float) -> int:
+    """Полный просмотр: сколько ордеров сработало бы при курсе rate."""
+    count = 0
+    for order in orders:
+        if order.currency != code or not order.is_open:
+            continue
+        if order.direction == BELOW and rate <= order.price:
+            count += 1
+        elif order.direction != BELOW and rate >= order.price:
+            count += 1
+    return count
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=200,
+                        help="обновлений курса (шагов случайного блуждания)")
+    parser.add_argument("--naive-updates", type=int, default=3,
+                        help="обновлений для замера полного просмотра")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    orders = generate_orders(args.orders, args.seed)
+    start = time.perf_counter()
+    book = OrderBook()
+    book.extend(orders)
+    print(f"Загрузка {len(book)} ордеров: {time.perf_counter() - start:.2f} с")
+
+    rnd = random.Random(args.seed)
+    rates = dict(BASE_RATES)
+    samples, triggered = [], 0
+    for _ in range(args.updates):
+        code = rnd.choice(CODES)
+        rates[code] *= 1 + rnd.gauss(0, 0.002)
+        start = time.perf_counter()
+        triggered += len(book.crossed(code, rates[code]))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"Проверка срабатываний ({args.updates} обновлений): "
+          f"медиана {statistics.median(samples):.3f} мс, "
+          f"p99 {samples[int(len(samples) * 0.99)]:.3f} мс, "
+          f"сработало {triggered}, осталось {len(book)}")
+
+    naive = []
+    for _ in range(args.naive_updates):
+        code = rnd.choice(CODES)
+        start = time.perf_counter()
+        naive_crossed(orders, code, rates[code])
+        naive.append((time.perf_counter() - start) * 1000)
+    print(f"Полный просмотр: медиана {statistics.median(naive):.1f} мс на обновление")
+
+    order = Order(args.orders + 1, 1, "BTC", "buy", "limit", rates["BTC"] * 0.9, 1.0)
+    start = time.perf_counter()
+    book.add(order)
+    added = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    book.remove(order.order_id)
+    removed = (time.perf_counter() - start) * 1000
+    print(f"Размещение: {added:.3f} мс, отмена: {removed:.3f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Бенчмарк массовой регистрации: import-users против register по одному.
+
+Поверх базы из --existing пользователей импортирует CSV из --users строк
+(с долей дубликатов и коротких паролей) одним import_users, затем
+замеряет --register-sample вызовов register и экстраполирует их на весь
+CSV: register перечитывает и переписывает оба файла на каждого
+пользователя. Перед замерами импорт проверяется на пустом каталоге
+данных, как в поставке (users.json и portfolios.json по 0 байт).
+
+Запуск из корня проекта:
+    python -m benchmarks.provision --users 100000 --existing 100000
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+from valutatrade_hub.core import usecases
+from valutatrade_hub.infra.jsonstream import write_json_array
+
+from .datagen import generate_portfolios, generate_users
+
+
+def write_csv(path: str, users: int, existing: int) -> int:
+    """CSV для импорта; каждая сотая строка — занятое имя или короткий пароль."""
+    rejected = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "password"])
+        for i in range(users):
+            if i % 100 == 0 and existing:
+                writer.writerow([f"user{i % existing + 1}", "password"])
+                rejected += 1
+            elif i % 100 == 50:
+                writer.writerow([f"migrated{i}", "123"])
+                rejected += 1
+            else:
+                writer.writerow([f"migrated{i}", f"secret{i}"])
+    return rejected
+
+
+def check_empty_data(data_path: str) -> None:
+    """import-users и вход на каталоге data/ из поставки (пустые файлы)."""
+    os.makedirs(data_path)
+    for filename in ("users.json", "portfolios.json"):
+        open(os.path.join(data_path, filename), "w").close()
+    usecases.get_db().set_data_path(data_path)
+    csv_path = os.path.join(data_path, "import.csv")
+    write_csv(csv_path, 3, existing=0)
+    result = usecases.import_users(csv_path, workers=1)
+    assert result == {"imported": 3, "first_id": 1, "errors": []}, result
+    assert usecases.login("migrated2", "secret2") == 3
+    print("import-users в пустой каталог данных: OK")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--existing", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="процессов хеширования (по умолчанию — по CPU)")
+    parser.add_argument("--register-sample", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    data_path = tempfile.mkdtemp(prefix="vt-provision-")
+    try:
+        check_empty_data(os.path.join(data_path, "shipped"))
+        write_json_array(
+            os.path.join(data_path, "users.json"),
+            generate_users(args.existing, args.seed),
+        )
+        write_json_array(
+            os.path.join(data_path, "portfolios.json"),
+            generate_portfolios(args.existing, args.seed),
+        )
+        usecases.get_db().set_data_path(data_path)
+        csv_path = os.path.join(data_path, "import.csv")
+        rejected = write_csv(csv_path, args.users, args.existing)
+
+        start = time.perf_counter()
+        result = usecases.import_users(csv_path, args.workers)
+        imported = time.perf_counter() - start
+        assert len(result["errors"]) == rejected, len(result["errors"])
+        assert result["imported"] == args.users - rejected
+        print(f"import-users: {result['imported']} польз., "
+              f"отклонено {len(result['errors'])}, {imported:.2f} с "
+              f"(процессов: {args.workers or os.cpu_count()})")
+
+        start = time.perf_counter()
+        for i in range(args.register_sample):
+            usecases.register(f"single{i}", "password")
+        per_user = (time.perf_counter() - start) / args.register_sample
+        print(f"register по одному: {per_user * 1000:.0f} мс на пользователя "
+              f"при {args.existing + result['imported']} в базе, "
+              f"≈ {per_user * result['imported'] / 60:.0f} мин на весь CSV "
+              f"(не меньше: файлы растут с каждой регистрацией)")
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Бенчмарк публикации курсов: задержка run_update при растущей истории.
+
+Сравнивает прежний порядок (перезапись exchange_rates.json, затем
+rates.json) с фоновой записью истории: курсы публикуются сразу, история
+дописывается пакетами. Для фоновой записи также замеряется время
+дописывания очереди и число перезаписей файла истории.
+
+Запуск из корня проекта:
+    python -m benchmarks.publish --history 10000,100000,300000 --updates 10
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from valutatrade_hub.infra.jsonstream import write_json_array
+from valutatrade_hub.metrics import MetricsRegistry
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.history_writer import HistoryWriter
+from valutatrade_hub.parser_service.storage import Storage
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+from .datagen import BASE_RATES, generate_history
+from .standins import StandInClient
+
+
+class SyncWriter:
+    """Прежнее поведение: история переписывается до публикации курсов."""
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    def submit(self, records: List[Dict[str, Any]]) -> None:
+        self.storage.append_history(records)
+
+
+def run(
+        data_path: str,
+        records: int,
+        updates: int,
+        background: bool,
+        seed: int,
+    ) -> Dict[str, float]:
+    config = ParserConfig(
+        EXCHANGERATE_API_KEY="stand-in",
+        RATES_FILE_PATH=os.path.join(data_path, "rates.json"),
+        HISTORY_FILE_PATH=os.path.join(data_path, "exchange_rates.json"),
+    )
+    # история заканчивается до первого обновления: его записи не заменяют её
+    write_json_array(
+        config.HISTORY_FILE_PATH,
+        generate_history(
+            records // len(BASE_RATES), seed, datetime.now() - timedelta(hours=1)
+        ),
+    )
+    storage = Storage(config)
+    # индекс по времени строится заранее, чтобы не попасть в замер
+    storage.index.rebuild()
+    writer = HistoryWriter(
+        storage,
+        max_pending=config.HISTORY_QUEUE_SIZE,
+        batch_size=config.HISTORY_BATCH_SIZE,
+        linger=config.HISTORY_LINGER,
+    ) if background else SyncWriter(storage)
+    MetricsRegistry().reset()
+    samples = []
+    for i in range(updates):
+        updater = RatesUpdater(config)
+        updater.clients = {"StandIn": StandInClient(seed=seed + i)}
+        updater.history_writer = writer
+        start = time.perf_counter()
+        updater.run_update()
+        samples.append((time.perf_counter() - start) * 1000)
+        # метки времени записей — секунды: следующее обновление в новой секунде
+        time.sleep(max(0.0, 1.0 - (time.perf_counter() - start)))
+    start = time.perf_counter()
+    if background:
+        writer.close()
+    drained = (time.perf_counter() - start) * 1000
+    written = sum(1 for _ in storage.iter_history())
+    assert written == records // len(BASE_RATES) * len(BASE_RATES) + updates * len(
+        BASE_RATES
+    ), written
+    rewrites = sum(
+        metric.count for metric in MetricsRegistry().collect()
+        if metric.name == "valutatrade_history_write_duration_seconds"
+    )
+    samples.sort()
+    return {
+        "median": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        "drained": drained,
+        "rewrites": rewrites if background else updates,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", default="10000,100000,300000",
+                        help="размеры истории (записей) через запятую")
+    parser.add_argument("--updates", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    for records in (int(value) for value in args.history.split(",")):
+        for background in (False, True):
+            data_path = tempfile.mkdtemp(prefix="vt-publish-")
+            try:
+                result = run(data_path, records, args.updates, background, args.seed)
+            finally:
+                shutil.rmtree(data_path, ignore_errors=True)
+            mode = "фоновая запись" if background else "синхронно    "
+            print(f"{records:>8} записей, {mode}: run_update медиана "
+                  f"{result['median']:.1f} мс, p99 {result['p99']:.1f} мс; "
+                  f"перезаписей истории {result['rewrites']}, "
+                  f"дописывание очереди {result['drained']:.0f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Локальные заменители провайдеров курсов для бенчмарков (без сети)."""
+import random
+import time
+from typing import Any, Dict, FrozenSet, Iterable
+
+from valutatrade_hub.parser_service.api_clients import BaseApiClient
+
+from .datagen import BASE_RATES
+
+
+class StandInClient(BaseApiClient):
+    """Возвращает курсы из BASE_RATES с шумом и заданной задержкой ответа.
+
+    С вероятностью tail_probability ответ задерживается на tail_latency
+    вместо latency — модель медленного хвоста провайдера.
+    """
+
+    def __init__(
+            self,
+            codes: Iterable[str] = tuple(BASE_RATES),
+            latency: float = 0.0,
+            seed: int = 42,
+            tail_latency: float = 0.0,
+            tail_probability: float = 0.0,
+        ):
+        self.codes = tuple(codes)
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self._rnd = random.Random(seed)
+
+    def pairs(self) -> FrozenSet[str]:
+        return frozenset(f"{code}_USD" for code in self.codes)
+
+    def fetch_rates(self) -> Dict[str, Dict[str, Any]]:
+        latency = self.latency
+        if self.tail_probability and self._rnd.random() < self.tail_probability:
+            latency = self.tail_latency
+        if latency:
+            time.sleep(latency)
+        return {
+            f"{code}_USD": {
+                "rate": BASE_RATES[code] * (1 + self._rnd.gauss(0, 0.001)),
+                "meta": {"stand_in": True},
+            }
+            for code in self.codes
+        }
@@ -0,0 +1,114 @@
+"""Бенчмарк запуска CLI: время импорта (python -X importtime) и время до приглашения.
+
+Запуск из корня проекта:
+    python -m benchmarks.startup --runs 5 --budget-ms 300
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CLI_MODULE = "valutatrade_hub.cli.interface"
+
+# Модули, которые не должны загружаться до первой команды
+DEFERRED_MODULES = (
+    "requests",
+    "prettytable",
+    "valutatrade_hub.parser_service.api_clients",
+    "valutatrade_hub.parser_service.updater",
+    "valutatrade_hub.core.backtest",
+    "valutatrade_hub.core.store",
+    "valutatrade_hub.infra.holders",
+    "valutatrade_hub.infra.ledger",
+    "valutatrade_hub.infra.orders",
+    "valutatrade_hub.infra.rate_index",
+    "valutatrade_hub.infra.valuation",
+    "csv",
+)
+
+
+def import_time(module: str = CLI_MODULE) -> Tuple[float, Dict[str, int]]:
+    """Возвращает суммарное время импорта (мс) и self-время по модулям (мкс)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: Dict[str, int] = {}
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+        if name.strip() == module:
+            cumulative_us = int(cum_us)
+    return cumulative_us / 1000, modules
+
+
+def time_to_prompt() -> float:
+    """Время (мс) от запуска main.py до появления приглашения '> '."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    buffer = b""
+    while b"> " not in buffer:
+        chunk = proc.stdout.read1(4096)
+        if not chunk:
+            break
+        buffer += chunk
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.communicate(b"exit\n")
+    return elapsed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0,
+                        help="бюджет на время до приглашения (медиана)")
+    parser.add_argument("--import-budget-ms", type=float, default=150.0,
+                        help="бюджет на импорт CLI-модуля (медиана)")
+    args = parser.parse_args(argv)
+
+    import_samples = []
+    loaded = set()
+    for _ in range(args.runs):
+        ms, modules = import_time()
+        import_samples.append(ms)
+        loaded.update(modules)
+    prompt_samples = [time_to_prompt() for _ in range(args.runs)]
+
+    import_ms = statistics.median(import_samples)
+    prompt_ms = statistics.median(prompt_samples)
+    print(f"Импорт {CLI_MODULE}: {import_ms:.1f} мс (бюджет {args.import_budget_ms})")
+    print(f"Время до приглашения: {prompt_ms:.1f} мс (бюджет {args.budget_ms})")
+
+    failures = []
+    eager = [m for m in DEFERRED_MODULES if m in loaded]
+    if eager:
+        failures.append(f"загружаются при старте: {', '.join(eager)}")
+    if import_ms > args.import_budget_ms:
+        failures.append("превышен бюджет импорта")
+    if prompt_ms > args.budget_ms:
+        failures.append("превышен бюджет времени до приглашения")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Бенчмарк потокового чтения: пиковый RSS на многогигабайтной истории курсов.
+
+Генерирует exchange_rates.json заданного размера и в отдельных процессах
+замеряет пиковый RSS и время: поиск последней записи (find_by_id),
+выгрузку истории (export_rates_history) и, по флагу --json-load,
+полное чтение json.load для сравнения.
+
+Запуск из корня проекта:
+    python -m benchmarks.streaming --size-mb 2048
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from valutatrade_hub.infra.jsonstream import write_json_array
+
+from .datagen import BASE_RATES, generate_history
+
+HISTORY_FILE = "exchange_rates.json"
+MODES = ("baseline", "find_by_id", "export", "json_load")
+
+
+def generate_file(data_path: str, size_mb: int, seed: int) -> Dict[str, object]:
+    """exchange_rates.json примерно size_mb МиБ; возвращает число записей и id."""
+    sample = list(itertools.islice(generate_history(1, seed), len(BASE_RATES)))
+    record_size = sum(len(json.dumps(r, indent=4)) + 10 for r in sample) / len(sample)
+    count = int(size_mb * 2**20 / record_size)
+    points = count // len(BASE_RATES) + 1
+    last = {}
+
+    def records():
+        for record in itertools.islice(generate_history(points, seed), count):
+            last["id"] = record["id"]
+            yield record
+
+    path = os.path.join(data_path, HISTORY_FILE)
+    written = write_json_array(path, records())
+    return {"records": written, "last_id": last["id"], "bytes": os.path.getsize(path)}
+
+
+def run_mode(mode: str, data_path: str, target: str) -> Dict[str, float]:
+    """Выполняется в дочернем процессе: замер одного способа чтения."""
+    from valutatrade_hub.core import usecases
+
+    usecases.get_db().set_data_path(data_path)
+    start = time.perf_counter()
+    if mode == "find_by_id":
+        found = usecases.get_db().find_by_id(HISTORY_FILE, "id", target)
+        assert found is not None
+    elif mode == "export":
+        usecases.export_rates_history(os.devnull)
+    elif mode == "json_load":
+        with open(os.path.join(data_path, HISTORY_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        assert data[-1]["id"] == target
+    elapsed = time.perf_counter() - start
+    # ru_maxrss в Linux — КиБ
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {"seconds": elapsed, "peak_rss": peak}
+
+
+def measure(mode: str, data_path: str, target: str) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.streaming",
+         "--child", mode, "--data-path", data_path, "--target", target],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--data-path",
+                        help="каталог для файла (по умолчанию временный)")
+    parser.add_argument("--json-load", action="store_true",
+                        help="замерить и json.load (нужна память в разы больше файла)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.data_path, args.target)))
+        return 0
+
+    data_path = args.data_path or tempfile.mkdtemp(prefix="vt-stream-")
+    os.makedirs(data_path, exist_ok=True)
+    try:
+        start = time.perf_counter()
+        info = generate_file(data_path, args.size_mb, args.seed)
+        print(f"{HISTORY_FILE}: {info['bytes'] / 2**20:.0f} МиБ, "
+              f"{info['records']} записей ({time.perf_counter() - start:.0f} с)")
+        modes = [m for m in MODES if m != "json_load" or args.json_load]
+        baseline = None
+        for mode in modes:
+            result = measure(mode, data_path, info["last_id"])
+            if baseline is None:
+                baseline = result["peak_rss"]
+                print(f"{'интерпретатор':<12} пиковый RSS {baseline / 2**20:8.1f} МиБ")
+                continue
+            print(f"{mode:<12} пиковый RSS {result['peak_rss'] / 2**20:8.1f} МиБ "
+                  f"(+{(result['peak_rss'] - baseline) / 2**20:.1f}), "
+                  f"{result['seconds']:.1f} с")
+    finally:
+        if not args.data_path:
+            shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Набор бенчмарков use case и Parser Service на синтетических данных.
+
+Данные генерируются с фиксированным зерном во временный data_path, каждая
+операция выполняется --repeat раз. Результаты пишутся в JSON; при наличии
+базовой линии медианы сравниваются с ней, и превышение допуска
+завершает запуск с кодом 1. С --require-baseline отсутствие базовой
+линии — ошибка (код 2), а не пропуск сравнения.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite --users 10000 --save-baseline
+    python -m benchmarks.suite --users 10000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from valutatrade_hub.core import usecases
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.history_writer import flush_history_writers
+from valutatrade_hub.parser_service.storage import Storage
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+from .datagen import PASSWORD, generate, generate_history, username
+from .standins import StandInClient
+
+DEFAULT_OUTPUT = "benchmarks/results.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+# Параметры, при которых результаты сравнимы с базовой линией
+COMPARABLE_PARAMS = ("users", "history", "repeat", "seed")
+
+
+def measure(func: Callable[[int], Any], repeat: int) -> Dict[str, float]:
+    """Время func(i) для i in range(repeat): медиана, p95 и минимум в мс."""
+    samples: List[float] = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "runs": repeat,
+    }
+
+
+def run_suite(
+        data_path: str,
+        users: int,
+        repeat: int,
+        seed: int,
+    ) -> Dict[str, Dict[str, float]]:
+    """Замеры операций над уже сгенерированными данными в data_path."""
+    rnd = random.Random(seed)
+    usecases.get_db().set_data_path(data_path)
+    config = ParserConfig(
+        EXCHANGERATE_API_KEY="stand-in",
+        RATES_FILE_PATH=os.path.join(data_path, "rates.json"),
+        HISTORY_FILE_PATH=os.path.join(data_path, "exchange_rates.json"),
+    )
+    traders = [rnd.randint(1, users) for _ in range(repeat)]
+    history_start = datetime.now() + timedelta(days=1)
+
+    def append_history(i: int) -> None:
+        records = list(generate_history(1, seed + i, end=history_start + timedelta(
+            hours=i
+        )))
+        Storage(config).append_history(records)
+
+    def run_update(i: int) -> None:
+        updater = RatesUpdater(config)
+        updater.clients = {"StandIn": StandInClient(seed=seed + i)}
+        updater.run_update()
+
+    cases = {
+        "register": lambda i: usecases.register(f"bench{seed}_{i}", PASSWORD),
+        "login": lambda i: usecases.login(username(traders[i]), PASSWORD),
+        "buy": lambda i: usecases.buy(traders[i], "BTC", 0.001),
+        "sell": lambda i: usecases.sell(traders[i], "BTC", 0.001),
+        "show_portfolio": lambda i: usecases.show_portfolio(traders[i]),
+        "get_rate": lambda i: usecases.get_rate("BTC", "EUR"),
+        "storage_append_history": append_history,
+        "rates_updater_run_update": run_update,
+    }
+    results = {}
+    for name, func in cases.items():
+        results[name] = measure(func, repeat)
+        print(f"{name:<26} median {results[name]['median_ms']:>10.3f} мс  "
+              f"p95 {results[name]['p95_ms']:>10.3f} мс")
+    return results
+
+
+def compare(
+        results: Dict[str, Any],
+        baseline: Dict[str, Any],
+        tolerance: float,
+    ) -> List[str]:
+    """Список регрессий: медиана выросла больше чем на tolerance."""
+    regressions = []
+    for name, current in results["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        limit = reference["median_ms"] * (1 + tolerance)
+        if current["median_ms"] > limit:
+            regressions.append(
+                f"{name}: {current['median_ms']:.3f} мс > "
+                f"{reference['median_ms']:.3f} мс (+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--history", type=int, default=1000,
+                        help="отметок истории на каждую валютную пару")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-path",
+                        help="каталог данных (по умолчанию — временный)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="допустимый рост медианы относительно базовой линии")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="записать результаты как новую базовую линию")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="без базовой линии завершаться с ошибкой")
+    args = parser.parse_args(argv)
+
+    data_path = args.data_path or tempfile.mkdtemp(prefix="valutatrade-bench-")
+    try:
+        generate(data_path, args.users, args.history, args.seed)
+        results = {
+            "params": {
+                "users": args.users,
+                "history": args.history,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "created_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": run_suite(data_path, args.users, args.repeat, args.seed),
+        }
+        # история из run_update дописывается в фоне — до удаления каталога
+        flush_history_writers()
+    finally:
+        if not args.data_path:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"Результаты записаны в {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Базовая линия сохранена в {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        if args.require_baseline:
+            print(f"ОШИБКА: базовая линия {args.baseline} не найдена — "
+                  "сохраните её командой make bench-baseline")
+            return 2
+        print(f"Базовая линия {args.baseline} не найдена, сравнение пропущено")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    mismatched = [
+        key for key in COMPARABLE_PARAMS
+        if baseline["params"].get(key) != results["params"][key]
+    ]
+    if mismatched:
+        print("ОШИБКА: параметры запуска отличаются от базовой линии: "
+              + ", ".join(mismatched))
+        return 2
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("РЕГРЕССИЯ производительности:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"Регрессий нет (допуск {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
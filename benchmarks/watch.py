@@ -0,0 +1,121 @@
+"""Бенчмарк watch-rates: CPU и объём вывода при тысячах пар.
+
+Фоновый поток раз в --update-every секунд меняет курсы --changed пар в
+rates.json из --pairs; watch-rates выводит кадры в поток-заменитель
+терминала. Замеряются процессорное время потока отрисовки (в простое и
+под обновлениями) и байты вывода против полной перерисовки таблицы.
+
+Запуск из корня проекта:
+    python -m benchmarks.watch --pairs 5000 --changed 50 --duration 5
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+from valutatrade_hub.cli.watch import watch_rates
+from valutatrade_hub.core import usecases
+
+
+class TerminalSink(io.StringIO):
+    """Поток-заменитель терминала: считает байты, ничего не хранит."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def isatty(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.written += len(text.encode("utf-8"))
+        return len(text)
+
+
+def write_rates(path: str, pairs: Dict[str, Dict[str, Any]], refresh: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pairs": pairs, "last_refresh": refresh}, f)
+    os.replace(tmp_path, path)
+
+
+def watch_cpu(duration: float, interval: float, height: int) -> Dict[str, float]:
+    sink = TerminalSink()
+    start = time.thread_time()
+    frames = watch_rates(
+        interval=interval, duration=duration, out=sink, height=height
+    )
+    return {
+        "cpu": time.thread_time() - start,
+        "frames": frames,
+        "bytes": sink.written,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=5000)
+    parser.add_argument("--changed", type=int, default=50,
+                        help="пар, меняющихся за одно обновление")
+    parser.add_argument("--update-every", type=float, default=0.1)
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    data_path = tempfile.mkdtemp(prefix="vt-watch-")
+    try:
+        usecases.get_db().set_data_path(data_path)
+        path = os.path.join(data_path, "rates.json")
+        pairs = {
+            f"C{i:05d}_USD": {
+                "rate": rnd.uniform(0.01, 1000),
+                "updated_at": "2025-01-01T00:00:00",
+                "source": "bench",
+            }
+            for i in range(args.pairs)
+        }
+        pairs["USD_USD"] = {"rate": 1.0, "updated_at": "2025-01-01T00:00:00"}
+        write_rates(path, pairs, "2025-01-01T00:00:00")
+        height = args.pairs + 10
+
+        idle = watch_cpu(args.duration, args.interval, height)
+        print(f"Простой {args.duration:.0f} с: CPU {idle['cpu'] * 1000:.1f} мс, "
+              f"кадров {idle['frames']}")
+
+        stop = threading.Event()
+
+        def update() -> None:
+            codes = list(pairs)
+            while not stop.wait(args.update_every):
+                for code in rnd.sample(codes, args.changed):
+                    pairs[code]["rate"] *= 1 + rnd.gauss(0, 0.001)
+                write_rates(path, pairs, time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+        updater = threading.Thread(target=update, daemon=True)
+        updater.start()
+        busy = watch_cpu(args.duration, args.interval, height)
+        stop.set()
+        updater.join()
+        full_frame = idle["bytes"]
+        print(f"Обновления каждые {args.update_every} с по {args.changed} пар: "
+              f"CPU {busy['cpu'] * 1000:.0f} мс за {busy['frames']} кадров "
+              f"({busy['cpu'] / max(1, busy['frames']) * 1000:.1f} мс/кадр)")
+        print(f"Вывод: {busy['bytes'] / 1024:.0f} КБ против "
+              f"{full_frame * busy['frames'] / 1024:.0f} КБ при полной "
+              f"перерисовке каждого кадра")
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,38 @@
 #!/usr/bin/env python3
-from valutatrade_hub.cli.interface import run_cli
+import sys
+
+from valutatrade_hub.cli.interface import parse_args, run_cli
 from valutatrade_hub.infra.settings import SettingsLoader
 from valutatrade_hub.logging_config import setup_logging
 
-settings = SettingsLoader()
-setup_logging(
-    settings.get("log_path", "logs"),
-    settings.get("log_level", "INFO"),
-    log_file="actions.log",
-    console=True,
-)
-setup_logging(
-    settings.get("log_path", "logs"),
-    settings.get("log_level", "INFO"),
-    log_file="parser.log",
-    console=True,
-)
 
 def main():
-    run_cli()
+    settings = SettingsLoader()
+    setup_logging(
+        settings.get("log_path", "logs"),
+        settings.get("log_level", "INFO"),
+        log_file="actions.log",
+        console=True,
+    )
+    setup_logging(
+        settings.get("log_path", "logs"),
+        settings.get("log_level", "INFO"),
+        log_file="parser.log",
+        console=True,
+    )
+    argv = sys.argv[1:]
+    options = parse_args(argv)
+    if argv and argv[0] == "serve":
+        from valutatrade_hub.service.server import serve
+
+        serve(
+            host=options.get("host", settings.get("service_host", "127.0.0.1")),
+            port=int(options.get("port", settings.get("service_port", 8765))),
+            unix_path=options.get("unix"),
+            workers=int(options.get("workers", 1)),
+        )
+        return
+    run_cli(profile=bool(options.get("profile")), connect=options.get("connect"))
 
 if __name__ == "__main__":
     main()
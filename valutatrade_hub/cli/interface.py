@@ -1,30 +1,87 @@
-import json
+import contextlib
+import itertools
 import shlex
 from datetime import datetime
+from typing import Iterable, Optional
 
-from prettytable import PrettyTable
-
+from ..core import usecases
 from ..core.exceptions import (
     ApiRequestError,
     CurrencyNotFoundError,
     InsufficientFundsError,
 )
 from ..core.usecases import (
-    buy,
-    get_rate,
-    login,
-    register,
-    sell,
-    show_portfolio,
+    backtest,
+    cancel_order,
+    export_rates_history,
+    get_exposure,
+    get_pnl,
+    get_rates_snapshot,
+    get_trade_history,
+    import_users,
+    list_orders,
+    make_rates_updater,
+    place_order,
 )
-from ..core.utils import load_json
+from ..core.utils import parse_datetime
+from ..infra.rates_cache import RateRow
 from ..infra.settings import SettingsLoader
-from ..parser_service.config import ParserConfig
-from ..parser_service.updater import RatesUpdater
+from ..metrics import Counter, MetricsRegistry
 
-settings = SettingsLoader()
-config = ParserConfig()
 current_user_id = None
+current_session = None
+# Исполнитель use case: локальный модуль или ServiceClient (run_cli(connect=...))
+backend = usecases
+
+RATES_PAGE_LIMIT = 50
+RATES_PAIR_WIDTH = 11
+RATES_RATE_WIDTH = 20
+# watch-rates: проверка rates.json по умолчанию и предел частоты кадров
+WATCH_INTERVAL = 0.5
+WATCH_MAX_FPS = 20
+# Ошибок import-users, выводимых в консоль (все — в файл --errors)
+IMPORT_ERRORS_SHOWN = 20
+
+
+def print_rate_rows(rows: Iterable[RateRow], base: str, decimals: int) -> None:
+    """Построчный вывод таблицы курсов без буферизации всей таблицы."""
+    border = f"+{'-' * (RATES_PAIR_WIDTH + 2)}+{'-' * (RATES_RATE_WIDTH + 2)}+"
+    print(border)
+    print(f"| {'Pair':<{RATES_PAIR_WIDTH}} | {'Rate':>{RATES_RATE_WIDTH}} |")
+    print(border)
+    for code, rate in rows:
+        pair = f"{code}_{base}"
+        print(
+            f"| {pair:<{RATES_PAIR_WIDTH}} "
+            f"| {rate:>{RATES_RATE_WIDTH}.{decimals}f} |"
+        )
+    print(border)
+
+
+def print_stats() -> None:
+    """Таблица метрик процесса: счётчики и квантили гистограмм."""
+    from prettytable import PrettyTable
+
+    metrics = MetricsRegistry().collect()
+    if not metrics:
+        print("Метрики пока не собраны.")
+        return
+    table = PrettyTable(["Metric", "Labels", "Count", "p50, ms", "p99, ms", "Avg, ms"])
+    for metric in metrics:
+        labels = ", ".join(f"{k}={v}" for k, v in metric.labels)
+        if isinstance(metric, Counter):
+            table.add_row([metric.name, labels, f"{metric.value:g}", "", "", ""])
+            continue
+        avg = metric.sum / metric.count * 1000 if metric.count else 0.0
+        table.add_row([
+            metric.name,
+            labels,
+            metric.count,
+            f"≤{metric.quantile(0.5) * 1000:g}",
+            f"≤{metric.quantile(0.99) * 1000:g}",
+            f"{avg:.2f}",
+        ])
+    print(table)
 
 
 def parse_args(parts: list) -> dict:
@@ -45,249 +102,647 @@ def parse_args(parts: list) -> dict:
     return args
 
 
-def run_cli():
-    """Основной цикл CLI."""
-    global current_user_id
+def handle_command(command: str, args_dict: dict, supported: list) -> bool:
+    """Выполнение одной команды CLI. Возвращает False для выхода."""
+    global current_user_id, current_session
+    if command == "exit" or command == "quit":
+        print("Выход из системы.")
+        return False
+    elif command == "register":
+        username = args_dict.get("username")
+        password = args_dict.get("password")
+        if not username or not password:
+            print("Usage: register --username <str> --password <str>")
+            return True
+        try:
+            user_id = backend.register(username, password)
+            print(
+                f"Пользователь '{username}' зарегистрирован (id={user_id}). "
+                f"Войдите: login --username {username} --password ****"
+            )
+        except ValueError as e:
+            print(str(e))
+    elif command == "import-users":
+        path = args_dict.get("file")
+        if not path or not isinstance(path, str):
+            print(
+                "Usage: import-users --file <path.csv> [--workers <int>] "
+                "[--errors <path.csv>]"
+            )
+            return True
+        try:
+            workers = int(args_dict["workers"]) if "workers" in args_dict else None
+            result = import_users(path, workers)
+        except (ValueError, OSError) as e:
+            print(str(e))
+            return True
+        imported, errors = result["imported"], result["errors"]
+        summary = f"Импортировано пользователей: {imported}"
+        if imported:
+            last_id = result["first_id"] + imported - 1
+            summary += f" (id {result['first_id']}–{last_id})"
+        print(f"{summary}, отклонено строк: {len(errors)}")
+        for line, message in errors[:IMPORT_ERRORS_SHOWN]:
+            print(f"  строка {line}: {message}")
+        if len(errors) > IMPORT_ERRORS_SHOWN:
+            print(f"  ... и ещё {len(errors) - IMPORT_ERRORS_SHOWN}")
+        errors_path = args_dict.get("errors")
+        if errors and isinstance(errors_path, str):
+            import csv
+
+            with open(errors_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["line", "error"])
+                writer.writerows(errors)
+            print(f"Ошибки по строкам записаны в {errors_path}")
+    elif command == "login":
+        username = args_dict.get("username")
+        password = args_dict.get("password")
+        if not username or not password:
+            print("Usage: login --username <str> --password <str>")
+            return True
+        try:
+            user_id = backend.login(username, password)
+            current_session = backend.open_session(user_id)
+            current_user_id = user_id
+            print(f"Вы вошли как '{username}'")
+        except ValueError as e:
+            print(str(e))
+    elif command == "show-portfolio":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        base = args_dict.get("base", "USD").upper()
+        if base not in supported:
+            print(f"Неизвестная базовая валюта '{base}'")
+            return True
+        try:
+            output = backend.show_portfolio(
+                current_user_id, base, session=current_session
+            )
+            print(output)
+        except ValueError as e:
+            print(str(e))
+    elif command == "buy":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        currency_arg = args_dict.get("currency")
+        amount_str = args_dict.get("amount")
+        if not currency_arg or not amount_str:
+            print("Usage: buy --currency <str> --amount <float>")
+            return True
+        try:
+            amount = float(amount_str)
+        except ValueError:
+            print("'amount' должен быть положительным числом")
+            return True
+        try:
+            output = backend.buy(
+                current_user_id,
+                currency_arg,
+                amount,
+                verbose=True,
+                session=current_session,
+            )
+            print(output)
+        except InsufficientFundsError as e:
+            print(str(e))
+        except CurrencyNotFoundError as e:
+            print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}")
+        except ValueError as e:
+            print(str(e))
+    elif command == "sell":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        currency_arg = args_dict.get("currency")
+        amount_str = args_dict.get("amount")
+        if not currency_arg or not amount_str:
+            print("Usage: sell --currency <str> --amount <float>")
+            return True
+        try:
+            amount = float(amount_str)
+        except ValueError:
+            print("'amount' должен быть положительным числом")
+            return True
+        try:
+            output = backend.sell(
+                current_user_id,
+                currency_arg,
+                amount,
+                verbose=True,
+                session=current_session,
+            )
+            print(output)
+        except InsufficientFundsError as e:
+            print(str(e))
+        except CurrencyNotFoundError as e:
+            print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}")
+        except ValueError as e:
+            print(str(e))
+    elif command == "get-rate":
+        from_arg = args_dict.get("from", "USD")
+        to_arg = args_dict.get("to")
+        if not to_arg:
+            print(
+                "Usage: get-rate --from <str> --to <str> "
+                "[--at <YYYY-MM-DD[THH:MM:SS]>]"
+            )
+            return True
+        try:
+            # дата без времени — курс на конец этого дня
+            at = (
+                parse_datetime(args_dict["at"], end_of_day=True)
+                if "at" in args_dict else None
+            )
+            rate, updated_at = backend.get_rate(from_arg, to_arg, at=at)
+            rev_rate = 1 / rate if rate != 0 else 0
+            print(
+                f"Курс {from_arg}→{to_arg}: {rate:.8f} "
+                f"({'на момент' if at else 'обновлено'}: {updated_at})"
+            )
+            print(f"Обратный курс {to_arg}→{from_arg}: {rev_rate:.8f}")
+        except CurrencyNotFoundError as e:
+            print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}.")
+        except ApiRequestError as e:
+            print(
+                f"Курс {from_arg}→{to_arg} недоступен. "
+                f"Повторите попытку позже. ({str(e)})"
+            )
+        except ValueError as e:
+            print(str(e))
+    elif command == "history":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        try:
+            limit = int(args_dict["limit"]) if "limit" in args_dict else None
+            date_from = (
+                parse_datetime(args_dict["from"]) if "from" in args_dict else None
+            )
+            date_to = (
+                parse_datetime(args_dict["to"], end_of_day=True)
+                if "to" in args_dict else None
+            )
+            trades = get_trade_history(current_user_id, limit, date_from, date_to)
+        except ValueError as e:
+            print(str(e))
+            return True
+        if not trades:
+            print("Сделок за выбранный период нет.")
+            return True
+        from prettytable import PrettyTable
+
+        table = PrettyTable(["Time", "Side", "Currency", "Amount", "Rate", "USD"])
+        for trade in trades:
+            rate = trade["rate"] or 0.0
+            table.add_row([
+                trade["timestamp"],
+                trade["side"].upper(),
+                trade["currency"],
+                f"{trade['amount']:.4f}",
+                f"{rate:.2f}",
+                f"{trade['amount'] * rate:.2f}",
+            ])
+        print(table)
+    elif command == "export-history":
+        output = args_dict.get("output")
+        if not output or not isinstance(output, str):
+            print(
+                "Usage: export-history --output <path.csv|path.json> "
+                "[--currency <str>] [--from <date>] [--to <date>]"
+            )
+            return True
+        try:
+            date_from = (
+                parse_datetime(args_dict["from"]) if "from" in args_dict else None
+            )
+            date_to = (
+                parse_datetime(args_dict["to"], end_of_day=True)
+                if "to" in args_dict else None
+            )
+            count = export_rates_history(
+                output, args_dict.get("currency"), date_from, date_to
+            )
+        except (ValueError, OSError) as e:
+            print(str(e))
+            return True
+        print(f"Записей истории курсов выгружено: {count} → {output}")
+    elif command == "pnl":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        base = args_dict.get("base", "USD").upper()
+        if base not in supported:
+            print(f"Неизвестная базовая валюта '{base}'")
+            return True
+        try:
+            date_from = (
+                parse_datetime(args_dict["from"]) if "from" in args_dict else None
+            )
+            date_to = (
+                parse_datetime(args_dict["to"], end_of_day=True)
+                if "to" in args_dict else None
+            )
+            pnl = get_pnl(current_user_id, date_from, date_to, base)
+        except ApiRequestError as e:
+            print(f"Курс USD→{base} недоступен. ({str(e)})")
+            return True
+        except ValueError as e:
+            print(str(e))
+            return True
+        print(f"P&L (база: {base}), {pnl['from']} → {pnl['to']}:")
+        print(
+            f"Стоимость: {pnl['start_value']:.2f} → {pnl['end_value']:.2f} "
+            f"({pnl['change']:+.2f} {base}, {pnl['change_pct']:+.2f}%)"
+        )
+        print(f"Реализованная прибыль за период: {pnl['realized']:+.2f} {base}")
+        print(f"Нереализованная прибыль: {pnl['unrealized']:+.2f} {base}")
+        print(f"Точек ряда: {pnl['points']}")
+    elif command == "backtest":
+        allocation_arg = args_dict.get("allocation")
+        trades_arg = args_dict.get("trades")
+        if not isinstance(allocation_arg, str) and not isinstance(trades_arg, str):
+            print(
+                "Usage: backtest --allocation <CODE=amount,...> [--capital <float>] "
+                "[--trades <path.csv|path.json>] [--from <date>] [--to <date>] "
+                "[--step <seconds>] [--points <int>] [--output <path.csv>]"
+            )
+            return True
+        from ..core.backtest import parse_allocation, read_trades
+
+        try:
+            allocation = (
+                parse_allocation(allocation_arg)
+                if isinstance(allocation_arg, str) else None
+            )
+            trades = read_trades(trades_arg) if isinstance(trades_arg, str) else None
+            capital = float(args_dict["capital"]) if "capital" in args_dict else None
+            step = int(args_dict["step"]) if "step" in args_dict else None
+            points = int(args_dict.get("points", 10))
+            date_from = (
+                parse_datetime(args_dict["from"]) if "from" in args_dict else None
+            )
+            date_to = (
+                parse_datetime(args_dict["to"], end_of_day=True)
+                if "to" in args_dict else None
+            )
+            result = backtest(allocation, capital, trades, date_from, date_to, step)
+        except (ValueError, OSError) as e:
+            print(str(e))
+            return True
+        summary = result.summary()
+        print(
+            f"Бэктест {summary['from']} → {summary['to']} "
+            f"({summary['points']} точек, сделок {summary['trades']}):"
+        )
+        print(
+            f"Стоимость: {summary['start_value']:.2f} → {summary['end_value']:.2f} USD "
+            f"(мин. {summary['min_value']:.2f}, макс. {summary['max_value']:.2f})"
+        )
+        line = f"Доходность: {summary['total_return_pct']:+.2f}%"
+        if summary["annualized_return_pct"] is not None:
+            line += f" (годовых {summary['annualized_return_pct']:+.2f}%)"
+        print(line)
+        print(
+            f"Макс. просадка: {summary['max_drawdown_pct']:.2f}%, "
+            f"волатильность шага: {summary['volatility_pct']:.4f}%"
+        )
+        from prettytable import PrettyTable
+
+        table = PrettyTable(["Time", "Value USD"])
+        for timestamp, value in result.series(points):
+            table.add_row([timestamp, f"{value:.2f}"])
+        print(table)
+        output = args_dict.get("output")
+        if isinstance(output, str):
+            with open(output, "w", encoding="utf-8") as f:
+                f.write("timestamp,value_usd\n")
+                f.writelines(
+                    f"{timestamp},{value}\n" for timestamp, value in result.series()
+                )
+            print(f"Ряд стоимости записан в {output}")
+    elif command == "exposure":
+        currency_arg = args_dict.get("currency")
+        if not currency_arg or not isinstance(currency_arg, str):
+            print("Usage: exposure --currency <str> [--top <int>]")
+            return True
+        try:
+            top = int(args_dict.get("top", 10))
+            exposure = get_exposure(currency_arg, top)
+        except ValueError as e:
+            print(str(e))
+            return True
+        code = exposure["currency"]
+        summary = (
+            f"Экспозиция по {code}: держателей {exposure['holders']}, "
+            f"всего {exposure['total']:.4f} {code}"
+        )
+        if exposure["total_usd"] is not None:
+            summary += f" ≈ {exposure['total_usd']:.2f} USD"
+        print(summary)
+        if exposure["top"]:
+            from prettytable import PrettyTable
+
+            table = PrettyTable(["User ID", "Amount", "Share %"])
+            for holder in exposure["top"]:
+                table.add_row([
+                    holder["user_id"],
+                    f"{holder['amount']:.4f}",
+                    f"{holder['share']:.2f}",
+                ])
+            print(table)
+    elif command == "stats":
+        print_stats()
+        export = args_dict.get("export")
+        if export:
+            path = export if isinstance(export, str) else (
+                SettingsLoader().get("metrics_textfile", "logs/metrics.prom")
+            )
+            MetricsRegistry().write_textfile(path)
+            print(f"Метрики записаны в {path}")
+    elif command == "place-order":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        currency_arg = args_dict.get("currency")
+        side = args_dict.get("side")
+        kind = args_dict.get("type")
+        price_str = args_dict.get("price")
+        amount_str = args_dict.get("amount")
+        if not all((currency_arg, side, kind, price_str, amount_str)):
+            print(
+                "Usage: place-order --currency <str> --side <buy|sell> "
+                "--type <limit|stop> --price <float> --amount <float>"
+            )
+            return True
+        try:
+            price = float(price_str)
+            amount = float(amount_str)
+        except ValueError:
+            print("'price' и 'amount' должны быть положительными числами")
+            return True
+        try:
+            order = place_order(current_user_id, currency_arg, side, kind, price,
+                                amount)
+            print(
+                f"Ордер #{order.order_id} размещён: {order.side.upper()} "
+                f"{order.kind.upper()} {order.amount:.4f} {order.currency} "
+                f"по {order.price:.2f} USD. "
+                "Проверяется при каждом обновлении курсов."
+            )
+        except CurrencyNotFoundError as e:
+            print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}")
+        except ValueError as e:
+            print(str(e))
+    elif command == "list-orders":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        orders = list_orders(current_user_id, include_closed=bool(
+            args_dict.get("all")
+        ))
+        if not orders:
+            print("Ордеров нет.")
+            return True
+        from prettytable import PrettyTable
+
+        table = PrettyTable(
+            ["ID", "Side", "Type", "Currency", "Amount", "Price", "Status", "Created"]
+        )
+        for order in orders:
+            table.add_row([
+                order.order_id,
+                order.side.upper(),
+                order.kind.upper(),
+                order.currency,
+                f"{order.amount:.4f}",
+                f"{order.price:.2f}",
+                order.status,
+                order.created_at,
+            ])
+        print(table)
+    elif command == "cancel-order":
+        if current_user_id is None:
+            print("Сначала выполните login")
+            return True
+        try:
+            order_id = int(args_dict.get("id"))
+        except (TypeError, ValueError):
+            print("Usage: cancel-order --id <int>")
+            return True
+        try:
+            cancel_order(current_user_id, order_id)
+            print(f"Ордер #{order_id} отменён.")
+        except ValueError as e:
+            print(str(e))
+    elif command == "update-rates":
+        source = args_dict.get("source")
+        sources = [source] if source else None
+        try:
+            updater = make_rates_updater()
+            count = updater.run_update(sources)
+            last_refresh = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            if count > 0:
+                print(
+                    f"Update successful. Total rates updated: "
+                    f"{count}. Last refresh: {last_refresh}"
+                )
+            else:
+                print(
+                    "Update completed with errors. "
+                    "Check logs/parser.log for details."
+                )
+        except Exception as e:
+            print(
+                f"Update failed. Error: {e}. "
+                "Check logs/parser.log for details."
+            )
+    elif command == "show-rates":
+        currency = args_dict.get("currency")
+        top_str = args_dict.get("top")
+        base = args_dict.get("base", "USD").upper()
+        prefix = args_dict.get("prefix")
+        asset = args_dict.get("class")
+        if base not in supported:
+            print(f"Неизвестная базовая валюта '{base}'")
+            return True
+        if asset not in (None, "crypto", "fiat"):
+            print("Usage: show-rates --class <crypto|fiat>")
+            return True
+        try:
+            page = int(args_dict.get("page", 1))
+            limit = int(args_dict.get("limit", RATES_PAGE_LIMIT))
+            top_n = int(top_str) if top_str else None
+        except ValueError:
+            print("'page', 'limit' и 'top' должны быть целыми числами")
+            return True
+        if page < 1 or limit < 1:
+            print("'page' и 'limit' должны быть положительными")
+            return True
+        try:
+            snapshot = get_rates_snapshot()
+            if not snapshot.pairs:
+                print(
+                    "Локальный кеш курсов пуст. "
+                    "Выполните 'update-rates' чтобы загрузить данные."
+                )
+                return True
+            last_update = snapshot.last_refresh or "unknown"
+            print(f"Rates from cache (updated at {last_update}):")
+
+            if currency:
+                code = currency.upper()
+                rate_base = snapshot.rate(code, base)
+                if not rate_base:
+                    print(f"Курс для '{currency}' не найден в кеше.")
+                else:
+                    print_rate_rows([(code, rate_base)], base, decimals=5)
+                return True
+
+            if top_n is not None:
+                # по умолчанию топ строится по криптовалютам
+                rows = snapshot.top(base, top_n, prefix, asset or "crypto")
+                print_rate_rows(rows, base, decimals=2)
+                return True
+
+            rows = snapshot.select(base, prefix, asset)
+            pages = max(1, -(-len(rows) // limit))
+            offset = (page - 1) * limit
+            if offset >= len(rows):
+                print(f"Страница {page} пуста (всего страниц: {pages}).")
+                return True
+            print_rate_rows(
+                itertools.islice(rows, offset, offset + limit),
+                base,
+                decimals=5,
+            )
+            if pages > 1:
+                footer = f"Страница {page}/{pages}, всего пар: {len(rows)}."
+                if page < pages:
+                    footer += f" Следующая: --page {page + 1}"
+                print(footer)
+        except ValueError as e:
+            print(str(e))
+    elif command == "watch-rates":
+        base = args_dict.get("base", "USD").upper()
+        asset = args_dict.get("class")
+        if base not in supported:
+            print(f"Неизвестная базовая валюта '{base}'")
+            return True
+        if asset not in (None, "crypto", "fiat"):
+            print(
+                "Usage: watch-rates [--base <str>] [--top <int>] [--prefix <str>] "
+                "[--class <crypto|fiat>] [--interval <float>] [--duration <float>]"
+            )
+            return True
+        try:
+            top_n = int(args_dict["top"]) if "top" in args_dict else None
+            interval = float(args_dict.get("interval", WATCH_INTERVAL))
+            duration = (
+                float(args_dict["duration"]) if "duration" in args_dict else None
+            )
+        except ValueError:
+            print("'top' — целое число, 'interval' и 'duration' — числа секунд")
+            return True
+        from .watch import watch_rates
+
+        try:
+            watch_rates(
+                base,
+                top_n,
+                args_dict.get("prefix"),
+                asset,
+                # не чаще WATCH_MAX_FPS кадров в секунду
+                max(interval, 1 / WATCH_MAX_FPS),
+                duration,
+            )
+        except ValueError as e:
+            print(str(e))
+    else:
+        print(
+            f"Неизвестная команда '{command}'. "
+            "Используйте: register, import-users, login, show-portfolio, "
+            "buy, sell, place-order, list-orders, cancel-order, get-rate, "
+            "update-rates, show-rates, watch-rates, history, export-history, pnl, "
+            "backtest, exposure, stats, exit."
+        )
+    return True
+
+
+def run_cli(profile: bool = False, connect: Optional[str] = None):
+    """Основной цикл CLI.
+
+    profile=True профилирует всю сессию (cProfile + tracemalloc); отдельную
+    команду можно профилировать префиксом PROFILE или флагом --profile.
+    connect — адрес запущенного сервиса (http://host:port или unix:/path):
+    register, login, show-portfolio, buy, sell и get-rate выполняет сервис.
+    """
+    global backend
+    if connect:
+        from ..service.client import ServiceClient
+
+        client = ServiceClient(connect)
+        try:
+            client.health()
+        except ValueError as e:
+            print(str(e))
+            return
+        backend = client
+        print(f"Подключено к сервису {connect}")
     print(
         "Добро пожаловать в ValutaTrade Hub. "
-        "Команды: register, login, show-portfolio, "
-        "buy, sell, get-rate, update-rates, show-rates, exit."
+        "Команды: register, import-users, login, show-portfolio, "
+        "buy, sell, place-order, list-orders, cancel-order, get-rate, "
+        "update-rates, show-rates, watch-rates, history, export-history, pnl, "
+        "backtest, exposure, stats, exit."
     )
-    supported = settings.get("supported_currencies", [])
+    supported = SettingsLoader().get("supported_currencies", [])
+    if profile:
+        from .profiling import profiled
+
+        with profiled("session"):
+            command_loop(supported, profile_commands=False)
+    else:
+        command_loop(supported)
+    metrics_textfile = SettingsLoader().get("metrics_textfile")
+    if metrics_textfile:
+        MetricsRegistry().write_textfile(metrics_textfile)
+
+
+def command_loop(supported: list, profile_commands: bool = True):
+    """Чтение и выполнение команд до exit."""
+    from ..logging_config import flush_logging
+
     while True:
+        # вывод логов предыдущей команды не должен смешиваться с приглашением
+        flush_logging()
         try:
             cmd = input("> ").strip()
             if not cmd:
                 continue
             parts = shlex.split(cmd)
+            profile_command = False
+            if parts and parts[0].upper() == "PROFILE":
+                profile_command = True
+                parts = parts[1:]
             if not parts:
                 continue
             command = parts[0].lower()
             args_dict = parse_args(parts[1:])
-            if command == "exit" or command == "quit":
-                print("Выход из системы.")
-                break
-            elif command == "register":
-                username = args_dict.get("username")
-                password = args_dict.get("password")
-                if not username or not password:
-                    print("Usage: register --username <str> --password <str>")
-                    continue
-                try:
-                    user_id = register(username, password)
-                    print(
-                        f"Пользователь '{username}' зарегистрирован (id={user_id}). "
-                        f"Войдите: login --username {username} --password ****"
-                    )
-                except ValueError as e:
-                    print(str(e))
-            elif command == "login":
-                username = args_dict.get("username")
-                password = args_dict.get("password")
-                if not username or not password:
-                    print("Usage: login --username <str> --password <str>")
-                    continue
-                try:
-                    user_id = login(username, password)
-                    current_user_id = user_id
-                    users_data = load_json("users.json")
-                    username_real = next(
-                        u["username"] for u in users_data if u["user_id"] == user_id
-                    )
-                    print(f"Вы вошли как '{username_real}'")
-                except ValueError as e:
-                    print(str(e))
-            elif command == "show-portfolio":
-                if current_user_id is None:
-                    print("Сначала выполните login")
-                    continue
-                base = args_dict.get("base", "USD").upper()
-                if base not in supported:
-                    print(f"Неизвестная базовая валюта '{base}'")
-                    continue
-                try:
-                    output = show_portfolio(current_user_id, base)
-                    print(output)
-                except ValueError as e:
-                    print(str(e))
-            elif command == "buy":
-                if current_user_id is None:
-                    print("Сначала выполните login")
-                    continue
-                currency_arg = args_dict.get("currency")
-                amount_str = args_dict.get("amount")
-                if not currency_arg or not amount_str:
-                    print("Usage: buy --currency <str> --amount <float>")
-                    continue
-                try:
-                    amount = float(amount_str)
-                except ValueError:
-                    print("'amount' должен быть положительным числом")
-                    continue
-                try:
-                    output = buy(current_user_id, currency_arg, amount, verbose=True)
-                    print(output)
-                except InsufficientFundsError as e:
-                    print(str(e))
-                except CurrencyNotFoundError as e:
-                    print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}")
-                except ValueError as e:
-                    print(str(e))
-            elif command == "sell":
-                if current_user_id is None:
-                    print("Сначала выполните login")
-                    continue
-                currency_arg = args_dict.get("currency")
-                amount_str = args_dict.get("amount")
-                if not currency_arg or not amount_str:
-                    print("Usage: sell --currency <str> --amount <float>")
-                    continue
-                try:
-                    amount = float(amount_str)
-                except ValueError:
-                    print("'amount' должен быть положительным числом")
-                    continue
-                try:
-                    output = sell(current_user_id, currency_arg, amount, verbose=True)
-                    print(output)
-                except InsufficientFundsError as e:
-                    print(str(e))
-                except CurrencyNotFoundError as e:
-                    print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}")
-                except ValueError as e:
-                    print(str(e))
-            elif command == "get-rate":
-                from_arg = args_dict.get("from", "USD")
-                to_arg = args_dict.get("to")
-                if not to_arg:
-                    print("Usage: get-rate --from <str> --to <str>")
-                    continue
-                try:
-                    rate, updated_at = get_rate(from_arg, to_arg)
-                    rev_rate = 1 / rate if rate != 0 else 0
-                    print(
-                        f"Курс {from_arg}→{to_arg}: {rate:.8f} "
-                        f"(обновлено: {updated_at})"
-                    )
-                    print(f"Обратный курс {to_arg}→{from_arg}: {rev_rate:.8f}")
-                except CurrencyNotFoundError as e:
-                    print(f"{str(e)}. Поддерживаемые: {', '.join(supported)}.")
-                except ApiRequestError as e:
-                    print(
-                        f"Курс {from_arg}→{to_arg} недоступен. "
-                        f"Повторите попытку позже. ({str(e)})"
-                    )
-                except ValueError as e:
-                    print(str(e))
-            elif command == "update-rates":
-                source = args_dict.get("source")
-                sources = [source] if source else None
-                try:
-                    updater = RatesUpdater(config)
-                    count = updater.run_update(sources)
-                    last_refresh = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-                    if count > 0:
-                        print(
-                            f"Update successful. Total rates updated: "
-                            f"{count}. Last refresh: {last_refresh}"
-                        )
-                    else:
-                        print(
-                            "Update completed with errors. "
-                            "Check logs/parser.log for details."
-                        )
-                except Exception as e:
-                    print(
-                        f"Update failed. Error: {e}. "
-                        "Check logs/parser.log for details."
-                    )
-            elif command == "show-rates":
-                currency = args_dict.get("currency")
-                top_str = args_dict.get("top")
-                base = args_dict.get("base", "USD").upper()
-                if base not in supported:
-                    print(f"Неизвестная базовая валюта '{base}'")
-                    continue
-                try:
-                    rates_data = load_json("rates.json")
-                    if (
-                        isinstance(rates_data, list)
-                        or not rates_data
-                        or "pairs" not in rates_data
-                        or not rates_data["pairs"]
-                    ):
-                        raise FileNotFoundError("Кеш пуст")
-                    pairs = rates_data["pairs"]
-                    last_update = rates_data.get("last_refresh", "unknown")
-                    print(f"Rates from cache (updated at {last_update}):")
-                    table = PrettyTable(["Pair", "Rate"])
-                    base_usd_pair = f"{base}_USD"
-                    base_usd_rate = pairs.get(
-                        base_usd_pair, {}
-                    ).get("rate", 1.0) if base != "USD" else 1.0
-
-                    if currency:
-                        cur_pair = f"{currency.upper()}_{base}"
-                        cur_usd_pair = f"{currency.upper()}_USD"
-                        cur_usd_rate = pairs.get(cur_usd_pair, {}).get("rate", 0)
-                        cur_base_rate = (
-                            cur_usd_rate / base_usd_rate
-                            if base != "USD" else cur_usd_rate
-                        )
-                        if cur_usd_rate == 0:
-                            print(f"Курс для '{currency}' не найден в кеше.")
-                        else:
-                            table.add_row([cur_pair, f"{cur_base_rate:.5f}"])
-                            print(table)
-                        continue
-
-                    if top_str:
-                        top_n = int(top_str)
-                        crypto_usd = {
-                            k: v for k, v in pairs.items()
-                            if k.split("_")[0] in config.CRYPTO_CURRENCIES
-                        }
-                        sorted_crypto = sorted(
-                            crypto_usd.items(),
-                            key=lambda x: x[1]["rate"] / base_usd_rate,
-                            reverse=True,
-                        )[:top_n]
-                        for pair_usd, p in sorted_crypto:
-                            code = pair_usd.split("_")[0]
-                            rate_base = (
-                                p["rate"] / base_usd_rate
-                                if base != "USD" else p["rate"]
-                            )
-                            table.add_row([f"{code}_{base}", f"{rate_base:.2f}"])
-                        print(table)
-                        continue
+            if args_dict.pop("profile", False):
+                profile_command = True
+            if profile_command and profile_commands:
+                from .profiling import profiled
 
-                    for pair_usd, p in sorted(pairs.items()):
-                        code = pair_usd.split("_")[0]
-                        rate_usd = p["rate"]
-                        rate_base = (
-                            rate_usd / base_usd_rate
-                            if base != "USD" else rate_usd
-                        )
-                        pair_base = f"{code}_{base}"
-                        table.add_row([pair_base, f"{rate_base:.5f}"])
-                    print(table)
-
-                except FileNotFoundError:
-                    print(
-                        "Локальный кеш курсов пуст. "
-                        "Выполните 'update-rates' чтобы загрузить данные."
-                    )
-                except json.JSONDecodeError:
-                    print("Ошибка чтения кеша курсов. Выполните 'update-rates'.")
-                except ValueError as e:
-                    print(str(e))
+                context = profiled(command)
             else:
-                print(
-                    f"Неизвестная команда '{command}'. "
-                    "Используйте: register, login, show-portfolio, "
-                    "buy, sell, get-rate, update-rates, show-rates, exit."
-                )
+                context = contextlib.nullcontext()
+            with context:
+                keep_running = handle_command(command, args_dict, supported)
+            if not keep_running:
+                break
         except KeyboardInterrupt:
             print("\nВыход из системы.")
             break
@@ -0,0 +1,76 @@
+import contextlib
+import cProfile
+import io
+import pstats
+import re
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from ..core.utils import ensure_dir
+from ..infra.settings import SettingsLoader
+
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+
+def profiles_dir() -> Path:
+    return Path(SettingsLoader().get("log_path", "logs")) / "profiles"
+
+
+@contextlib.contextmanager
+def profiled(name: str) -> Iterator[None]:
+    """Профилирование блока: cProfile и tracemalloc.
+
+    В logs/profiles/ пишутся <name>_<время>.pstats (для pstats/snakeviz) и
+    <name>_<время>.txt с топом функций по cumulative и топом аллокаций.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        stem = _report_stem(name)
+        profiler.dump_stats(f"{stem}.pstats")
+        with open(f"{stem}.txt", "w", encoding="utf-8") as f:
+            f.write(_render_report(name, profiler, snapshot, peak))
+        print(f"Профиль '{name}' сохранён: {stem}.pstats, {stem}.txt")
+
+
+def _report_stem(name: str) -> str:
+    directory = profiles_dir()
+    ensure_dir(str(directory))
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", name) or "command"
+    timestamp = datetime.now().strftime("%Y%m%dT%H%M%S_%f")
+    return str(directory / f"{safe_name}_{timestamp}")
+
+
+def _render_report(
+        name: str,
+        profiler: cProfile.Profile,
+        snapshot: tracemalloc.Snapshot,
+        peak: int,
+    ) -> str:
+    out = io.StringIO()
+    out.write(f"Profile: {name}\n\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    out.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+    out.write(f"Top {TOP_ALLOCATIONS} allocations by line:\n")
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        out.write(f"  {stat}\n")
+    return out.getvalue()
@@ -0,0 +1,185 @@
+import sys
+import threading
+from datetime import datetime
+from shutil import get_terminal_size
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from ..core.usecases import subscribe_rates
+from ..infra.rates_cache import RatesSnapshot
+
+# ANSI: курсор на n строк вверх/вниз, очистка строки и всего ниже курсора
+CURSOR_UP = "\x1b[{}A"
+CURSOR_DOWN = "\x1b[{}B"
+CLEAR_LINE = "\x1b[2K"
+CLEAR_BELOW = "\x1b[J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+WATCH_PAIR_WIDTH = 11
+WATCH_RATE_WIDTH = 20
+WATCH_TIME_WIDTH = 19
+# Строки экрана вне таблицы: заголовок (3), нижняя граница, статус, приглашение
+WATCH_CHROME_LINES = 6
+
+
+class RatesScreen:
+    """Таблица курсов в терминале, перерисовываемая построчно.
+
+    Выведенные строки запоминаются; в новом кадре переписываются только
+    изменившиеся (курсор поднимается к строке и возвращается вниз
+    ANSI-последовательностями). Если изменилось число строк, тело таблицы
+    выводится заново. Без терминала (вывод в файл или канал) первый кадр
+    печатается целиком, а затем — только изменившиеся строки курсов.
+    """
+
+    def __init__(self, out: TextIO, ansi: bool):
+        self.out = out
+        self.ansi = ansi
+        self._body: List[str] = []
+        self._drawn = False
+
+    def render(self, rows: List[str], status: str) -> int:
+        """Выводит кадр; возвращает число переписанных строк."""
+        border = _border()
+        body = rows + [border, status]
+        if not self._drawn:
+            header = [border, _header(), border]
+            self.out.write("\n".join(header + body) + "\n")
+            changed = len(body)
+        elif not self.ansi:
+            stamp = datetime.now().strftime("%H:%M:%S")
+            lines = [
+                f"{stamp} {row}" for i, row in enumerate(rows)
+                if i >= len(self._body) or self._body[i] != row
+            ]
+            if lines:
+                self.out.write("\n".join(lines) + "\n")
+            changed = len(lines)
+        elif len(body) != len(self._body):
+            self.out.write(
+                CURSOR_UP.format(len(self._body)) + "\r" + CLEAR_BELOW
+                + "\n".join(body) + "\n"
+            )
+            changed = len(body)
+        else:
+            parts = []
+            for i, line in enumerate(body):
+                if line == self._body[i]:
+                    continue
+                distance = len(body) - i
+                parts.append(
+                    CURSOR_UP.format(distance) + "\r" + CLEAR_LINE + line
+                    + CURSOR_DOWN.format(distance) + "\r"
+                )
+            self.out.write("".join(parts))
+            changed = len(parts)
+        self.out.flush()
+        self._body = body
+        self._drawn = True
+        return changed
+
+
+def watch_rates(
+        base: str = "USD",
+        top: Optional[int] = None,
+        prefix: Optional[str] = None,
+        asset: Optional[str] = None,
+        interval: float = 0.5,
+        duration: Optional[float] = None,
+        out: Optional[TextIO] = None,
+        height: Optional[int] = None,
+    ) -> int:
+    """Следит за rates.json до Ctrl+C (или duration секунд).
+
+    Кадр строится не чаще раза в interval секунд и только после изменения
+    файла; height — строк экрана (по умолчанию размер терминала).
+    Возвращает число выведенных кадров.
+    """
+    out = out or sys.stdout
+    ansi = out.isatty()
+    screen = RatesScreen(out, ansi)
+    stop = threading.Event()
+    timer = None
+    if duration:
+        timer = threading.Timer(duration, stop.set)
+        timer.daemon = True
+        timer.start()
+    limit = None
+    if ansi:
+        # подняться курсором можно только в пределах экрана
+        height = height or get_terminal_size().lines
+        limit = max(1, height - WATCH_CHROME_LINES)
+    frames = 0
+    # строка таблицы по (код, курс, время) — форматируются только новые
+    formatted: Dict[Tuple[str, float, str], str] = {}
+    if ansi:
+        out.write(HIDE_CURSOR)
+    try:
+        for snapshot in subscribe_rates(interval, stop):
+            rows, formatted = _rows(
+                snapshot, base, top, prefix, asset, limit, formatted
+            )
+            status = (
+                f"Курсы на {snapshot.last_refresh or 'unknown'}, пар: {len(rows)}. "
+                "Ctrl+C — выход."
+            )
+            screen.render(rows, status)
+            frames += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if ansi:
+            out.write(SHOW_CURSOR)
+            out.flush()
+    return frames
+
+
+def _rows(
+        snapshot: RatesSnapshot,
+        base: str,
+        top: Optional[int],
+        prefix: Optional[str],
+        asset: Optional[str],
+        limit: Optional[int],
+        formatted: Dict[Tuple[str, float, str], str],
+    ) -> Tuple[List[str], Dict[Tuple[str, float, str], str]]:
+    """Строки кадра и кеш форматирования только для них (не растёт)."""
+    if top:
+        # как в show-rates: по умолчанию топ строится по криптовалютам
+        selected = snapshot.top(base, top, prefix, asset or "crypto")
+        decimals = 2
+    else:
+        selected = snapshot.select(base, prefix, asset)
+        decimals = 5
+    rows = []
+    current: Dict[Tuple[str, float, str], str] = {}
+    pairs = snapshot.pairs
+    for code, rate in selected[:limit]:
+        updated = pairs.get(f"{code}_USD", {}).get("updated_at", "")
+        key = (code, rate, updated)
+        line = formatted.get(key)
+        if line is None:
+            line = (
+                f"| {code + '_' + base:<{WATCH_PAIR_WIDTH}} "
+                f"| {rate:>{WATCH_RATE_WIDTH}.{decimals}f} "
+                f"| {updated:<{WATCH_TIME_WIDTH}} |"
+            )
+        current[key] = line
+        rows.append(line)
+    return rows, current
+
+
+def _border() -> str:
+    return (
+        f"+{'-' * (WATCH_PAIR_WIDTH + 2)}+{'-' * (WATCH_RATE_WIDTH + 2)}"
+        f"+{'-' * (WATCH_TIME_WIDTH + 2)}+"
+    )
+
+
+def _header() -> str:
+    return (
+        f"| {'Pair':<{WATCH_PAIR_WIDTH}} | {'Rate':>{WATCH_RATE_WIDTH}} "
+        f"| {'Updated':<{WATCH_TIME_WIDTH}} |"
+    )
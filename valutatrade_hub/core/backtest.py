@@ -0,0 +1,329 @@
+import csv
+import math
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from itertools import repeat
+from operator import add, mul
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from ..infra.jsonstream import iter_json_array
+from .utils import from_seconds, to_seconds
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+_NAN = float("nan")
+
+
+class RateGrid:
+    """Курсы всех валют к USD на общей сетке времени.
+
+    times — array('q') секунд, columns — по array('d') на валюту той же длины.
+    Курс в узле сетки — последний известный на этот момент (forward fill);
+    до первого наблюдения валюты стоит NaN. Все вычисления идут по
+    массивам целиком, без объектов на каждую точку.
+    """
+
+    __slots__ = ("times", "columns")
+
+    def __init__(self, times: array, columns: Dict[str, array]):
+        self.times = times
+        self.columns = columns
+        self.columns.setdefault("USD", array("d", [1.0]) * len(times))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def from_history(
+            cls,
+            records: Iterable[Mapping[str, Any]],
+            step: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+        ) -> 'RateGrid':
+        """Сетка по записям exchange_rates.json (пары CODE_USD).
+
+        step — шаг сетки в секундах; без него узлами становятся все
+        моменты наблюдений (объединение по парам).
+        """
+        start = to_seconds(date_from) if date_from else None
+        end = to_seconds(date_to) if date_to else None
+        observed: Dict[str, Tuple[array, array]] = {}
+        # наблюдения до начала периода нужны, чтобы знать курс в его начале
+        before: Dict[str, Tuple[int, float]] = {}
+        # одно обновление пишет все пары с одной меткой времени
+        last_timestamp, seconds = None, 0
+        for record in records:
+            if record.get("to_currency") != "USD":
+                continue
+            if record["timestamp"] != last_timestamp:
+                last_timestamp = record["timestamp"]
+                seconds = to_seconds(datetime.fromisoformat(last_timestamp))
+            if end is not None and seconds > end:
+                continue
+            code = record["from_currency"]
+            rate = float(record["rate"])
+            if start is not None and seconds < start:
+                if code not in before or before[code][0] <= seconds:
+                    before[code] = (seconds, rate)
+                continue
+            series = observed.get(code)
+            if series is None:
+                series = observed[code] = (array("q"), array("d"))
+            series[0].append(seconds)
+            series[1].append(rate)
+        for code, (seconds, rate) in before.items():
+            # в начало: реальное наблюдение ровно в start должно его перекрыть
+            series = observed.setdefault(code, (array("q"), array("d")))
+            series[0].insert(0, start)
+            series[1].insert(0, rate)
+        if not observed:
+            return cls(array("q"), {})
+
+        first = min(min(times) for times, _ in observed.values())
+        last = max(max(times) for times, _ in observed.values())
+        if step:
+            origin = start if start is not None else first
+            times = array("q", range(origin, (end or last) + 1, step))
+
+            def locate(series: array) -> List[int]:
+                # первый узел не раньше наблюдения — арифметикой, без поиска
+                return [-(-(t - origin) // step) for t in series]
+        else:
+            times = array(
+                "q", sorted({t for series, _ in observed.values() for t in series})
+            )
+            position = {t: i for i, t in enumerate(times)}
+
+            def locate(series: array) -> List[int]:
+                return [position[t] for t in series]
+        return cls(times, {
+            code: _forward_fill(len(times), locate(series_times), rates)
+            for code, (series_times, rates) in observed.items()
+        })
+
+    def first_valid(self, codes: Iterable[str]) -> int:
+        """Первый узел, где известны курсы всех codes (len(self), если нет)."""
+        index = 0
+        for code in codes:
+            column = self.column(code)
+            while index < len(column) and math.isnan(column[index]):
+                index += 1
+        return index
+
+    def column(self, code: str) -> array:
+        column = self.columns.get(code)
+        if column is None:
+            raise ValueError(f"В истории нет курсов {code}→USD")
+        return column
+
+    def values(
+            self,
+            holdings: Mapping[str, float],
+            lo: int = 0,
+            hi: Optional[int] = None,
+        ) -> array:
+        """Стоимость неизменного набора holdings в узлах [lo, hi)."""
+        hi = len(self.times) if hi is None else hi
+        total = array("d", [0.0]) * (hi - lo)
+        for code, amount in holdings.items():
+            if amount:
+                total = array("d", map(
+                    add, total, map(mul, self.column(code)[lo:hi], repeat(amount))
+                ))
+        return total
+
+
+class BacktestResult:
+    """Стоимость портфеля в USD по узлам сетки и сводные показатели."""
+
+    __slots__ = ("times", "values", "trades_applied")
+
+    def __init__(self, times: array, values: array, trades_applied: int = 0):
+        self.times = times
+        self.values = values
+        self.trades_applied = trades_applied
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def series(self, points: Optional[int] = None) -> List[Tuple[str, float]]:
+        """(время, стоимость); points — равномерная выборка с концами ряда."""
+        indexes = range(len(self.values))
+        if points and len(self.values) > points:
+            last = len(self.values) - 1
+            indexes = sorted({round(i * last / (points - 1)) for i in range(points)})
+        return [
+            (from_seconds(self.times[i]).strftime(TIMESTAMP_FORMAT), self.values[i])
+            for i in indexes
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        values = self.values
+        start, end = values[0], values[-1]
+        returns = [b / a - 1 for a, b in zip(values, values[1:]) if a]
+        peak, max_drawdown = values[0], 0.0
+        for value in values:
+            if value > peak:
+                peak = value
+            elif peak:
+                max_drawdown = max(max_drawdown, 1 - value / peak)
+        span_days = (self.times[-1] - self.times[0]) / 86400
+        total_return = end / start - 1 if start else 0.0
+        annualized = None
+        if span_days >= 1 and start and end > 0:
+            annualized = ((end / start) ** (365 / span_days) - 1) * 100
+        return {
+            "from": from_seconds(self.times[0]).strftime(TIMESTAMP_FORMAT),
+            "to": from_seconds(self.times[-1]).strftime(TIMESTAMP_FORMAT),
+            "points": len(values),
+            "trades": self.trades_applied,
+            "start_value": start,
+            "end_value": end,
+            "min_value": min(values),
+            "max_value": max(values),
+            "total_return_pct": total_return * 100,
+            "annualized_return_pct": annualized,
+            "max_drawdown_pct": max_drawdown * 100,
+            "volatility_pct": _pstdev(returns) * 100,
+        }
+
+
+def run_allocation(
+        grid: RateGrid,
+        holdings: Mapping[str, float],
+    ) -> BacktestResult:
+    """Неизменный набор {код: количество} по всей сетке."""
+    lo = _start_index(grid, holdings)
+    return BacktestResult(grid.times[lo:], grid.values(holdings, lo))
+
+
+def weights_to_holdings(
+        grid: RateGrid,
+        weights: Mapping[str, float],
+        capital: float,
+    ) -> Dict[str, float]:
+    """Доли {код: вес} капитала capital USD → количества по курсам начала."""
+    total_weight = sum(weights.values())
+    if total_weight <= 0:
+        raise ValueError("Сумма весов должна быть положительной")
+    lo = _start_index(grid, weights)
+    return {
+        code: capital * weight / total_weight / grid.column(code)[lo]
+        for code, weight in weights.items()
+    }
+
+
+def run_trades(
+        grid: RateGrid,
+        trades: Iterable[Mapping[str, Any]],
+        initial: Optional[Mapping[str, float]] = None,
+    ) -> BacktestResult:
+    """Повтор сделок {timestamp, currency, side, amount} по историческим курсам.
+
+    Покупка списывает USD по курсу сетки на момент сделки, продажа
+    начисляет; между сделками набор валют неизменен, поэтому стоимость
+    считается отрезками по массивам.
+    """
+    holdings: Dict[str, float] = dict(initial or {})
+    ordered = sorted(
+        (to_seconds(datetime.fromisoformat(t["timestamp"])), t) for t in trades
+    )
+    codes = set(holdings) | {t["currency"] for _, t in ordered}
+    lo = _start_index(grid, codes)
+    times = grid.times
+    values = array("d")
+    position = lo
+    applied = 0
+    for seconds, trade in ordered:
+        index = max(bisect_left(times, seconds), lo)
+        if index >= len(times):
+            break
+        values.extend(grid.values(holdings, position, index))
+        position = index
+        code = trade["currency"]
+        amount = float(trade["amount"])
+        if trade["side"] == "sell":
+            amount = -amount
+        elif trade["side"] != "buy":
+            raise ValueError(f"Сторона сделки: buy или sell, получено {trade['side']}")
+        holdings[code] = holdings.get(code, 0.0) + amount
+        if code != "USD":
+            holdings["USD"] = (
+                holdings.get("USD", 0.0) - amount * grid.column(code)[index]
+            )
+        applied += 1
+    values.extend(grid.values(holdings, position))
+    return BacktestResult(times[lo:], values, applied)
+
+
+def _start_index(grid: RateGrid, codes: Iterable[str]) -> int:
+    if not len(grid):
+        raise ValueError("История курсов пуста. Выполните update-rates.")
+    lo = grid.first_valid(codes)
+    if lo >= len(grid):
+        raise ValueError("Нет момента, когда известны курсы всех валют портфеля")
+    return lo
+
+
+def _pstdev(values: List[float]) -> float:
+    """Стандартное отклонение (statistics.pstdev точен, но медленен на 10⁶)."""
+    if len(values) < 2:
+        return 0.0
+    mean = math.fsum(values) / len(values)
+    return math.sqrt(math.fsum((v - mean) ** 2 for v in values) / len(values))
+
+
+def _forward_fill(size: int, nodes: List[int], rates: array) -> array:
+    """Столбец из size узлов: в каждом последнее наблюдение не позже узла.
+
+    nodes[i] — первый узел не раньше i-го наблюдения (без заглядывания
+    вперёд); из нескольких наблюдений до узла побеждает последнее по
+    времени, поэтому наблюдения применяются в порядке узлов.
+    """
+    column = array("d", [_NAN]) * size
+    if any(a > b for a, b in zip(nodes, nodes[1:])):
+        order = sorted(range(len(nodes)), key=nodes.__getitem__)
+    else:
+        order = range(len(nodes))
+    for i in order:
+        if nodes[i] < size:
+            column[nodes[i]] = rates[i]
+    last = _NAN
+    for index, rate in enumerate(column):
+        if rate != rate:
+            column[index] = last
+        else:
+            last = rate
+    return column
+
+
+def read_trades(path: str) -> List[Dict[str, Any]]:
+    """Сделки из CSV (timestamp,currency,side,amount) или JSON-массива."""
+    if path.lower().endswith(".json"):
+        trades = list(iter_json_array(path))
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            trades = list(csv.DictReader(f))
+    for trade in trades:
+        missing = {"timestamp", "currency", "side", "amount"} - set(trade)
+        if missing:
+            raise ValueError(f"В сделке нет полей: {', '.join(sorted(missing))}")
+        trade["currency"] = trade["currency"].upper()
+    return trades
+
+
+def parse_allocation(value: str) -> Dict[str, float]:
+    """"BTC=0.5,ETH=2" → {"BTC": 0.5, "ETH": 2.0}."""
+    allocation: Dict[str, float] = {}
+    for part in value.split(","):
+        code, sep, amount = part.partition("=")
+        try:
+            if not sep:
+                raise ValueError
+            allocation[code.strip().upper()] = float(amount)
+        except ValueError:
+            raise ValueError(
+                f"Неверный элемент '{part}': ожидается CODE=число"
+            ) from None
+    return allocation
@@ -1,11 +1,47 @@
+import json
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict
+from decimal import ROUND_HALF_EVEN, Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..infra.settings import SettingsLoader
 from .exceptions import CurrencyNotFoundError
 
+CURRENCIES_FILE = "currencies.json"
+# Балансы хранятся в int64 (array "q"): при 9 знаках это до ~9.2e9 единиц
+# валюты, при большей точности реальные суммы перестают помещаться
+MAX_PRECISION = 9
+
+# Используются, если в data_path нет currencies.json
+_DEFAULT_RECORDS: Tuple[Dict[str, Any], ...] = (
+    {"code": "USD", "name": "US Dollar", "type": "fiat",
+     "issuing_country": "United States"},
+    {"code": "EUR", "name": "Euro", "type": "fiat", "issuing_country": "Eurozone"},
+    {"code": "GBP", "name": "Pound Sterling", "type": "fiat",
+     "issuing_country": "United Kingdom"},
+    {"code": "RUB", "name": "Russian Ruble", "type": "fiat",
+     "issuing_country": "Russia"},
+    {"code": "BTC", "name": "Bitcoin", "type": "crypto", "algorithm": "SHA-256",
+     "market_cap": 1.12e12},
+    {"code": "ETH", "name": "Ethereum", "type": "crypto", "algorithm": "Ethash",
+     "market_cap": 4.50e11},
+    {"code": "SOL", "name": "Solana", "type": "crypto", "algorithm": "Tower BFT",
+     "market_cap": 7.0e10},
+)
+
 
 class Currency(ABC):
-    def __init__(self, name: str, code: str):
+    """Неизменяемая запись реестра валют.
+
+    Каждому коду соответствует один объект (сравнение по идентичности
+    корректно), index — плотный номер в реестре (0..N-1), пригодный для
+    адресации массивов курсов и балансов.
+    """
+
+    __slots__ = ("name", "code", "precision", "index")
+
+    def __init__(self, name: str, code: str, precision: int = 2):
         if not name or not isinstance(name, str):
             raise ValueError("name не может быть пустой строкой")
         if (
@@ -17,39 +53,86 @@ class Currency(ABC):
             or ' ' in code
             ):
             raise ValueError("code — верхний регистр, 2–5 символов, без пробелов")
-        self.name = name  # человекочитаемое имя (например, "US Dollar", "Bitcoin")
-        self.code = code  # ISO-код или общепринятый тикер ("USD", "EUR", "BTC", "ETH")
+        if (
+            not isinstance(precision, int)
+            or isinstance(precision, bool)
+            or not 0 <= precision <= MAX_PRECISION
+        ):
+            raise ValueError(f"precision — целое число от 0 до {MAX_PRECISION}")
+        # человекочитаемое имя (например, "US Dollar", "Bitcoin")
+        object.__setattr__(self, "name", name)
+        # ISO-код или общепринятый тикер ("USD", "EUR", "BTC", "ETH")
+        object.__setattr__(self, "code", code)
+        # знаков после запятой в минимальной единице
+        object.__setattr__(self, "precision", precision)
+        # номер в реестре; -1 до регистрации
+        object.__setattr__(self, "index", -1)
 
-    @abstractmethod
-    def get_display_info(self) -> str:
-        pass
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Валюта {self.code} неизменяема")
 
-_CURRENCIES_REGISTRY: Dict[str, Currency] = {}
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Валюта {self.code} неизменяема")
 
-def register_currency(currency: Currency):
-    _CURRENCIES_REGISTRY[currency.code] = currency
+    def __reduce__(self):
+        # при распаковке (в т.ч. в другом процессе) берётся объект из реестра
+        return get_currency, (self.code,)
 
-def get_currency(code: str) -> Currency:
-    code = code.upper()
-    if code not in _CURRENCIES_REGISTRY:
-        raise CurrencyNotFoundError(code)
-    return _CURRENCIES_REGISTRY[code]
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.code!r}, index={self.index})"
+
+    @property
+    def scale(self) -> int:
+        """Число минимальных единиц в одной единице валюты."""
+        return 10 ** self.precision
+
+    def to_units(self, amount: float) -> int:
+        """Сумма → целое число минимальных единиц (банковское округление)."""
+        quantum = Decimal(1).scaleb(-self.precision)
+        value = Decimal(str(amount)).quantize(quantum, rounding=ROUND_HALF_EVEN)
+        return int(value.scaleb(self.precision))
+
+    def from_units(self, units: int) -> float:
+        """Целое число минимальных единиц → сумма (только для вывода и курсов)."""
+        return units / self.scale
+
+    @abstractmethod
+    def get_display_info(self) -> str:
+        pass
 
 class FiatCurrency(Currency):
-    def __init__(self, name: str, code: str, issuing_country: str):
-        super().__init__(name, code)
-        self.issuing_country = issuing_country  # страна эмиссии
+    __slots__ = ("issuing_country",)
+
+    def __init__(
+            self,
+            name: str,
+            code: str,
+            issuing_country: str,
+            precision: int = 2,
+        ):
+        super().__init__(name, code, precision)
+        object.__setattr__(self, "issuing_country", issuing_country)  # страна эмиссии
 
     def get_display_info(self) -> str:
         return f"[FIAT] {self.code} — {self.name} (Issuing: {self.issuing_country})"
 
 class CryptoCurrency(Currency):
-    def __init__(self, name: str, code: str, algorithm: str, market_cap: float):
-        super().__init__(name, code)
-        self.algorithm = algorithm    # алгоритм
+    __slots__ = ("algorithm", "market_cap")
+
+    def __init__(
+            self,
+            name: str,
+            code: str,
+            algorithm: str,
+            market_cap: float,
+            precision: int = 8,
+        ):
+        super().__init__(name, code, precision)
         if market_cap < 0:
             raise ValueError("market_cap не может быть отрицательным")
-        self.market_cap = market_cap  # последняя известная капитализация
+        object.__setattr__(self, "algorithm", algorithm)  # алгоритм
+        # последняя известная капитализация
+        object.__setattr__(self, "market_cap", market_cap)
 
     def get_display_info(self) -> str:
         return (
@@ -57,11 +140,113 @@ class CryptoCurrency(Currency):
             f"(Algo: {self.algorithm}, MCAP: {self.market_cap:.2e})"
         )
 
-# Инициализация реестра
-register_currency(FiatCurrency("US Dollar", "USD", "United States"))
-register_currency(FiatCurrency("Euro", "EUR", "Eurozone"))
-register_currency(FiatCurrency("Pound Sterling", "GBP", "United Kingdom"))
-register_currency(FiatCurrency("Russian Ruble", "RUB", "Russia"))
-register_currency(CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1.12e12))
-register_currency(CryptoCurrency("Ethereum", "ETH", "Ethash", 4.50e11))
-register_currency(CryptoCurrency("Solana", "SOL", "Tower BFT", 7.0e10))
+# Плотный список по index и таблица поиска: код в верхнем и нижнем регистре
+_CURRENCIES: List[Currency] = []
+_LOOKUP: Dict[str, Currency] = {}
+_registry_loaded = False
+_registry_lock = threading.Lock()
+
+def register_currency(currency: Currency) -> Currency:
+    """Добавляет валюту в реестр и присваивает ей следующий index."""
+    if not _registry_loaded:
+        _init_registry()
+    with _registry_lock:
+        return _register(currency)
+
+def _register(
+        currency: Currency,
+        currencies: Optional[List[Currency]] = None,
+        lookup: Optional[Dict[str, Currency]] = None,
+    ) -> Currency:
+    """Добавляет валюту в переданные таблицы (по умолчанию — в реестр)."""
+    if currencies is None:
+        currencies = _CURRENCIES
+    if lookup is None:
+        lookup = _LOOKUP
+    if currency.code in lookup:
+        raise ValueError(f"Валюта {currency.code} уже зарегистрирована")
+    object.__setattr__(currency, "index", len(currencies))
+    currencies.append(currency)
+    lookup[currency.code] = currency
+    lookup[currency.code.lower()] = currency
+    return currency
+
+def get_currency(code: str) -> Currency:
+    """Валюта по коду без учёта регистра и пробелов по краям."""
+    if not _registry_loaded:
+        _init_registry()
+    currency = _LOOKUP.get(code)
+    if currency is None:
+        if not isinstance(code, str):
+            raise CurrencyNotFoundError(str(code))
+        currency = _LOOKUP.get(code.strip().upper())
+        if currency is None:
+            raise CurrencyNotFoundError(code)
+    return currency
+
+def find_currency(code: str) -> Optional[Currency]:
+    """Как get_currency, но None для неизвестного кода."""
+    try:
+        return get_currency(code)
+    except CurrencyNotFoundError:
+        return None
+
+def currency_index(code: str) -> int:
+    """Плотный номер валюты в реестре."""
+    return get_currency(code).index
+
+def currency_by_index(index: int) -> Currency:
+    if not _registry_loaded:
+        _init_registry()
+    return _CURRENCIES[index]
+
+def all_currencies() -> Tuple[Currency, ...]:
+    """Все валюты реестра в порядке index."""
+    if not _registry_loaded:
+        _init_registry()
+    return tuple(_CURRENCIES)
+
+def currency_from_record(data: Dict[str, Any]) -> Currency:
+    """Запись currencies.json → FiatCurrency или CryptoCurrency."""
+    kind = data.get("type")
+    if kind == "fiat":
+        return FiatCurrency(
+            data["name"],
+            data["code"],
+            data.get("issuing_country", ""),
+            data.get("precision", 2),
+        )
+    if kind == "crypto":
+        return CryptoCurrency(
+            data["name"],
+            data["code"],
+            data.get("algorithm", ""),
+            data.get("market_cap", 0.0),
+            data.get("precision", 8),
+        )
+    raise ValueError(f"Неизвестный тип валюты '{kind}' для {data.get('code')}")
+
+def _load_records() -> List[Dict[str, Any]]:
+    path = Path(SettingsLoader().get("data_path", "data")) / CURRENCIES_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return list(_DEFAULT_RECORDS)
+
+def _init_registry():
+    """Загрузка реестра из currencies.json (выполняется при первом обращении)."""
+    global _registry_loaded
+    with _registry_lock:
+        if _registry_loaded:
+            return
+        # реестр собирается в локальных таблицах и публикуется целиком:
+        # ошибка в любой записи не оставляет в нём половину валют
+        currencies: List[Currency] = []
+        lookup: Dict[str, Currency] = {}
+        for data in _load_records():
+            _register(currency_from_record(data), currencies, lookup)
+        _CURRENCIES[:] = currencies
+        _LOOKUP.clear()
+        _LOOKUP.update(lookup)
+        _registry_loaded = True
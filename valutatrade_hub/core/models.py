@@ -1,14 +1,28 @@
 import hashlib
+import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set
 
 from .currencies import Currency, get_currency
 from .exceptions import InsufficientFundsError
 
+logger = logging.getLogger("ValutaTrade")
+
+# Валюты, по которым уже предупреждали об округлении старых балансов
+_rounding_warned: Set[str] = set()
+
 
 class User:
     """Класс пользователя системы с хранением зашифрованного пароля."""
 
+    __slots__ = (
+        "_user_id",
+        "_username",
+        "_hashed_password",
+        "_salt",
+        "_registration_date",
+    )
+
     def __init__(
             self,
             user_id: int,
@@ -89,39 +103,78 @@ class User:
         )
 
 
+def _rescale_units(units: int, stored: int, precision: int, code: str) -> int:
+    """Единицы, записанные в точности stored, → единицы текущей точности.
+
+    Увеличение точности всегда точно; уменьшение допускается, только если
+    отбрасываемые знаки нулевые, иначе часть баланса потерялась бы.
+    """
+    if not isinstance(stored, int) or stored < 0:
+        raise ValueError(f"Некорректная точность {stored!r} для баланса {code}")
+    if stored < precision:
+        return units * 10 ** (precision - stored)
+    factor = 10 ** (stored - precision)
+    if units % factor:
+        raise ValueError(
+            f"Баланс {code} записан с точностью {stored} и не представим "
+            f"с точностью {precision} без потерь"
+        )
+    return units // factor
+
+
 class Wallet:
-    """Кошелёк для одной валюты с балансом и операциями."""
+    """Кошелёк для одной валюты.
+
+    Баланс хранится целым числом минимальных единиц валюты (точность задаёт
+    Currency.precision); в float он переводится только на границах —
+    при выводе и расчётах по курсу.
+    """
+
+    __slots__ = ("_currency", "_units")
 
     def __init__(self, currency_code: str, balance: float = 0.0):
-        """Инициализация с интеграцией Currency."""
-        self.currency: Currency = get_currency(currency_code)
-        self._balance = balance
+        """Инициализация; объект Currency берётся из реестра один раз."""
+        self._currency = get_currency(currency_code)
+        self._units = self._currency.to_units(balance) if balance else 0
+
+    @classmethod
+    def from_units(cls, currency_code: str, units: int) -> 'Wallet':
+        """Кошелёк с балансом в минимальных единицах."""
+        wallet = cls(currency_code)
+        wallet._units = int(units)
+        return wallet
+
+    @property
+    def currency(self) -> Currency:
+        return self._currency
+
+    @property
+    def currency_code(self) -> str:
+        return self._currency.code
 
     def deposit(self, amount: float) -> None:
         """Пополнение баланса."""
-        if amount <= 0:
-            raise ValueError("Сумма должна быть положительным числом")
-        if not isinstance(amount, (int, float)):
-            raise ValueError("Сумма должна быть числом")
-        self._balance += amount
+        self._units += self._amount_to_units(amount)
 
     def withdraw(self, amount: float) -> None:
         """Снятие средств с проверкой баланса."""
-        if amount <= 0:
-            raise ValueError("Сумма должна быть положительным числом")
-        if not isinstance(amount, (int, float)):
-            raise ValueError("Сумма должна быть числом")
-        if amount > self._balance:
-            raise InsufficientFundsError(self._balance, amount, self.currency.code)
-        self._balance -= amount
+        units = self._amount_to_units(amount)
+        if units > self._units:
+            raise InsufficientFundsError(self.balance, amount, self.currency_code)
+        self._units -= units
 
     def get_balance_info(self) -> str:
         """Информация о балансе."""
-        return f"{self.currency.get_display_info()}: {self._balance:.4f}"
+        return f"{self._currency.get_display_info()}: {self.balance:.4f}"
+
+    @property
+    def units(self) -> int:
+        """Баланс в минимальных единицах валюты."""
+        return self._units
 
     @property
     def balance(self) -> float:
-        return self._balance
+        return self._currency.from_units(self._units)
 
     @balance.setter
     def balance(self, value: float) -> None:
@@ -130,26 +183,73 @@ class Wallet:
             raise ValueError("Баланс должен быть числом")
         if value < 0:
             raise ValueError("Баланс не может быть отрицательным")
-        self._balance = value
+        self._units = self._currency.to_units(value)
 
     def to_dict(self) -> Dict[str, Any]:
-        """Сериализация."""
+        """Сериализация: точный баланс в единицах и float для старых читателей.
+
+        Рядом с единицами записывается точность, в которой они посчитаны:
+        без неё смена precision в currencies.json молча меняла бы балансы.
+        """
         return {
-            "currency_code": self.currency.code,
-            "balance": self._balance
+            "currency_code": self.currency_code,
+            "balance": self.balance,
+            "balance_units": self._units,
+            "precision": self._currency.precision,
         }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Wallet':
-        """Десериализация."""
-        currency_code = data.get("currency_code")
+        """Десериализация (понимает и старый формат с float-балансом)."""
+        return cls._from_stored(data.get("currency_code"), data)
+
+    @classmethod
+    def _from_stored(cls, currency_code: str, data: Dict[str, Any]) -> 'Wallet':
+        if "balance_units" in data:
+            units = int(data["balance_units"])
+            precision = get_currency(currency_code).precision
+            # записи без поля "precision" сделаны до его появления,
+            # в текущей точности валюты
+            stored = data.get("precision", precision)
+            if stored != precision:
+                units = _rescale_units(units, stored, precision, currency_code)
+            return cls.from_units(currency_code, units)
         balance = float(data.get("balance", 0.0))
-        return cls(currency_code, balance)
+        wallet = cls(currency_code, balance)
+        if wallet.balance != balance:
+            # старый float-баланс точнее валюты: после сохранения останется
+            # округлённое значение; полный просмотр portfolios.json даёт
+            # такие балансы тысячами, поэтому warning — раз на валюту
+            code = wallet.currency_code
+            message = (
+                f"Legacy balance {balance!r} {code} rounded to "
+                f"{wallet.balance!r} (precision {wallet.currency.precision})"
+            )
+            if code in _rounding_warned:
+                logger.debug(message)
+            else:
+                _rounding_warned.add(code)
+                logger.warning(f"{message}; further {code} roundings at DEBUG")
+        return wallet
+
+    def _amount_to_units(self, amount: float) -> int:
+        if amount <= 0:
+            raise ValueError("Сумма должна быть положительным числом")
+        if not isinstance(amount, (int, float)):
+            raise ValueError("Сумма должна быть числом")
+        units = self._currency.to_units(amount)
+        if units == 0:
+            raise ValueError(
+                f"Сумма меньше минимальной единицы {self.currency_code}"
+            )
+        return units
 
 
 class Portfolio:
     """Портфель пользователя с набором кошельков."""
 
+    __slots__ = ("_user", "_wallets")
+
     def __init__(self, user: User):
         """Инициализация с USD по умолчанию."""
         self._user = user
@@ -160,6 +260,7 @@ class Portfolio:
         """Добавление нового кошелька."""
         if currency_code in self._wallets:
             raise ValueError(f"Кошелёк {currency_code} уже существует")
+        get_currency(currency_code)
         self._wallets[currency_code] = Wallet(currency_code)
 
     def get_wallet(self, currency_code: str) -> Optional[Wallet]:
@@ -203,11 +304,20 @@ class Portfolio:
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any], user: User) -> 'Portfolio':
-        """Десериализация."""
-        portfolio = cls(user)
-        for code, w_data in data.get("wallets", {}).items():
+        """Десериализация (кошелёк USD создаётся, только если его нет в данных)."""
+        wallets_data = data.get("wallets", {})
+        wallets: Dict[str, Wallet] = {}
+        if "USD" not in wallets_data:
+            wallets["USD"] = Wallet("USD")
+        for code, w_data in wallets_data.items():
             currency_code = w_data.get("currency_code", code)
-            balance = float(w_data.get("balance", 0.0))
-            wallet = Wallet(currency_code, balance)
-            portfolio._wallets[code] = wallet
+            wallets[code] = Wallet._from_stored(currency_code, w_data)
+        return cls._from_wallets(user, wallets)
+
+    @classmethod
+    def _from_wallets(cls, user: User, wallets: Dict[str, Wallet]) -> 'Portfolio':
+        """Сборка портфеля из готовых кошельков, минуя __init__."""
+        portfolio = cls.__new__(cls)
+        portfolio._user = user
+        portfolio._wallets = wallets
         return portfolio
@@ -0,0 +1,226 @@
+import itertools
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ORDER_SIDES = ("buy", "sell")
+ORDER_KINDS = ("limit", "stop")
+ORDER_STATUSES = ("open", "filled", "rejected", "cancelled")
+
+# Направление срабатывания: курс опустился до цены или поднялся до неё
+BELOW = "below"
+ABOVE = "above"
+
+
+def trigger_direction(side: str, kind: str) -> str:
+    """buy limit и sell stop срабатывают при падении курса, остальные — при росте."""
+    if (side, kind) in (("buy", "limit"), ("sell", "stop")):
+        return BELOW
+    return ABOVE
+
+
+class Order:
+    """Отложенный ордер на пару CODE_USD."""
+
+    __slots__ = (
+        "order_id",
+        "user_id",
+        "currency",
+        "side",
+        "kind",
+        "price",
+        "amount",
+        "status",
+        "created_at",
+        "updated_at",
+        "fill_rate",
+        "error",
+    )
+
+    def __init__(
+            self,
+            order_id: int,
+            user_id: int,
+            currency: str,
+            side: str,
+            kind: str,
+            price: float,
+            amount: float,
+            status: str = "open",
+            created_at: Optional[str] = None,
+            updated_at: Optional[str] = None,
+            fill_rate: Optional[float] = None,
+            error: Optional[str] = None,
+        ):
+        if side not in ORDER_SIDES:
+            raise ValueError("Сторона ордера: buy или sell")
+        if kind not in ORDER_KINDS:
+            raise ValueError("Тип ордера: limit или stop")
+        if price <= 0:
+            raise ValueError("'price' должен быть положительным числом")
+        if amount <= 0:
+            raise ValueError("'amount' должен быть положительным числом")
+        self.order_id = order_id
+        self.user_id = user_id
+        self.currency = currency
+        self.side = side
+        self.kind = kind
+        self.price = price
+        self.amount = amount
+        self.status = status
+        self.created_at = created_at or datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.updated_at = updated_at
+        self.fill_rate = fill_rate
+        self.error = error
+
+    @property
+    def direction(self) -> str:
+        return trigger_direction(self.side, self.kind)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == "open"
+
+    def close(
+            self,
+            status: str,
+            fill_rate: Optional[float] = None,
+            error: Optional[str] = None,
+        ) -> None:
+        self.status = status
+        self.fill_rate = fill_rate
+        self.error = error
+        self.updated_at = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Order':
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+
+class _TriggerIndex:
+    """Пороги срабатывания одной пары и направления в отсортированных массивах.
+
+    Ключи хранятся так, что сработавшие ордера всегда образуют хвост:
+    для BELOW ключ — цена (срабатывают цены ≥ курса), для ABOVE — цена со
+    знаком минус (срабатывают цены ≤ курса). Поиск хвоста — bisect, удаление
+    хвоста — срез, итого O(log n + k).
+    """
+
+    __slots__ = ("_keys", "_ids")
+
+    def __init__(self):
+        self._keys = array("d")
+        self._ids = array("q")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: float, order_id: int) -> None:
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._ids.insert(index, order_id)
+
+    def extend(self, entries: Iterable[Tuple[float, int]]) -> None:
+        """Пакетная загрузка: одна сортировка вместо вставок по одному."""
+        merged = sorted(itertools.chain(zip(self._keys, self._ids), entries))
+        self._keys = array("d", (key for key, _ in merged))
+        self._ids = array("q", (order_id for _, order_id in merged))
+
+    def remove(self, key: float, order_id: int) -> bool:
+        index = bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            if self._ids[index] == order_id:
+                del self._keys[index]
+                del self._ids[index]
+                return True
+            index += 1
+        return False
+
+    def pop_from(self, key: float) -> array:
+        """Удаляет и возвращает id всех ордеров с ключом ≥ key."""
+        index = bisect_left(self._keys, key)
+        crossed = self._ids[index:]
+        del self._keys[index:]
+        del self._ids[index:]
+        return crossed
+
+
+class OrderBook:
+    """Открытые ордера, проиндексированные по порогу срабатывания.
+
+    На каждую пару два индекса (BELOW и ABOVE); при обновлении курса
+    просматриваются только пересечённые пороги.
+    """
+
+    __slots__ = ("_orders", "_indexes")
+
+    def __init__(self):
+        self._orders: Dict[int, Order] = {}
+        self._indexes: Dict[Tuple[str, str], _TriggerIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: int) -> Optional[Order]:
+        return self._orders.get(order_id)
+
+    def add(self, order: Order) -> None:
+        if not order.is_open:
+            return
+        self._orders[order.order_id] = order
+        self._index(order.currency, order.direction).add(
+            _key(order.direction, order.price), order.order_id
+        )
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        """Пакетное добавление (загрузка из файла)."""
+        entries: Dict[Tuple[str, str], List[Tuple[float, int]]] = {}
+        for order in orders:
+            if not order.is_open:
+                continue
+            self._orders[order.order_id] = order
+            entries.setdefault((order.currency, order.direction), []).append(
+                (_key(order.direction, order.price), order.order_id)
+            )
+        for (currency, direction), batch in entries.items():
+            self._index(currency, direction).extend(batch)
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        order = self._orders.pop(order_id, None)
+        if order is not None:
+            self._index(order.currency, order.direction).remove(
+                _key(order.direction, order.price), order_id
+            )
+        return order
+
+    def crossed(self, currency: str, rate: float) -> List[Order]:
+        """Снимает с книги и возвращает ордера, сработавшие при курсе rate."""
+        triggered: List[Order] = []
+        for direction in (BELOW, ABOVE):
+            index = self._indexes.get((currency, direction))
+            if index is None:
+                continue
+            for order_id in index.pop_from(_key(direction, rate)):
+                triggered.append(self._orders.pop(order_id))
+        triggered.sort(key=lambda order: order.order_id)
+        return triggered
+
+    def user_orders(self, user_id: int) -> List[Order]:
+        return [order for order in self._orders.values() if order.user_id == user_id]
+
+    def _index(self, currency: str, direction: str) -> _TriggerIndex:
+        index = self._indexes.get((currency, direction))
+        if index is None:
+            index = self._indexes[(currency, direction)] = _TriggerIndex()
+        return index
+
+
+def _key(direction: str, price: float) -> float:
+    return price if direction == BELOW else -price
@@ -0,0 +1,177 @@
+from typing import Any, Callable, Optional, Set, Tuple, TypeVar
+
+from ..infra.database import DatabaseManager
+from .models import Portfolio, User
+
+USERS_FILE = "users.json"
+PORTFOLIOS_FILE = "portfolios.json"
+
+T = TypeVar("T")
+
+
+class UserSession:
+    """Сессия вошедшего пользователя с портфелем в памяти.
+
+    Изменения кошельков помечаются как «грязные» и записываются методом
+    flush() — на диск попадают только изменённые кошельки. Чтение идёт из
+    памяти; revalidate() сверяет отпечатки файлов и перечитывает данные,
+    если их изменил другой процесс.
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            user: User,
+            portfolio: Portfolio,
+            has_wallets: bool,
+        ):
+        self._db = db
+        self._user = user
+        self._portfolio = portfolio
+        self._has_wallets = has_wallets
+        self._dirty: Set[str] = set()
+        self._users_signature: Optional[Tuple[Any, ...]] = db.signature(USERS_FILE)
+        self._portfolios_signature: Optional[Tuple[Any, ...]] = db.signature(
+            PORTFOLIOS_FILE
+        )
+
+    @classmethod
+    def load(cls, db: DatabaseManager, user_id: int) -> 'UserSession':
+        """Загрузка пользователя и его портфеля с диска."""
+        user = cls._load_user(db, user_id)
+        return cls(db, user, *cls._load_portfolio(db, user))
+
+    @property
+    def user(self) -> User:
+        return self._user
+
+    @property
+    def user_id(self) -> int:
+        return self._user.user_id
+
+    @property
+    def portfolio(self) -> Portfolio:
+        return self._portfolio
+
+    @property
+    def is_empty(self) -> bool:
+        """Портфель ещё не сохранял ни одного кошелька."""
+        return not self._has_wallets and not self._dirty
+
+    @property
+    def dirty(self) -> Set[str]:
+        """Коды кошельков, изменённых после последней записи."""
+        return set(self._dirty)
+
+    def mark_dirty(self, currency_code: str) -> None:
+        self._dirty.add(currency_code.upper())
+
+    def apply(
+            self,
+            currency_code: str,
+            change: Callable[[Portfolio], T],
+            commit: Optional[Callable[[], Any]] = None,
+        ) -> T:
+        """Изменение кошелька функцией change с немедленной записью.
+
+        Если change или flush() завершились ошибкой, кошелёк возвращается
+        в прежнее состояние (созданный change кошелёк удаляется), и память
+        не расходится с диском. commit вызывается после записи; если он
+        поднял исключение, прежний кошелёк записывается обратно.
+        """
+        code = currency_code.upper()
+        wallet = self._portfolio.get_wallet(code)
+        previous_units = None if wallet is None else wallet.units
+        was_dirty = code in self._dirty
+
+        def restore() -> None:
+            if wallet is None:
+                self._portfolio._wallets.pop(code, None)
+            else:
+                self._portfolio._wallets[code] = wallet
+                wallet._units = previous_units
+
+        try:
+            result = change(self._portfolio)
+            self.mark_dirty(code)
+            self.flush()
+        except BaseException:
+            restore()
+            if not was_dirty:
+                self._dirty.discard(code)
+            raise
+        if commit is not None:
+            try:
+                commit()
+            except BaseException:
+                restore()
+                self.mark_dirty(code)
+                self.flush()
+                raise
+        return result
+
+    def revalidate(self) -> bool:
+        """Перечитывает данные, изменённые на диске другим процессом.
+
+        Несохранённые изменения не затираются. Возвращает True, если
+        состояние сессии было обновлено.
+        """
+        reloaded = False
+        users_signature = self._db.signature(USERS_FILE)
+        if users_signature != self._users_signature:
+            self._user = self._load_user(self._db, self.user_id)
+            self._users_signature = users_signature
+            reloaded = True
+        portfolios_signature = self._db.signature(PORTFOLIOS_FILE)
+        if (
+            not self._dirty
+            and (reloaded or portfolios_signature != self._portfolios_signature)
+        ):
+            self._portfolio, self._has_wallets = self._load_portfolio(
+                self._db, self._user
+            )
+            self._portfolios_signature = portfolios_signature
+            reloaded = True
+        return reloaded
+
+    def flush(self) -> None:
+        """Записывает на диск только изменённые кошельки.
+
+        Файл перечитывается под файловой блокировкой, поэтому изменения
+        других пользователей, сделанные параллельно, не теряются.
+        """
+        if not self._dirty:
+            return
+        with self._db.file_lock(PORTFOLIOS_FILE):
+            data = self._db.load(PORTFOLIOS_FILE)
+            record = next(
+                (item for item in data if item.get("user_id") == self.user_id), None
+            )
+            if record is None:
+                raise ValueError(f"Элемент с ID {self.user_id} не найден")
+            wallets = record.setdefault("wallets", {})
+            for code in self._dirty:
+                wallet = self._portfolio.get_wallet(code)
+                if wallet is None:
+                    wallets.pop(code, None)
+                else:
+                    wallets[code] = wallet.to_dict()
+            self._db.save(PORTFOLIOS_FILE, data)
+            self._portfolios_signature = self._db.signature(PORTFOLIOS_FILE)
+        self._dirty.clear()
+        self._has_wallets = bool(wallets)
+
+    @staticmethod
+    def _load_user(db: DatabaseManager, user_id: int) -> User:
+        user_data = db.find_by_id(USERS_FILE, "user_id", user_id)
+        if not user_data:
+            raise ValueError("Пользователь не найден")
+        return User.from_dict(user_data)
+
+    @staticmethod
+    def _load_portfolio(
+            db: DatabaseManager,
+            user: User,
+        ) -> Tuple[Portfolio, bool]:
+        port_data = db.find_by_id(PORTFOLIOS_FILE, "user_id", user.user_id) or {}
+        return Portfolio.from_dict(port_data, user), bool(port_data.get("wallets"))
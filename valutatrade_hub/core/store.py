@@ -0,0 +1,232 @@
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .currencies import currency_by_index, get_currency
+from .models import Portfolio, User, Wallet
+
+# Отсутствующий кошелёк (в отличие от кошелька с нулевым балансом)
+_ABSENT = -(2 ** 63)
+
+
+class _StoredWallet(Wallet):
+    """Кошелёк-представление: баланс читается и пишется в ячейку PortfolioStore."""
+
+    __slots__ = ("_column", "_row")
+
+    def __init__(self, currency_code: str, column: array, row: int):
+        self._currency = get_currency(currency_code)
+        self._column = column
+        self._row = row
+
+    @property
+    def _units(self) -> int:
+        return self._column[self._row]
+
+    @_units.setter
+    def _units(self, value: int) -> None:
+        self._column[self._row] = value
+
+
+class _StoredPortfolio(Portfolio):
+    """Портфель-представление над строкой PortfolioStore."""
+
+    __slots__ = ("_store", "_row")
+
+    def add_currency(self, currency_code: str) -> None:
+        """Добавление кошелька: ячейка строки получает нулевой баланс."""
+        if currency_code in self._wallets:
+            raise ValueError(f"Кошелёк {currency_code} уже существует")
+        get_currency(currency_code)
+        column = self._store._column(currency_code, create=True)
+        column[self._row] = 0
+        self._wallets[currency_code] = _StoredWallet(currency_code, column, self._row)
+
+
+class PortfolioStore:
+    """Компактное хранилище портфелей.
+
+    Балансы лежат в массивах int64 (минимальные единицы валюты) — по одному
+    на валюту, столбец адресуется её Currency.index (None, пока кошельков
+    этой валюты нет); строка массива соответствует пользователю. Отсутствующий
+    кошелёк хранится как минимальное значение int64. Строки только
+    добавляются, поэтому представления остаются валидными.
+    """
+
+    __slots__ = ("_columns", "_user_ids", "_sorted", "_row_index")
+
+    def __init__(self):
+        self._columns: List[Optional[array]] = []
+        self._user_ids = array("q")
+        self._sorted = True
+        self._row_index: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._user_ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.row_of(user_id) is not None
+
+    @property
+    def codes(self) -> List[str]:
+        """Коды валют в порядке индексов столбцов."""
+        return [code for code, _ in self._present_columns()]
+
+    def add_user(self, user_id: int) -> int:
+        """Добавляет пустую строку для пользователя и возвращает её номер."""
+        if user_id in self:
+            raise ValueError(f"Портфель пользователя {user_id} уже существует")
+        if self._user_ids and user_id < self._user_ids[-1]:
+            self._sorted = False
+        self._user_ids.append(user_id)
+        for column in self._columns:
+            if column is not None:
+                column.append(_ABSENT)
+        if self._row_index is not None:
+            self._row_index[user_id] = len(self._user_ids) - 1
+        return len(self._user_ids) - 1
+
+    def row_of(self, user_id: int) -> Optional[int]:
+        """Номер строки пользователя (бинарный поиск по отсортированным id)."""
+        if self._sorted:
+            row = bisect_left(self._user_ids, user_id)
+            if row < len(self._user_ids) and self._user_ids[row] == user_id:
+                return row
+            return None
+        if self._row_index is None:
+            self._row_index = {uid: row for row, uid in enumerate(self._user_ids)}
+        return self._row_index.get(user_id)
+
+    def holders(self, currency_code: str) -> Iterator[Tuple[int, int]]:
+        """Пары (user_id, баланс в минимальных единицах) с ненулевым балансом."""
+        column = self._column(currency_code)
+        if column is None:
+            return
+        for user_id, units in zip(self._user_ids, column):
+            if units and units != _ABSENT:
+                yield user_id, units
+
+    def get_units(self, user_id: int, currency_code: str) -> Optional[int]:
+        """Баланс кошелька в минимальных единицах или None, если кошелька нет."""
+        row = self._require_row(user_id)
+        column = self._column(currency_code)
+        if column is None or column[row] == _ABSENT:
+            return None
+        return column[row]
+
+    def set_units(self, user_id: int, currency_code: str, units: int) -> None:
+        row = self._require_row(user_id)
+        self._column(currency_code, create=True)[row] = units
+
+    def get_balance(self, user_id: int, currency_code: str) -> Optional[float]:
+        """Баланс кошелька или None, если кошелька нет."""
+        units = self.get_units(user_id, currency_code)
+        if units is None:
+            return None
+        return get_currency(currency_code).from_units(units)
+
+    def set_balance(self, user_id: int, currency_code: str, balance: float) -> None:
+        units = get_currency(currency_code).to_units(balance)
+        self.set_units(user_id, currency_code, units)
+
+    def total_units(self, currency_code: str) -> int:
+        """Точная сумма балансов валюты по всем пользователям."""
+        column = self._column(currency_code)
+        if column is None:
+            return 0
+        return sum(column) - _ABSENT * column.count(_ABSENT)
+
+    def total(self, currency_code: str) -> float:
+        return get_currency(currency_code).from_units(self.total_units(currency_code))
+
+    def total_value(self, rates: Mapping[str, float]) -> float:
+        """Суммарная стоимость всех портфелей по курсам {код: курс к базе}.
+
+        Суммы по валютам считаются точно в целых единицах, в float переводится
+        только итог по каждой валюте.
+        """
+        return sum(
+            self.total(code) * rate
+            for code, rate in rates.items()
+            if self._column(code) is not None
+        )
+
+    def values(self, rates: Mapping[str, float]) -> array:
+        """Стоимость портфеля каждой строки по курсам {код: курс к базе}."""
+        result = array("d", [0.0]) * len(self._user_ids)
+        for code, rate in rates.items():
+            column = self._column(code)
+            if column is None:
+                continue
+            factor = rate / get_currency(code).scale
+            for row, units in enumerate(column):
+                if units != _ABSENT:
+                    result[row] += units * factor
+        return result
+
+    def portfolio(self, user: User) -> Portfolio:
+        """Лёгкое представление Portfolio над строкой пользователя."""
+        row = self._require_row(user.user_id)
+        wallets: Dict[str, Wallet] = {}
+        usd = self._column("USD")
+        if usd is None or usd[row] == _ABSENT:
+            self.set_units(user.user_id, "USD", 0)
+        for code, column in self._present_columns():
+            if column[row] != _ABSENT:
+                wallets[code] = _StoredWallet(code, column, row)
+        portfolio = _StoredPortfolio._from_wallets(user, wallets)
+        portfolio._store = self
+        portfolio._row = row
+        return portfolio
+
+    def load_record(self, data: Dict[str, Any]) -> int:
+        """Добавляет запись формата portfolios.json (старого или нового)."""
+        user_id = data["user_id"]
+        row = self.add_user(user_id)
+        for code, w_data in data.get("wallets", {}).items():
+            currency_code = w_data.get("currency_code", code)
+            wallet = Wallet._from_stored(currency_code, w_data)
+            self._column(currency_code, create=True)[row] = wallet.units
+        return row
+
+    def to_record(self, user_id: int) -> Dict[str, Any]:
+        """Запись формата portfolios.json для пользователя."""
+        row = self._require_row(user_id)
+        wallets = {}
+        for code, column in self._present_columns():
+            units = column[row]
+            if units != _ABSENT:
+                wallets[code] = Wallet.from_units(code, units).to_dict()
+        return {"user_id": user_id, "wallets": wallets}
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for user_id in self._user_ids:
+            yield self.to_record(user_id)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'PortfolioStore':
+        store = cls()
+        for data in records:
+            store.load_record(data)
+        return store
+
+    def _require_row(self, user_id: int) -> int:
+        row = self.row_of(user_id)
+        if row is None:
+            raise ValueError(f"Элемент с ID {user_id} не найден")
+        return row
+
+    def _column(self, currency_code: str, create: bool = False) -> Optional[array]:
+        index = get_currency(currency_code).index
+        column = self._columns[index] if index < len(self._columns) else None
+        if column is None and create:
+            if index >= len(self._columns):
+                self._columns.extend([None] * (index + 1 - len(self._columns)))
+            column = array("q", [_ABSENT]) * len(self._user_ids)
+            self._columns[index] = column
+        return column
+
+    def _present_columns(self) -> Iterator[Tuple[str, array]]:
+        for index, column in enumerate(self._columns):
+            if column is not None:
+                yield currency_by_index(index).code, column
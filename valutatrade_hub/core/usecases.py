@@ -1,25 +1,116 @@
-import hashlib
+import functools
 import logging
+import os
 import secrets
+import threading
 from datetime import datetime
-from typing import Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 from ..decorators import log_action
 from ..infra.database import DatabaseManager
+from ..infra.rates_cache import RatesCache, RatesSnapshot
 from ..infra.settings import SettingsLoader
-from ..parser_service.config import ParserConfig
-from ..parser_service.updater import RatesUpdater
+from ..metrics import MetricsRegistry, track
+from .currencies import get_currency
 from .exceptions import ApiRequestError
 from .models import Portfolio, User
-from .utils import validate_currency_code
+from .session import UserSession
+from .utils import from_seconds, hash_password, hash_passwords, validate_currency_code
 
-config = ParserConfig()
+if TYPE_CHECKING:
+    from ..infra.rate_index import RateHistoryIndex
+    from .backtest import BacktestResult
+    from .orders import Order
 
-settings = SettingsLoader()
-db = DatabaseManager()
-db.set_data_path(settings.get("data_path", "data"))
 logger = logging.getLogger("ValutaTrade")
 
+T = TypeVar("T")
+
+# Меньше строк импорт хеширует в текущем процессе: запуск пула дороже
+IMPORT_POOL_MIN_ROWS = 1000
+
+# Признак исполнения ордеров в текущем потоке (защита от повторного входа)
+_order_execution = threading.local()
+
+@functools.cache
+def get_db() -> DatabaseManager:
+    """DatabaseManager с путём к данным из настроек (создаётся при первом вызове)."""
+    db = DatabaseManager()
+    db.set_data_path(SettingsLoader().get("data_path", "data"))
+    return db
+
+@functools.cache
+def get_parser_config():
+    """Конфигурация Parser Service (создаётся при первом обновлении курсов).
+
+    Файлы курсов берутся из того же data_path, что читает get_rate;
+    запасные провайдеры и кворум — из настроек secondary_providers и
+    rates_quorum.
+    """
+    from ..parser_service.config import ParserConfig
+
+    data_path = get_db().data_path
+    settings = SettingsLoader()
+    return ParserConfig(
+        RATES_FILE_PATH=os.path.join(data_path, "rates.json"),
+        HISTORY_FILE_PATH=os.path.join(data_path, "exchange_rates.json"),
+        SECONDARY_PROVIDERS={
+            primary: tuple(names)
+            for primary, names in settings.get("secondary_providers", {}).items()
+        },
+        QUORUM=int(settings.get("rates_quorum", 1)),
+    )
+
+def make_rates_updater():
+    """RatesUpdater, после записи курсов исполняющий сработавшие ордера.
+
+    Запасные провайдеры строятся по config.SECONDARY_PROVIDERS.
+    """
+    from ..parser_service.hedging import build_secondaries
+    from ..parser_service.updater import RatesUpdater
+
+    config = get_parser_config()
+    return RatesUpdater(
+        config,
+        listeners=[revalue_portfolios, execute_triggered_orders],
+        secondaries=build_secondaries(config),
+    )
+
+def get_history_storage():
+    """Storage истории курсов для чтения.
+
+    Записи, которые фоновая запись этого процесса ещё держит в очереди,
+    сначала дописываются — только что обновлённые курсы видны в истории.
+    """
+    from ..parser_service.history_writer import flush_history_writers
+    from ..parser_service.storage import Storage
+
+    flush_history_writers()
+    return Storage(get_parser_config())
+
+def get_rates_snapshot() -> RatesSnapshot:
+    """Снимок rates.json из кеша (файл перечитывается только после изменения)."""
+    get_db()
+    return RatesCache().snapshot()
+
+def subscribe_rates(
+        interval: float,
+        stop: Optional[threading.Event] = None,
+    ) -> Iterator[RatesSnapshot]:
+    """Снимки rates.json по мере его изменения (не чаще раза в interval с)."""
+    get_db()
+    return RatesCache().changes(interval, stop)
+
 def get_pair_rate(pair: str, pairs: dict) -> float:
     """Получение курса для пары (всегда float)."""
     if pair not in pairs:
@@ -27,21 +118,38 @@ def get_pair_rate(pair: str, pairs: dict) -> float:
     rate_str = pairs[pair]["rate"]
     return float(rate_str)
 
-def get_rate(from_cur: str, to_cur: str = "USD") -> Tuple[float, str]:
-    """Получение курса с проверкой TTL и обновлением кэша."""
+@functools.cache
+def get_rate_index() -> 'RateHistoryIndex':
+    """Индекс истории курсов по времени (файлы отображаются в память)."""
+    from ..infra.rate_index import RateHistoryIndex
+
+    return RateHistoryIndex(get_parser_config().HISTORY_FILE_PATH)
+
+@track("GET_RATE")
+def get_rate(
+        from_cur: str,
+        to_cur: str = "USD",
+        at: Optional[datetime] = None,
+    ) -> Tuple[float, str]:
+    """Получение курса с проверкой TTL и обновлением кэша.
+
+    at — курс на момент по истории: по каждой паре CODE_USD берётся
+    последнее наблюдение не позже at (поиск по индексу, без обновления).
+    """
     from_cur = validate_currency_code(from_cur)
     to_cur = validate_currency_code(to_cur)
     if from_cur == to_cur:
-        return 1.0, datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        return 1.0, (at or datetime.now()).strftime("%Y-%m-%dT%H:%M:%S")
+    if at is not None:
+        return _rate_at(from_cur, to_cur, at)
 
-    rates_data = db.load("rates.json")
-    if not rates_data or "pairs" not in rates_data:
+    pairs = get_rates_snapshot().pairs
+    if not pairs:
         raise ValueError(
             "Курсы не загружены. Выполните update-rates чтобы загрузить данные."
         )
 
-    pairs = rates_data["pairs"]
-    ttl = settings.get("rates_ttl_seconds", 300)
+    ttl = SettingsLoader().get("rates_ttl_seconds", 300)
 
     def needs_update(updated_at: str) -> bool:
         update_time = datetime.strptime(updated_at, "%Y-%m-%dT%H:%M:%S")
@@ -57,85 +165,219 @@ def get_rate(from_cur: str, to_cur: str = "USD") -> Tuple[float, str]:
         update_needed = True
 
     if update_needed:
+        MetricsRegistry().counter(
+            "valutatrade_rates_refresh_total",
+            "Обновления курсов, запущенные get_rate по истечении TTL",
+        ).inc()
+
         try:
-            updater = RatesUpdater(config)
+            updater = make_rates_updater()
             updater.run_update()
-            rates_data = db.load("rates.json")
-            pairs = rates_data["pairs"]
+            RatesCache().invalidate()
+            pairs = get_rates_snapshot().pairs
         except Exception as e:
             raise ApiRequestError(f"Не удалось обновить курсы: {str(e)}")
 
     if to_cur == base:
         pair = pair_from
-        p = pairs[pair]
-        updated_at = p["updated_at"]
         rate = get_pair_rate(pair, pairs)
+        updated_at = pairs[pair]["updated_at"]
     elif from_cur == base:
         pair = pair_to
-        p = pairs[pair]
-        updated_at = p["updated_at"]
         rate_to_usd = get_pair_rate(pair, pairs)
+        updated_at = pairs[pair]["updated_at"]
         rate = 1 / rate_to_usd if rate_to_usd else 0
     else:
-        p_from = pairs[pair_from]
-        p_to = pairs[pair_to]
-        updated_at = max(p_from["updated_at"], p_to["updated_at"])
+        # валюта есть в реестре, но курса может не быть — проверяем до чтения
         rate_from_usd = get_pair_rate(pair_from, pairs)
         rate_to_usd = get_pair_rate(pair_to, pairs)
+        updated_at = max(pairs[pair_from]["updated_at"], pairs[pair_to]["updated_at"])
         rate = rate_from_usd / rate_to_usd if rate_to_usd else 0
 
     return rate, updated_at
 
+def _rate_at(from_cur: str, to_cur: str, at: datetime) -> Tuple[float, str]:
+    """Курс from_cur→to_cur на момент at через курсы обеих валют к USD."""
+    from ..parser_service.history_writer import flush_history_writers
+
+    # индекс дописывается вместе с историей — сначала очередь этого процесса
+    flush_history_writers()
+    index = get_rate_index()
+    legs = []
+    for code in (from_cur, to_cur):
+        if code == "USD":
+            continue
+        found = index.rate_at(f"{code}_USD", at)
+        if found is None:
+            raise ValueError(
+                f"Нет курса {code}_USD на {at.strftime('%Y-%m-%dT%H:%M:%S')} "
+                "в истории курсов."
+            )
+        legs.append(found)
+    rate_from = legs[0][0] if from_cur != "USD" else 1.0
+    rate_to = legs[-1][0] if to_cur != "USD" else 1.0
+    observed = from_seconds(max(moment for _, moment in legs))
+    rate = rate_from / rate_to if rate_to else 0
+    return rate, observed.strftime("%Y-%m-%dT%H:%M:%S")
+
 @log_action("REGISTER")
 def register(username: str, password: str) -> int:
     """Регистрация пользователя."""
     if len(password) < 4:
         raise ValueError("Пароль должен быть не короче 4 символов")
-    users = db.load("users.json")
-    if any(u["username"] == username for u in users):
-        raise ValueError(f"Имя пользователя '{username}' уже занято")
     salt = secrets.token_hex(8)
-    hashed = hashlib.sha256((password + salt).encode()).hexdigest()
-    user_id = max([u.get("user_id", 0) for u in users]) + 1 if users else 1
-    reg_date = datetime.now()
-    user_dict = {
-        "user_id": user_id,
-        "username": username,
-        "hashed_password": hashed,
-        "salt": salt,
-        "registration_date": reg_date.strftime("%Y-%m-%dT%H:%M:%S")
-    }
-    db.save("users.json", users + [user_dict])
-    portfolios = db.load("portfolios.json")
-    portfolio_dict = {"user_id": user_id, "wallets": {}}
-    db.save("portfolios.json", portfolios + [portfolio_dict])
+    hashed = hash_password(password, salt)
+    db = get_db()
+    with db.file_lock("users.json"):
+        users = db.load("users.json")
+        if any(u["username"] == username for u in users):
+            raise ValueError(f"Имя пользователя '{username}' уже занято")
+        user_id = max([u.get("user_id", 0) for u in users]) + 1 if users else 1
+        reg_date = datetime.now()
+        user_dict = {
+            "user_id": user_id,
+            "username": username,
+            "hashed_password": hashed,
+            "salt": salt,
+            "registration_date": reg_date.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        db.save("users.json", users + [user_dict])
+    with db.file_lock("portfolios.json"):
+        portfolios = db.load("portfolios.json")
+        portfolio_dict = {"user_id": user_id, "wallets": {}}
+        db.save("portfolios.json", portfolios + [portfolio_dict])
     return user_id
 
+@log_action("IMPORT_USERS")
+def import_users(path: str, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Массовая регистрация пользователей из CSV (username,password).
+
+    CSV читается потоком; уникальность имён проверяется по множеству,
+    id выдаются счётчиком от максимального существующего. Пароли
+    хешируются пачками в пуле из workers процессов (по умолчанию — по
+    числу CPU; при одном — в текущем процессе). users.json и
+    portfolios.json переписываются по одному разу в конце. Строки с
+    ошибками пропускаются: {"imported", "first_id", "errors": [(строка,
+    сообщение)]}.
+    """
+    import csv
+
+    db = get_db()
+    with db.file_lock("users.json"), db.file_lock("portfolios.json"):
+        usernames = set()
+        next_id = 1
+        for user in db.iter_records("users.json"):
+            usernames.add(user["username"])
+            next_id = max(next_id, user.get("user_id", 0) + 1)
+        first_id = next_id
+        errors: List[Tuple[int, str]] = []
+        accepted: List[Tuple[int, str, str, str]] = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            missing = {"username", "password"} - set(reader.fieldnames or [])
+            if missing:
+                raise ValueError(
+                    f"В заголовке CSV нет полей: {', '.join(sorted(missing))}"
+                )
+            for row in reader:
+                username = (row["username"] or "").strip()
+                password = row["password"] or ""
+                if not username:
+                    errors.append((reader.line_num, "Пустое имя пользователя"))
+                elif len(password) < 4:
+                    errors.append((
+                        reader.line_num, "Пароль должен быть не короче 4 символов"
+                    ))
+                elif username in usernames:
+                    errors.append((
+                        reader.line_num,
+                        f"Имя пользователя '{username}' уже занято",
+                    ))
+                else:
+                    usernames.add(username)
+                    accepted.append(
+                        (next_id, username, password, secrets.token_hex(8))
+                    )
+                    next_id += 1
+        hashes = _hash_in_pool(
+            [(password, salt) for _, _, password, salt in accepted], workers
+        )
+        reg_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        db.append("users.json", (
+            {
+                "user_id": user_id,
+                "username": username,
+                "hashed_password": hashed,
+                "salt": salt,
+                "registration_date": reg_date,
+            }
+            for (user_id, username, _, salt), hashed in zip(accepted, hashes)
+        ))
+        db.append("portfolios.json", (
+            {"user_id": user_id, "wallets": {}} for user_id, *_ in accepted
+        ))
+    logger.info(
+        f"Imported {len(accepted)} users from {path}, {len(errors)} rows rejected"
+    )
+    return {"imported": len(accepted), "first_id": first_id, "errors": errors}
+
+def _hash_in_pool(
+        pairs: List[Tuple[str, str]],
+        workers: Optional[int] = None,
+    ) -> List[str]:
+    """Хеши паролей; пачки по числу процессов, чтобы пересылка не съела выигрыш."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(pairs) < IMPORT_POOL_MIN_ROWS:
+        return hash_passwords(pairs)
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = -(-len(pairs) // (workers * 4))
+    chunks = [pairs[i:i + size] for i in range(0, len(pairs), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [
+            hashed for chunk in pool.map(hash_passwords, chunks) for hashed in chunk
+        ]
+
 @log_action("LOGIN")
 def login(username: str, password: str) -> int:
     """Авторизация пользователя."""
-    users = db.load("users.json")
+    users = get_db().load("users.json")
     user = next((u for u in users if u["username"] == username), None)
     if not user:
         raise ValueError(f"Пользователь '{username}' не найден")
     salt = user["salt"]
-    hashed = hashlib.sha256((password + salt).encode()).hexdigest()
-    if hashed != user["hashed_password"]:
+    if hash_password(password, salt) != user["hashed_password"]:
         raise ValueError("Неверный пароль")
     return user["user_id"]
 
-def show_portfolio(user_id: int, base: str = "USD") -> str:
+def open_session(user_id: int) -> UserSession:
+    """Сессия пользователя с портфелем в памяти (загружается один раз)."""
+    return UserSession.load(get_db(), user_id)
+
+@track("SHOW_PORTFOLIO")
+def show_portfolio(
+    user_id: int,
+    base: str = "USD",
+    session: Optional[UserSession] = None,
+) -> str:
     """Отображение портфеля с базовой валютой."""
     try:
-        user_data = db.find_by_id("users.json", "user_id", user_id)
-        if not user_data:
-            raise ValueError("Пользователь не найден")
-        username = user_data["username"]
-        user = User.from_dict(user_data)
-        port_data = db.find_by_id("portfolios.json", "user_id", user_id)
-        if not port_data or not port_data.get("wallets"):
-            return f"Портфель пользователя '{username}' пуст."
-        portfolio = Portfolio.from_dict(port_data, user)
+        if session is not None:
+            session.revalidate()
+            username = session.user.username
+            if session.is_empty:
+                return f"Портфель пользователя '{username}' пуст."
+            portfolio = session.portfolio
+        else:
+            user_data = get_db().find_by_id("users.json", "user_id", user_id)
+            if not user_data:
+                raise ValueError("Пользователь не найден")
+            username = user_data["username"]
+            user = User.from_dict(user_data)
+            port_data = get_db().find_by_id("portfolios.json", "user_id", user_id)
+            if not port_data or not port_data.get("wallets"):
+                return f"Портфель пользователя '{username}' пуст."
+            portfolio = Portfolio.from_dict(port_data, user)
         if not portfolio.wallets:
             return f"Портфель пользователя '{username}' пуст."
         output = f"Портфель пользователя '{username}' (база: {base}):\n"
@@ -158,21 +400,106 @@ def show_portfolio(user_id: int, base: str = "USD") -> str:
     except Exception as e:
         return f"Портфель пользователя недоступен: {e}. Обратитесь к администратору."
 
+def _modify_portfolio(
+    user_id: int,
+    currency: str,
+    session: Optional[UserSession],
+    change: Callable[[Portfolio], T],
+    side: str,
+    amount: float,
+    rate: float,
+) -> T:
+    """Сделка: изменение портфеля и запись в журнал сделок под блокировкой.
+
+    Через сессию портфель берётся из памяти (с перепроверкой файла) и на диск
+    пишется только изменённый кошелёк. После записи портфеля, ещё под
+    блокировкой пользователя, сделка дописывается в журнал — порядок
+    журнала совпадает с порядком сделок. Если запись портфеля или журнала
+    не удалась, прежний кошелёк восстанавливается и ошибка поднимается:
+    сделки нет. Индекс держателей (под блокировкой) и ряд стоимости
+    (после неё: трекер сам берёт блокировку пользователя) обновляются
+    после фиксации; их ошибки только логируются.
+    """
+    from ..infra.ledger import TradeLedger
+
+    def commit() -> None:
+        TradeLedger().append(user_id, currency, side, amount, rate)
+
+    db = get_db()
+    if session is not None:
+        with db.user_lock(user_id):
+            session.revalidate()
+            result = session.apply(currency, change, commit)
+            _index_trade(user_id, currency, session.portfolio)
+        _value_trade(user_id, currency, side, amount, rate)
+        return result
+    user_data = db.find_by_id("users.json", "user_id", user_id)
+    if not user_data:
+        raise ValueError("Пользователь не найден")
+    user = User.from_dict(user_data)
+    outcome = []
+
+    def apply(port_data: Dict[str, Any]) -> Dict[str, Any]:
+        outcome.append(port_data)
+        portfolio = Portfolio.from_dict(port_data, user)
+        outcome.append(change(portfolio))
+        outcome.append(portfolio)
+        return portfolio.to_dict()
+
+    def after(_: Dict[str, Any]) -> None:
+        try:
+            commit()
+        except BaseException:
+            db.update_by_id("portfolios.json", "user_id", user_id, outcome[0])
+            raise
+        _index_trade(user_id, currency, outcome[2])
+
+    db.modify("portfolios.json", "user_id", user_id, apply, after=after)
+    _value_trade(user_id, currency, side, amount, rate)
+    return outcome[1]
+
+def _index_trade(user_id: int, currency: str, portfolio: Portfolio) -> None:
+    """Новый баланс в индексе держателей (под блокировкой пользователя).
+
+    Сделка уже записана в портфель и журнал, поэтому ошибка здесь не
+    делает её неуспешной — она только логируется.
+    """
+    from ..infra.holders import HoldersIndex
+
+    wallet = portfolio.get_wallet(currency)
+    try:
+        HoldersIndex().set_balance(user_id, currency, wallet.units if wallet else 0)
+    except Exception:
+        logger.exception(f"Holders index update failed for user {user_id} {currency}")
+
+def _value_trade(
+    user_id: int,
+    currency: str,
+    side: str,
+    amount: float,
+    rate: float,
+) -> None:
+    """Зафиксированная сделка в ряду стоимости; ошибка только логируется."""
+    from ..infra.valuation import ValuationTracker
+
+    try:
+        ValuationTracker().on_trade(user_id, currency, side, amount, rate)
+    except Exception:
+        logger.exception(f"Valuation update failed for user {user_id} {currency}")
+
 @log_action("BUY")
 def buy(
     user_id: int,
     currency: str,
     amount: float,
     verbose: bool = False,
+    session: Optional[UserSession] = None,
 ) -> str:
     """Покупка валюты (упрощённо: начисление с оценкой стоимости)."""
     if amount <= 0:
         raise ValueError("'amount' должен быть положительным числом")
     currency = validate_currency_code(currency)
-    user_data = db.find_by_id("users.json", "user_id", user_id)
-    user = User.from_dict(user_data)
-    port_data = db.find_by_id("portfolios.json", "user_id", user_id)
-    portfolio = Portfolio.from_dict(port_data, user)
+    # курс запрашивается до блокировки: обновление может идти по сети
     try:
         usd_per_unit, _ = get_rate(currency, "USD")
     except ValueError:
@@ -181,15 +508,19 @@ def buy(
             "Выполните update-rates чтобы загрузить данные."
         )
 
-    wallet = portfolio.get_wallet(currency)
-    if not wallet:
-        portfolio.add_currency(currency)
+    def deposit(portfolio: Portfolio) -> Tuple[float, float]:
         wallet = portfolio.get_wallet(currency)
-    old_balance = wallet.balance
-    wallet.deposit(amount)
-    new_port_dict = portfolio.to_dict()
-    db.update_by_id("portfolios.json", "user_id", user_id, new_port_dict)
-    
+        if not wallet:
+            portfolio.add_currency(currency)
+            wallet = portfolio.get_wallet(currency)
+        old_balance = wallet.balance
+        wallet.deposit(amount)
+        return old_balance, wallet.balance
+
+    old_balance, new_balance = _modify_portfolio(
+        user_id, currency, session, deposit, "buy", amount, usd_per_unit
+    )
+
     estimated_cost = amount * usd_per_unit
     output = (
         f"Покупка выполнена: {amount:.4f} {currency} "
@@ -198,7 +529,7 @@ def buy(
     if verbose:
         output += (
             f"Изменения в портфеле:\n- {currency}: "
-            f"было {old_balance:.4f} → стало {wallet.balance:.4f}"
+            f"было {old_balance:.4f} → стало {new_balance:.4f}"
         )
     output += f"\nОценочная стоимость покупки: {estimated_cost:.2f} USD"
     return output
@@ -209,40 +540,45 @@ def sell(
     currency: str,
     amount: float,
     verbose: bool = False,
+    session: Optional[UserSession] = None,
 ) -> str:
     """Продажа валюты (упрощённо: списание с оценкой выручки)."""
     if amount <= 0:
         raise ValueError("'amount' должен быть положительным числом")
     currency = validate_currency_code(currency)
-    user_data = db.find_by_id("users.json", "user_id", user_id)
-    user = User.from_dict(user_data)
-    port_data = db.find_by_id("portfolios.json", "user_id", user_id)
-    portfolio = Portfolio.from_dict(port_data, user)
-    wallet = portfolio.get_wallet(currency)
-    if not wallet:
-        raise ValueError(
-            f"У вас нет кошелька '{currency}'. "
-            "Добавьте валюту: она создаётся автоматически при первой покупке."
-        )
-    old_balance = wallet.balance
-    wallet.withdraw(amount)
-    new_port_dict = portfolio.to_dict()
-    db.update_by_id("portfolios.json", "user_id", user_id, new_port_dict)
-    
+    usd_per_unit = 1.0
+    if currency != "USD":
+        # курс нужен до списания, чтобы сделка не прошла без цены в журнале;
+        # запрашивается до блокировки: обновление может идти по сети
+        try:
+            usd_per_unit, _ = get_rate(currency, "USD")
+        except ValueError:
+            raise ValueError(f"Не удалось получить курс для {currency}→USD")
+
+    def withdraw(portfolio: Portfolio) -> Tuple[float, float]:
+        wallet = portfolio.get_wallet(currency)
+        if not wallet:
+            raise ValueError(
+                f"У вас нет кошелька '{currency}'. "
+                "Добавьте валюту: она создаётся автоматически при первой покупке."
+            )
+        old_balance = wallet.balance
+        wallet.withdraw(amount)
+        return old_balance, wallet.balance
+
+    old_balance, new_balance = _modify_portfolio(
+        user_id, currency, session, withdraw, "sell", amount, usd_per_unit
+    )
+
     if currency == "USD":
         output = f"Продажа выполнена: {amount:.4f} {currency}\n"
         if verbose:
             output += (
                 f"Изменения в портфеле:\n- {currency}: "
-                f"было {old_balance:.4f} → стало {wallet.balance:.4f}"
+                f"было {old_balance:.4f} → стало {new_balance:.4f}"
             )
         return output
-    
-    try:
-        usd_per_unit, _ = get_rate(currency, "USD")
-    except ValueError:
-        raise ValueError(f"Не удалось получить курс для {currency}→USD")
-    
+
     estimated_revenue = amount * usd_per_unit
     output = (
         f"Продажа выполнена: {amount:.4f} {currency} "
@@ -251,7 +587,327 @@ def sell(
     if verbose:
         output += (
             f"Изменения в портфеле:\n- {currency}: "
-            f"было {old_balance:.4f} → стало {wallet.balance:.4f}"
+            f"было {old_balance:.4f} → стало {new_balance:.4f}"
         )
     output += f"\nОценочная выручка: {estimated_revenue:.2f} USD"
     return output
+
+def get_trade_history(
+    user_id: int,
+    limit: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """История сделок пользователя из журнала (от новых к старым)."""
+    if limit is not None and limit <= 0:
+        raise ValueError("'limit' должен быть положительным числом")
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("Начало периода позже его конца")
+    from ..infra.ledger import TradeLedger
+
+    get_db()
+    return TradeLedger().history(user_id, limit, date_from, date_to)
+
+HISTORY_EXPORT_FIELDS = ("timestamp", "from_currency", "to_currency", "rate", "source")
+
+@track("EXPORT_HISTORY")
+def export_rates_history(
+    path: str,
+    currency: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> int:
+    """Выгрузка истории курсов (exchange_rates.json) в CSV или JSON.
+
+    Формат определяется расширением path (.json — массив записей, иначе CSV).
+    История читается потоком по одной записи, поэтому размер файла не
+    ограничен памятью. Возвращает число выгруженных записей.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("Начало периода позже его конца")
+    if currency is not None:
+        currency = validate_currency_code(currency)
+    start = date_from.strftime("%Y-%m-%dT%H:%M:%S") if date_from else None
+    end = date_to.strftime("%Y-%m-%dT%H:%M:%S") if date_to else None
+
+    def selected():
+        for record in get_history_storage().iter_history():
+            if currency and currency not in (
+                record.get("from_currency"), record.get("to_currency")
+            ):
+                continue
+            timestamp = record.get("timestamp", "")
+            if (start and timestamp < start) or (end and timestamp > end):
+                continue
+            yield record
+
+    if path.lower().endswith(".json"):
+        from ..infra.jsonstream import write_json_array
+
+        return write_json_array(path, selected())
+    import csv
+
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, HISTORY_EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for record in selected():
+            writer.writerow(record)
+            count += 1
+    return count
+
+@track("BACKTEST")
+def backtest(
+    allocation: Optional[Dict[str, float]] = None,
+    capital: Optional[float] = None,
+    trades: Optional[List[Dict[str, Any]]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    step: Optional[int] = None,
+) -> 'BacktestResult':
+    """Прогон портфеля по записанной истории курсов (exchange_rates.json).
+
+    allocation — неизменный набор {код: количество}; с capital это доли
+    капитала в USD, переводимые в количества по курсам начала периода.
+    trades — сделки {timestamp, currency, side, amount}, применяемые к
+    allocation по курсу на момент сделки. step — шаг сетки в секундах.
+    """
+    from .backtest import RateGrid, run_allocation, run_trades, weights_to_holdings
+
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("Начало периода позже его конца")
+    if step is not None and step <= 0:
+        raise ValueError("'step' должен быть положительным числом")
+    if not allocation and not trades:
+        raise ValueError("Нужен набор валют (allocation) или список сделок")
+    allocation = {
+        validate_currency_code(code): amount
+        for code, amount in (allocation or {}).items()
+    }
+    for trade in trades or []:
+        trade["currency"] = validate_currency_code(trade["currency"])
+    grid = RateGrid.from_history(
+        get_history_storage().iter_history(), step, date_from, date_to
+    )
+    if capital is not None:
+        if capital <= 0:
+            raise ValueError("'capital' должен быть положительным числом")
+        allocation = weights_to_holdings(grid, allocation, capital)
+    if trades:
+        return run_trades(grid, trades, allocation)
+    return run_allocation(grid, allocation)
+
+@log_action("PLACE_ORDER")
+def place_order(
+    user_id: int,
+    currency: str,
+    side: str,
+    kind: str,
+    price: float,
+    amount: float,
+) -> 'Order':
+    """Размещение отложенного ордера (limit/stop) на пару CODE_USD.
+
+    Ордер проверяется при каждом обновлении курсов и исполняется через
+    buy/sell, когда курс пересекает цену.
+    """
+    from ..infra.orders import OrderRepository
+    from .orders import Order
+
+    currency = validate_currency_code(currency)
+    if currency == "USD":
+        raise ValueError("Ордер выставляется на валюту, отличную от USD")
+    with OrderRepository().locked() as (orders, book):
+        order_id = max(orders, default=0) + 1
+        order = Order(order_id, user_id, currency, side.lower(), kind.lower(),
+                      price, amount)
+        orders[order_id] = order
+        book.add(order)
+        OrderRepository().save()
+    return order
+
+def list_orders(user_id: int, include_closed: bool = False) -> List['Order']:
+    """Ордера пользователя: открытые или все, от новых к старым."""
+    from ..infra.orders import OrderRepository
+
+    get_db()
+    orders, book = OrderRepository().load()
+    if include_closed:
+        result = [order for order in orders.values() if order.user_id == user_id]
+    else:
+        result = book.user_orders(user_id)
+    return sorted(result, key=lambda order: order.order_id, reverse=True)
+
+@log_action("CANCEL_ORDER")
+def cancel_order(user_id: int, order_id: int) -> 'Order':
+    """Отмена открытого ордера пользователя."""
+    from ..infra.orders import OrderRepository
+
+    get_db()
+    with OrderRepository().locked() as (orders, book):
+        order = orders.get(order_id)
+        if order is None or order.user_id != user_id:
+            raise ValueError(f"Ордер #{order_id} не найден")
+        if not order.is_open:
+            raise ValueError(f"Ордер #{order_id} уже закрыт ({order.status})")
+        book.remove(order_id)
+        order.close("cancelled")
+        OrderRepository().save()
+    return order
+
+def execute_triggered_orders(rates: Dict[str, Dict[str, Any]]) -> List['Order']:
+    """Исполнение ордеров, пороги которых пересёк новый курс.
+
+    Для каждой пары из книги снимаются только сработавшие ордера
+    (O(log n + k)); каждый исполняется через buy/sell. Ошибка проверки
+    (например, нехватка средств) отклоняет ордер, сбой (ввод-вывод,
+    блокировка) оставляет его открытым; остальные ордера это не затрагивает.
+    Возвращает закрытые ордера.
+    """
+    if getattr(_order_execution, "active", False):
+        # buy/sell внутри исполнения сами обновили курсы — без повторного входа
+        return []
+    get_db()
+    _order_execution.active = True
+    try:
+        triggered = _execute_crossed(rates)
+    finally:
+        _order_execution.active = False
+    if triggered:
+        logger.info(f"Orders triggered: {len(triggered)}")
+    return triggered
+
+def _execute_crossed(rates: Dict[str, Dict[str, Any]]) -> List['Order']:
+    from ..infra.orders import OrderRepository
+
+    with OrderRepository().locked() as (_, book):
+        triggered: List[Tuple['Order', float]] = []
+        for pair, data in rates.items():
+            code, _, base = pair.partition("_")
+            if base == "USD":
+                rate = float(data["rate"])
+                triggered.extend((order, rate) for order in book.crossed(code, rate))
+        if not triggered:
+            return []
+        closed: List['Order'] = []
+        try:
+            for order, rate in triggered:
+                trade = buy if order.side == "buy" else sell
+                try:
+                    trade(order.user_id, order.currency, order.amount)
+                except ValueError as e:
+                    order.close("rejected", fill_rate=rate, error=str(e))
+                except Exception:
+                    # buy/sell при сбое откатываются — сделки не было, ордер
+                    # возвращается в книгу до следующего обновления курсов
+                    logger.exception(f"Order #{order.order_id} execution failed")
+                    book.add(order)
+                    continue
+                else:
+                    order.close("filled", fill_rate=rate)
+                closed.append(order)
+        finally:
+            # исполненные ордера сохраняются, даже если цикл прервался:
+            # иначе при следующем курсе они исполнились бы повторно
+            OrderRepository().save()
+    return closed
+
+def revalue_portfolios(rates: Dict[str, Dict[str, Any]]) -> int:
+    """Переоценка рядов стоимости по обновлённым курсам CODE_USD.
+
+    Переоцениваются только держатели обновлённых валют (по индексу).
+    """
+    from ..infra.holders import HoldersIndex
+    from ..infra.valuation import ValuationTracker
+
+    get_db()
+    usd_rates = {
+        pair.partition("_")[0]: float(data["rate"])
+        for pair, data in rates.items()
+        if pair.endswith("_USD")
+    }
+    return ValuationTracker().on_rates(
+        usd_rates, HoldersIndex().affected_users(usd_rates)
+    )
+
+def users_affected_by_rates(rates: Dict[str, Dict[str, Any]]) -> List[int]:
+    """Пользователи, чьи портфели затрагивает обновление пар CODE_USD."""
+    from ..infra.holders import HoldersIndex
+
+    get_db()
+    codes = {pair.partition("_")[0] for pair in rates if pair.endswith("_USD")}
+    return sorted(HoldersIndex().affected_users(codes))
+
+@track("EXPOSURE")
+def get_exposure(currency: str, top: int = 10) -> Dict[str, Any]:
+    """Держатели валюты и суммарная позиция по индексу (без чтения портфелей)."""
+    if top <= 0:
+        raise ValueError("'top' должен быть положительным числом")
+    import heapq
+
+    from ..infra.holders import HoldersIndex
+
+    currency = validate_currency_code(currency)
+    get_db()
+    index = HoldersIndex()
+    holders = index.holders(currency)
+    scale = get_currency(currency).scale
+    total = index.total_units(currency) / scale
+    try:
+        rate, _ = get_rate(currency, "USD")
+    except ValueError:
+        rate = None
+    largest = heapq.nlargest(top, holders.items(), key=lambda item: item[1])
+    return {
+        "currency": currency,
+        "holders": len(holders),
+        "total": total,
+        "usd_rate": rate,
+        "total_usd": total * rate if rate is not None else None,
+        "top": [
+            {
+                "user_id": user_id,
+                "amount": units / scale,
+                "share": units / scale / total * 100 if total else 0.0,
+            }
+            for user_id, units in largest
+        ],
+    }
+
+def get_pnl(
+    user_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    base: str = "USD",
+) -> Dict[str, Any]:
+    """P&L за период по предрасчитанному ряду стоимости.
+
+    Суммы ряда хранятся в USD и переводятся в base по текущему курсу.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("Начало периода позже его конца")
+    from ..infra.valuation import ValuationTracker
+
+    base = validate_currency_code(base)
+    get_db()
+    points = ValuationTracker().series(user_id, date_from, date_to)
+    if not points:
+        raise ValueError(
+            "Нет данных оценки за период. Ряд стоимости ведётся с первой сделки."
+        )
+    factor, _ = get_rate("USD", base)
+    first, last = points[0], points[-1]
+    start_value = first["value"] * factor
+    end_value = last["value"] * factor
+    return {
+        "base": base,
+        "from": first["timestamp"],
+        "to": last["timestamp"],
+        "start_value": start_value,
+        "end_value": end_value,
+        "change": end_value - start_value,
+        "change_pct": (end_value / start_value - 1) * 100 if start_value else 0.0,
+        "realized": (last["realized"] - first["realized"]) * factor,
+        "unrealized": last["unrealized"] * factor,
+        "points": len(points),
+    }
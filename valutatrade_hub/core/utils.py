@@ -1,8 +1,11 @@
+import hashlib
 import json
 import os
-from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
 
 from .currencies import get_currency
+from .exceptions import CurrencyNotFoundError
 
 
 def ensure_dir(directory: str):
@@ -23,29 +26,72 @@ def save_json(filename: str, data: List[Dict[str, Any]]):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, default=str)
 
+def hash_password(password: str, salt: str) -> str:
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+def hash_passwords(pairs: List[Tuple[str, str]]) -> List[str]:
+    """Хеши для пачки (пароль, соль) — единица работы пула процессов."""
+    return [hash_password(password, salt) for password, salt in pairs]
+
 def validate_currency_code(code: str) -> str:
     try:
-        currency = get_currency(code)
-        return currency.code
-    except Exception:
-        raise ValueError(f"Некорректный код валюты: {code}")
+        return get_currency(code).code
+    except CurrencyNotFoundError:
+        raise ValueError(f"Некорректный код валюты: {code}") from None
 
 def convert_amount(amount: float, from_code: str, to_code: str, rate: float) -> float:
     if from_code == to_code:
         return amount
     return amount * rate if rate else 0.0
 
+_env_loaded = False
+
+def parse_datetime(value: str, end_of_day: bool = False) -> datetime:
+    """Разбор даты "YYYY-MM-DD" или времени "YYYY-MM-DDTHH:MM:SS".
+
+    end_of_day=True превращает дату без времени в конец этого дня.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        pass
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(
+            f"Неверный формат даты '{value}': ожидается YYYY-MM-DD "
+            "или YYYY-MM-DDTHH:MM:SS"
+        )
+    return day + timedelta(days=1, seconds=-1) if end_of_day else day
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_seconds(value: datetime) -> int:
+    """Время без часового пояса → секунды от 1970-01-01 (как записано)."""
+    return int((value - _EPOCH).total_seconds())
+
+def from_seconds(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
 def load_env_file():
+    """Загружает .env из корня проекта один раз за процесс."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
     project_root = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "..")
     )
 
     env_path = os.path.join(project_root, ".env")
 
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#') or '=' not in line:
-                continue
-            key, value = line.split('=', 1)
-            os.environ[key.strip()] = value.strip()
+    try:
+        with open(env_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                os.environ[key.strip()] = value.strip()
+    except FileNotFoundError:
+        pass
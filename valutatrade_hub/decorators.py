@@ -1,61 +1,64 @@
 import functools
 import logging
-from datetime import datetime
-from typing import Any, Callable
+import time
+from typing import Any, Callable, Dict, Optional
 
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.metrics import observe_call
 
 logger = logging.getLogger("ValutaTrade")
-settings = SettingsLoader()
+
+
+def _action_fields(
+        action: str,
+        kwargs: Dict[str, Any],
+        result: str,
+        error: Optional[Exception] = None,
+    ) -> Dict[str, Any]:
+    """Структурные поля записи лога (строятся, только если уровень включён)."""
+    fields = {
+        "action": action,
+        "user_id": kwargs.get("user_id"),
+        "username": None,
+        "currency": kwargs.get("currency_code") or kwargs.get("currency"),
+        "amount": kwargs.get("amount"),
+        "rate": None,
+        "base": SettingsLoader().get("default_base_currency", "USD"),
+        "result": result,
+    }
+    if error is not None:
+        fields["error_type"] = type(error).__name__
+        fields["error_message"] = str(error)
+    elif kwargs.get("verbose", False):
+        fields["context"] = "Детали изменений (было→стало)"
+    return {k: v for k, v in fields.items() if v is not None}
+
 
 def log_action(action: str):
-    """Декоратор для логирования операций."""
+    """Декоратор для логирования операций и учёта их метрик.
+
+    Запись передаётся в очередь логгера без форматирования; если уровень
+    отключён, поля записи не собираются вовсе.
+    """
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            verbose = kwargs.get("verbose", False)
-            user_id = kwargs.get("user_id")
-            username = None
-            currency = kwargs.get("currency_code") or kwargs.get("currency")
-            amount = kwargs.get("amount")
-            rate = None
-            base = settings.get("default_base_currency", "USD")
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                log_msg = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                    "action": action,
-                    "user_id": user_id,
-                    "username": username,
-                    "currency": currency,
-                    "amount": amount,
-                    "rate": rate,
-                    "base": base,
-                    "result": "OK",
-                }
-                if verbose:
-                    log_msg["context"] = "Детали изменений (было→стало)"
-                logger.info(" ".join(
-                    [f'{k}="{v}"' for k, v in log_msg.items() if v is not None]
-                ))
-                return result
             except Exception as e:
-                log_msg = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
-                    "action": action,
-                    "user_id": user_id,
-                    "username": username,
-                    "currency": currency,
-                    "amount": amount,
-                    "rate": rate,
-                    "base": base,
-                    "result": "ERROR",
-                    "error_type": type(e).__name__,
-                    "error_message": str(e),
-                }
-                logger.error(" ".join(
-                    [f'{k}="{v}"' for k, v in log_msg.items() if v is not None]
-                ))
+                observe_call(action, time.perf_counter() - start, "ERROR")
+                if logger.isEnabledFor(logging.ERROR):
+                    logger.error(
+                        action,
+                        extra={"fields": _action_fields(action, kwargs, "ERROR", e)},
+                    )
                 raise
+            observe_call(action, time.perf_counter() - start, "OK")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    action, extra={"fields": _action_fields(action, kwargs, "OK")}
+                )
+            return result
         return wrapper
     return decorator
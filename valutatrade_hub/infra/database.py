@@ -1,10 +1,17 @@
+import itertools
 import json
+import os
+import tempfile
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from ..core.utils import ensure_dir
 from ..infra.settings import SingletonMeta
+from .jsonstream import CHUNK_SIZE, iter_json_array, write_json_array
+from .locks import LockManager, observe_lock_wait
 
 
 class DatabaseManager(metaclass=SingletonMeta):
@@ -15,8 +22,24 @@ class DatabaseManager(metaclass=SingletonMeta):
     def set_data_path(self, path: str):
         self.data_path = path
 
-    def load(self, filename: str) -> List[Dict[str, Any]]:
+    @contextmanager
+    def _locked(self, operation: str) -> Iterator[None]:
+        """Захват блокировки с учётом времени ожидания в метриках."""
+        start = time.perf_counter()
         with self._lock:
+            observe_lock_wait(operation, time.perf_counter() - start)
+            yield
+
+    def user_lock(self, user_id: int):
+        """Блокировка данных пользователя (потоки и процессы)."""
+        return LockManager().user_lock(self.data_path, user_id)
+
+    def file_lock(self, filename: str):
+        """Короткая блокировка файла на чтение-изменение-запись."""
+        return LockManager().file_lock(self.data_path, filename)
+
+    def load(self, filename: str) -> List[Dict[str, Any]]:
+        with self._locked("load"):
             path = Path(self.data_path) / filename
             ensure_dir(self.data_path)
             try:
@@ -25,12 +48,81 @@ class DatabaseManager(metaclass=SingletonMeta):
             except (FileNotFoundError, json.JSONDecodeError):
                 return []
 
+    def iter_records(self, filename: str) -> Iterator[Dict[str, Any]]:
+        """Записи файла по одной, без загрузки всего массива в память.
+
+        Блокировка не нужна: save заменяет файл атомарно, поэтому открытый
+        дескриптор дочитывает ту версию, с которой начал. Пустой или
+        отсутствующий файл, как и в load(), — пустой массив.
+        """
+        path = Path(self.data_path) / filename
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            head = f.read(CHUNK_SIZE)
+            if not head.strip() and not f.read(1):
+                # файлы data/ поставляются пустыми (0 байт)
+                return
+            f.seek(0)
+            yield from iter_json_array(f)
+
     def save(self, filename: str, data: List[Dict[str, Any]]):
-        with self._lock:
+        """Атомарная запись: читатели видят либо старый, либо новый файл."""
+        with self._locked("save"):
+            ensure_dir(self.data_path)
+            with tempfile.NamedTemporaryFile(
+                mode="w",
+                delete=False,
+                suffix=".tmp",
+                dir=self.data_path,
+                encoding="utf-8",
+                ) as tmp:
+                json.dump(data, tmp, indent=4, default=str)
+                tmp_path = tmp.name
             path = Path(self.data_path) / filename
+            try:
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+
+    def append(self, filename: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Дописывает records в конец массива одной атомарной перезаписью.
+
+        Существующие записи переносятся потоком, без загрузки файла в память.
+        Вызывается под file_lock(filename). Возвращает число записей в файле.
+        """
+        with self._locked("save"):
             ensure_dir(self.data_path)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, default=str)
+            path = Path(self.data_path) / filename
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.data_path)
+            os.close(fd)
+            try:
+                count = write_json_array(
+                    tmp_path, itertools.chain(self.iter_records(filename), records)
+                )
+                try:
+                    mode = os.stat(path).st_mode & 0o777
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return count
+
+    def signature(self, filename: str) -> Optional[Tuple[Any, ...]]:
+        """Отпечаток файла (путь, mtime, размер) для проверки изменений без чтения."""
+        path = Path(self.data_path) / filename
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (str(path), st.st_mtime_ns, st.st_size)
 
     def find_by_id(
             self,
@@ -38,8 +130,16 @@ class DatabaseManager(metaclass=SingletonMeta):
             id_key: str,
             target_id: int,
         ) -> Optional[Dict[str, Any]]:
-        data = self.load(filename)
-        return next((item for item in data if item.get(id_key) == target_id), None)
+        try:
+            return next(
+                (
+                    item for item in self.iter_records(filename)
+                    if item.get(id_key) == target_id
+                ),
+                None,
+            )
+        except json.JSONDecodeError:
+            return None
 
     def update_by_id(
             self,
@@ -48,6 +148,43 @@ class DatabaseManager(metaclass=SingletonMeta):
             target_id: int,
             new_data: Dict[str, Any],
         ):
+        with self.file_lock(filename):
+            self._replace(filename, id_key, target_id, new_data)
+
+    def modify(
+            self,
+            filename: str,
+            id_key: str,
+            user_id: int,
+            fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+            after: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        ) -> Dict[str, Any]:
+        """Атомарное чтение-изменение-запись записи пользователя.
+
+        fn получает текущую запись и возвращает новую. Вычисление идёт под
+        блокировкой пользователя, поэтому запись не изменится до сохранения;
+        файл блокируется только на перечитывание, слияние и запись, так что
+        сделки разных пользователей не ждут друг друга. after вызывается с
+        новой записью после сохранения, ещё под блокировкой пользователя.
+        """
+        with self.user_lock(user_id):
+            current = self.find_by_id(filename, id_key, user_id)
+            if current is None:
+                raise ValueError(f"Элемент с ID {user_id} не найден")
+            updated = fn(current)
+            with self.file_lock(filename):
+                self._replace(filename, id_key, user_id, updated)
+            if after is not None:
+                after(updated)
+        return updated
+
+    def _replace(
+            self,
+            filename: str,
+            id_key: str,
+            target_id: int,
+            new_data: Dict[str, Any],
+        ):
         data = self.load(filename)
         for i, item in enumerate(data):
             if item.get(id_key) == target_id:
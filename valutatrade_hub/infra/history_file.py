@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .jsonstream import JsonArrayWriter, iter_json_array
+
+# Таблица пакетов получения курсов рядом с файлом истории
+BATCHES_FILE = "fetch_batches.json"
+
+Record = Dict[str, Any]
+
+# Формат истории. Одно получение курсов у провайдера — пакет в
+# fetch_batches.json: {"id", "timestamp", "source", "meta"}, где meta —
+# поля, одинаковые у всех курсов получения (status_code, request_ms,
+# etag, ...). Строка exchange_rates.json хранит только своё:
+# {"batch", "pair", "rate"} и, если есть, "meta" с полями пары (raw_id,
+# quotes). Номера пакетов не переиспользуются, таблица упорядочена по
+# ним, а строки ссылаются на пакеты в неубывающем порядке — читатель
+# идёт по обоим файлам синхронно и держит в памяти один пакет.
+# Записи прежнего формата (все поля в каждой записи) читаются как есть.
+
+_MISSING = object()
+
+
+def batches_path(history_path: str) -> str:
+    return os.path.join(os.path.dirname(history_path), BATCHES_FILE)
+
+
+def record_id(record: Record) -> str:
+    """Ключ записи истории: пара и метка времени."""
+    return f"{record['from_currency']}_{record['to_currency']}_{record['timestamp']}"
+
+
+def read_history(history_path: str) -> Iterator[Record]:
+    """Записи истории в полном виде, каким его пишет RatesUpdater.
+
+    Строки нового формата собираются из строки и её пакета, записи
+    прежнего формата выдаются без изменений. Повреждённый хвост файла
+    отбрасывается.
+    """
+    cursor = _BatchCursor(_iter_file(batches_path(history_path), with_text=True))
+    for row in _iter_file(history_path):
+        if "batch" not in row:
+            yield row
+            continue
+        batch = cursor.find(row["batch"])
+        # строка без пакета (файлы заменены в обход Storage) пропускается
+        if batch is not None:
+            yield _expand(row, batch)
+
+
+def rewrite_history(history_path: str, records: List[Record]) -> None:
+    """Перезапись истории с новыми записями (под блокировкой истории).
+
+    Записи с теми же id, что у новых, заменяются. Оба файла переписываются
+    потоком; сохраняемые строки и пакеты копируются текстом, без повторного
+    кодирования. Таблица пакетов заменяется первой и содержит все прежние
+    пакеты, поэтому читатель, открывший старую историю, находит свои
+    пакеты и в новой таблице. История прежнего формата при первой
+    перезаписи переводится в новый.
+    """
+    new_ids = {record_id(record) for record in records}
+    dir_path = os.path.dirname(history_path)
+    table_path = batches_path(history_path)
+    migrate = not os.path.exists(table_path)
+    rows_tmp = _temp_path(dir_path)
+    batches_tmp = _temp_path(dir_path)
+    try:
+        with JsonArrayWriter(rows_tmp) as rows_out, \
+                JsonArrayWriter(batches_tmp) as batches_out:
+            if migrate:
+                kept = (
+                    record for record in _iter_file(history_path)
+                    if "batch" not in record and record_id(record) not in new_ids
+                )
+                last_id = _write_batches(kept, 1, rows_out, batches_out)
+            else:
+                cursor = _BatchCursor(
+                    _iter_file(table_path, with_text=True), batches_out.write_text
+                )
+                for row, text in _iter_file(history_path, with_text=True):
+                    if "batch" not in row:
+                        key = record_id(row)
+                    else:
+                        batch = cursor.find(row["batch"])
+                        if batch is None:
+                            continue
+                        key = f"{row['pair']}_{batch['timestamp']}"
+                    if key not in new_ids:
+                        rows_out.write_text(text)
+                cursor.rest()
+                last_id = cursor.last_id
+            _write_batches(records, last_id + 1, rows_out, batches_out)
+        os.replace(batches_tmp, table_path)
+        os.replace(rows_tmp, history_path)
+    except BaseException:
+        for path in (rows_tmp, batches_tmp):
+            if os.path.exists(path):
+                os.unlink(path)
+        raise
+
+
+class _BatchCursor:
+    """Таблица пакетов, читаемая синхронно со строками истории.
+
+    batches — пары (пакет, текст); passed получает текст каждого
+    пройденного пакета — при перезаписи так прежняя таблица копируется
+    в новую.
+    """
+
+    def __init__(
+            self,
+            batches: Iterator[Tuple[Record, str]],
+            passed: Optional[Callable[[str], None]] = None,
+        ):
+        self._batches = batches
+        self._passed = passed
+        self._current: Optional[Record] = None
+        self.last_id = 0
+
+    def find(self, batch_id: int) -> Optional[Record]:
+        current = self._current
+        while current is None or current["id"] < batch_id:
+            item = next(self._batches, None)
+            if item is None:
+                return None
+            current = self._pass(*item)
+        return current if current["id"] == batch_id else None
+
+    def rest(self) -> None:
+        for batch, text in self._batches:
+            self._pass(batch, text)
+
+    def _pass(self, batch: Record, text: str) -> Record:
+        self._current = batch
+        self.last_id = batch["id"]
+        if self._passed is not None:
+            self._passed(text)
+        return batch
+
+
+def _expand(row: Record, batch: Record) -> Record:
+    pair = row["pair"]
+    from_cur, _, to_cur = pair.partition("_")
+    timestamp = batch["timestamp"]
+    meta = row.get("meta")
+    return {
+        "id": f"{pair}_{timestamp}",
+        "from_currency": from_cur,
+        "to_currency": to_cur,
+        "rate": row["rate"],
+        "timestamp": timestamp,
+        "source": batch["source"],
+        "meta": {**batch["meta"], **meta} if meta else batch["meta"],
+    }
+
+
+def _write_batches(
+        records: Iterable[Record],
+        first_id: int,
+        rows_out: JsonArrayWriter,
+        batches_out: JsonArrayWriter,
+    ) -> int:
+    """Полные записи → пакеты и строки; возвращает номер последнего пакета.
+
+    Пакет — подряд идущие записи с одной меткой времени и источником
+    (одно получение курсов); в его meta уходят поля, совпадающие у всех.
+    """
+    batch_id = first_id - 1
+    for (timestamp, source), group in groupby(
+            records, key=lambda record: (record["timestamp"], record["source"])
+        ):
+        group = list(group)
+        batch_id += 1
+        shared = dict(group[0].get("meta") or {})
+        for record in group[1:]:
+            meta = record.get("meta") or {}
+            for key in [k for k, v in shared.items() if meta.get(k, _MISSING) != v]:
+                del shared[key]
+        batches_out.write(
+            {"id": batch_id, "timestamp": timestamp, "source": source, "meta": shared}
+        )
+        for record in group:
+            row = {
+                "batch": batch_id,
+                "pair": f"{record['from_currency']}_{record['to_currency']}",
+                "rate": record["rate"],
+            }
+            own = {
+                key: value for key, value in (record.get("meta") or {}).items()
+                if key not in shared
+            }
+            if own:
+                row["meta"] = own
+            rows_out.write(row)
+    return batch_id
+
+
+def _iter_file(path: str, with_text: bool = False) -> Iterator[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from iter_json_array(f, with_text=with_text)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+
+
+def _temp_path(dir_path: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=".json", dir=dir_path)
+    os.close(fd)
+    return path
@@ -0,0 +1,201 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from ..core.store import PortfolioStore
+from ..core.utils import ensure_dir
+from .database import DatabaseManager
+from .settings import SingletonMeta
+
+HOLDERS_DIR = "holders"
+HOLDERS_LOCK = "holders"
+# Признак того, что журналы построены по portfolios.json
+BUILT_MARKER = ".built"
+# Журнал сжимается, когда строк больше чем вдвое против держателей
+COMPACT_MIN_LINES = 1024
+# Первая строка переписанного журнала: "#gen N", N растёт при каждой замене
+GENERATION_PREFIX = b"#gen "
+
+
+class _Holdings:
+    """Держатели одной валюты в памяти процесса и позиция в её журнале."""
+
+    __slots__ = ("balances", "total", "offset", "lines", "generation")
+
+    def __init__(self):
+        self.balances: Dict[int, int] = {}
+        self.total = 0
+        self.offset = 0
+        self.lines = 0
+        self.generation: Optional[int] = None
+
+    def apply(self, user_id: int, units: int) -> None:
+        self.total += units - self.balances.get(user_id, 0)
+        if units:
+            self.balances[user_id] = units
+        else:
+            self.balances.pop(user_id, None)
+        self.lines += 1
+
+
+class HoldersIndex(metaclass=SingletonMeta):
+    """Обратный индекс «валюта → (user_id, баланс)» с итогами по валютам.
+
+    На диске для каждой валюты ведётся журнал holders/<CODE>.log со строками
+    "user_id units" — баланс пользователя после сделки в минимальных
+    единицах (0 — кошелёк опустел). Сделка дописывает одну строку, процесс
+    догоняет чужие записи с сохранённого смещения, поэтому запросы стоят
+    O(держателей валюты), а не O(пользователей). Индекс строится один раз
+    по portfolios.json при первом обращении. Сжатие и построение заменяют
+    журнал целиком с новым номером поколения в первой строке; по нему
+    (а не по inode, который ФС может выдать повторно) процесс узнаёт, что
+    его смещение относится к прежнему файлу.
+    """
+
+    def __init__(self):
+        self._state: Dict[Tuple[str, str], _Holdings] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_path(self) -> Path:
+        return Path(DatabaseManager().data_path) / HOLDERS_DIR
+
+    def set_balance(self, user_id: int, currency: str, units: int) -> None:
+        """Баланс пользователя после сделки (вызывается под его блокировкой)."""
+        self._ensure_built()
+        db = DatabaseManager()
+        with db.file_lock(HOLDERS_LOCK), self._lock:
+            holdings = self._catch_up(currency)
+            path = self._log_path(currency)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"{user_id} {units}\n")
+            holdings.apply(user_id, units)
+            holdings.offset = os.path.getsize(path)
+            if holdings.lines > max(COMPACT_MIN_LINES, 2 * len(holdings.balances)):
+                self._compact(currency, holdings)
+
+    def holders(self, currency: str) -> Dict[int, int]:
+        """Держатели валюты: {user_id: баланс в минимальных единицах}."""
+        self._ensure_built()
+        with self._lock:
+            return dict(self._catch_up(currency).balances)
+
+    def total_units(self, currency: str) -> int:
+        """Сумма балансов валюты по всем пользователям."""
+        self._ensure_built()
+        with self._lock:
+            return self._catch_up(currency).total
+
+    def affected_users(self, currencies: Iterable[str]) -> Set[int]:
+        """Пользователи, у которых есть хотя бы одна из валют."""
+        self._ensure_built()
+        users: Set[int] = set()
+        with self._lock:
+            for currency in currencies:
+                users.update(self._catch_up(currency).balances)
+        return users
+
+    def _catch_up(self, currency: str) -> _Holdings:
+        """Применяет строки журнала, дописанные после прошлого чтения."""
+        key = (str(self.base_path), currency)
+        holdings = self._state.get(key)
+        if holdings is None:
+            holdings = self._state[key] = _Holdings()
+        path = self._log_path(currency)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            # журнал удалён при перестроении — держателей нет
+            self._state.pop(key, None)
+            return _Holdings()
+        with f:
+            generation = _read_generation(f)
+            size = os.fstat(f.fileno()).st_size
+            if generation != holdings.generation or size < holdings.offset:
+                # журнал заменён другим процессом — перечитываем с начала
+                holdings = self._state[key] = _Holdings()
+                holdings.generation = generation
+            f.seek(holdings.offset)
+            data = f.read()
+        # последняя строка может дописываться прямо сейчас
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if line.startswith(b"#"):
+                continue
+            user_id, units = line.split()
+            holdings.apply(int(user_id), int(units))
+        holdings.offset += len(complete)
+        return holdings
+
+    def _compact(self, currency: str, holdings: _Holdings) -> None:
+        """Переписывает журнал текущими балансами (под блокировкой индекса)."""
+        path, holdings.generation = self._write_log(
+            currency, holdings.balances.items()
+        )
+        holdings.offset = os.path.getsize(path)
+        holdings.lines = len(holdings.balances)
+
+    def _ensure_built(self) -> None:
+        if (self.base_path / BUILT_MARKER).exists():
+            return
+        with DatabaseManager().file_lock(HOLDERS_LOCK):
+            if (self.base_path / BUILT_MARKER).exists():
+                return
+            self._build()
+
+    def _build(self) -> None:
+        """Начальное построение по portfolios.json (потоковое чтение)."""
+        # балансы всех пользователей — в столбцах PortfolioStore (int64 на
+        # кошелёк), а не в списках кортежей по валютам
+        store = PortfolioStore.from_records(
+            DatabaseManager().iter_records("portfolios.json")
+        )
+        ensure_dir(str(self.base_path))
+        codes = set(store.codes)
+        for stale in self.base_path.glob("*.log"):
+            # журналы валют, которых больше ни у кого нет
+            if stale.stem not in codes:
+                stale.unlink()
+        for currency in codes:
+            self._write_log(currency, store.holders(currency))
+        (self.base_path / BUILT_MARKER).touch()
+        with self._lock:
+            self._state = {
+                key: value for key, value in self._state.items()
+                if key[0] != str(self.base_path)
+            }
+
+    def _write_log(
+            self,
+            currency: str,
+            entries: Iterable[Tuple[int, int]],
+        ) -> Tuple[Path, int]:
+        """Атомарная замена журнала со следующим номером поколения.
+
+        Вызывается под блокировкой индекса; возвращает путь и поколение.
+        """
+        path = self._log_path(currency)
+        try:
+            with open(path, "rb") as f:
+                generation = _read_generation(f) + 1
+        except FileNotFoundError:
+            generation = 1
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"{GENERATION_PREFIX.decode()}{generation}\n")
+            f.writelines(f"{user_id} {units}\n" for user_id, units in entries)
+        os.replace(tmp_path, path)
+        return path, generation
+
+    def _log_path(self, currency: str) -> Path:
+        return self.base_path / f"{currency}.log"
+
+
+def _read_generation(f) -> int:
+    """Поколение журнала из первой строки; 0 — журнал без заголовка."""
+    f.seek(0)
+    first = f.readline()
+    if first.startswith(GENERATION_PREFIX) and first.endswith(b"\n"):
+        return int(first[len(GENERATION_PREFIX):])
+    return 0
@@ -0,0 +1,142 @@
+import json
+from typing import IO, Any, Dict, Iterable, Iterator, Union
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+# Один кодировщик на все записи: json.dumps создаёт новый на каждый вызов
+_encoder = json.JSONEncoder(indent=4, default=str)
+
+
+def iter_json_array(
+        source: Union[str, IO[str]],
+        chunk_size: int = CHUNK_SIZE,
+        with_text: bool = False,
+    ) -> Iterator[Any]:
+    """Элементы JSON-массива верхнего уровня по одному.
+
+    Файл читается кусками, в памяти одновременно находятся только текущий
+    кусок и разбираемый элемент, поэтому размер файла не ограничен памятью.
+    source — путь или открытый текстовый файл. Ошибки формата поднимаются
+    как json.JSONDecodeError (уже выданные элементы при этом остаются
+    корректными). С with_text выдаются пары (элемент, его текст в файле) —
+    неизменённый элемент можно переписать без повторного кодирования.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from _iter_array(f, chunk_size, with_text)
+    else:
+        yield from _iter_array(source, chunk_size, with_text)
+
+
+def _iter_array(f: IO[str], chunk_size: int, with_text: bool) -> Iterator[Any]:
+    buf = f.read(chunk_size)
+    eof = not buf
+    pos = _skip(buf, 0)
+    while pos == len(buf) and not eof:
+        buf, pos, eof = _refill(f, buf, pos, chunk_size)
+        pos = _skip(buf, pos)
+    if pos == len(buf) or buf[pos] != "[":
+        raise json.JSONDecodeError("Ожидался JSON-массив", buf, pos)
+    pos += 1
+    expect_value = True
+    first = True
+    read_size = chunk_size
+    while True:
+        pos = _skip(buf, pos)
+        if pos == len(buf):
+            if eof:
+                raise json.JSONDecodeError("Массив не закрыт", buf, pos)
+            buf, pos, eof = _refill(f, buf, pos, read_size)
+            continue
+        char = buf[pos]
+        if char == "]" and (first or not expect_value):
+            return
+        if not expect_value:
+            if char != ",":
+                raise json.JSONDecodeError("Ожидалась ','", buf, pos)
+            pos += 1
+            expect_value = True
+            continue
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # элемент не поместился в буфер: дочитываем, удваивая порцию,
+            # чтобы длинная запись не разбиралась заново на каждом куске
+            buf, pos, eof = _refill(f, buf, pos, read_size)
+            read_size *= 2
+            continue
+        following = _skip(buf, end)
+        if not eof and (following == len(buf) or buf[following] not in ",]"):
+            # число на границе куска могло оборваться ("2." из "2.5") —
+            # элемент принимается, только когда за ним виден разделитель
+            buf, pos, eof = _refill(f, buf, pos, read_size)
+            continue
+        yield (value, buf[pos:end]) if with_text else value
+        first = False
+        if following < len(buf) and buf[following] == ",":
+            # разделитель уже найден: следующий элемент — без лишнего прохода
+            pos = following + 1
+        else:
+            pos = end
+            expect_value = False
+        read_size = chunk_size
+
+
+def _skip(buf: str, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _refill(f: IO[str], buf: str, pos: int, size: int):
+    """Отбрасывает разобранное начало буфера и дочитывает кусок."""
+    chunk = f.read(size)
+    return buf[pos:] + chunk, 0, not chunk
+
+
+class JsonArrayWriter:
+    """Потоковая запись JSON-массива по одному элементу.
+
+    Формат тот же, что у write_json_array; нужен, когда элементы двух
+    массивов появляются вперемешку и записываются одновременно.
+    """
+
+    def __init__(self, path: str):
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.write_text(_encoder.encode(record).replace("\n", "\n    "))
+
+    def write_text(self, text: str) -> None:
+        """Элемент, уже закодированный в формате файла (из iter_json_array)."""
+        self._file.write(("," if self.count else "") + "\n    " + text)
+        self.count += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.write("\n]" if self.count else "]")
+            self._file.close()
+
+    def __enter__(self) -> 'JsonArrayWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_json_array(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Потоковая запись массива в том же виде, что json.dump(..., indent=4).
+
+    Записи не собираются в список, поэтому размер файла не ограничен
+    памятью. Возвращает число записей.
+    """
+    with JsonArrayWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
@@ -0,0 +1,105 @@
+import json
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..core.utils import ensure_dir
+from .database import DatabaseManager
+from .locks import LockManager
+from .settings import SingletonMeta
+
+LEDGER_FILE = "trades.jsonl"
+INDEX_DIR = "trades_index"
+
+# Запись индекса: (unix-время сделки, смещение строки в журнале)
+_INDEX_ENTRY = struct.Struct("=qq")
+
+
+class TradeLedger(metaclass=SingletonMeta):
+    """Журнал исполненных сделок (только дозапись) с индексом по пользователю.
+
+    Сделки пишутся строками JSON в trades.jsonl. Для каждого пользователя
+    ведётся файл trades_index/<user_id>.idx с парами (время, смещение), поэтому
+    история читается без просмотра чужих записей: границы периода ищутся
+    бинарным поиском, затем читаются только нужные строки журнала.
+    Дозапись строки и элемента индекса идёт под файловой блокировкой
+    журнала: смещение берётся под ней, поэтому другой процесс не может
+    вклиниться между определением смещения и записью.
+    """
+
+    @property
+    def ledger_path(self) -> Path:
+        return Path(DatabaseManager().data_path) / LEDGER_FILE
+
+    def index_path(self, user_id: int) -> Path:
+        return Path(DatabaseManager().data_path) / INDEX_DIR / f"{user_id}.idx"
+
+    def append(
+            self,
+            user_id: int,
+            currency: str,
+            side: str,
+            amount: float,
+            rate: Optional[float],
+            timestamp: Optional[datetime] = None,
+        ) -> Dict[str, Any]:
+        """Дописывает сделку в журнал и индекс пользователя.
+
+        Если индекс записать не удалось, строка журнала обрезается и
+        ошибка поднимается дальше: сделка либо записана целиком, либо нет.
+        """
+        timestamp = timestamp or datetime.now()
+        record = {
+            "user_id": user_id,
+            "currency": currency,
+            "side": side,
+            "amount": amount,
+            "rate": rate,
+            "timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        index_path = self.index_path(user_id)
+        data_path = DatabaseManager().data_path
+        with LockManager().file_lock(data_path, LEDGER_FILE):
+            ensure_dir(str(index_path.parent))
+            with open(self.ledger_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+            try:
+                with open(index_path, "ab") as f:
+                    f.write(_INDEX_ENTRY.pack(int(timestamp.timestamp()), offset))
+            except BaseException:
+                # строка без элемента индекса — сделки нет
+                os.truncate(self.ledger_path, offset)
+                raise
+        return record
+
+    def history(
+            self,
+            user_id: int,
+            limit: Optional[int] = None,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+        ) -> List[Dict[str, Any]]:
+        """Сделки пользователя за период, от новых к старым."""
+        try:
+            with open(self.index_path(user_id), "rb") as f:
+                entries = array("q")
+                entries.frombytes(f.read())
+        except FileNotFoundError:
+            return []
+        times, offsets = entries[0::2], entries[1::2]
+        lo = bisect_left(times, int(date_from.timestamp())) if date_from else 0
+        hi = bisect_right(times, int(date_to.timestamp())) if date_to else len(times)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        records = []
+        with open(self.ledger_path, "rb") as f:
+            for offset in reversed(offsets[lo:hi]):
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
@@ -0,0 +1,131 @@
+import errno
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from ..metrics import DEFAULT_BUCKETS, MetricsRegistry
+from .settings import SingletonMeta
+
+try:
+    import fcntl
+except ImportError:  # Windows: остаются только блокировки внутри процесса
+    fcntl = None
+
+LOCK_DIR = ".locks"
+USER_LOCK_FILE = "users.lock"
+STRIPES = 64
+
+# Ожидание блокировки обычно короче миллисекунды — добавляем мелкие корзины
+LOCK_WAIT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025) + DEFAULT_BUCKETS
+
+
+def observe_lock_wait(operation: str, seconds: float) -> None:
+    MetricsRegistry().histogram(
+        "valutatrade_db_lock_wait_seconds",
+        "Ожидание блокировок хранилища",
+        LOCK_WAIT_BUCKETS,
+        operation=operation,
+    ).observe(seconds)
+
+
+class LockManager(metaclass=SingletonMeta):
+    """Блокировки данных внутри процесса и между процессами.
+
+    Пользовательская блокировка: полоса threading.Lock по user_id (потоки
+    процесса) плюс fcntl-блокировка одного байта с номером user_id в общем
+    файле .locks/users.lock (процессы). Разные пользователи не мешают друг
+    другу, кроме совпадения полосы внутри одного процесса.
+
+    Файловая блокировка (flock на .locks/<файл>.lock) короткая: на время
+    перечитывания, слияния и записи общего JSON-файла.
+    """
+
+    def __init__(self, stripes: int = STRIPES):
+        self._stripes: List[threading.Lock] = [
+            threading.Lock() for _ in range(stripes)
+        ]
+        # Один дескриптор на каталог: POSIX-блокировки принадлежат процессу,
+        # и закрытие любого дескриптора файла снимает их все
+        self._range_fds: Dict[str, int] = {}
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._fds_lock = threading.Lock()
+
+    @contextmanager
+    def user_lock(self, data_path: str, user_id: int) -> Iterator[None]:
+        """Эксклюзивный доступ к данным пользователя."""
+        start = time.perf_counter()
+        stripe = self._stripes[user_id % len(self._stripes)]
+        with stripe:
+            fd = self._range_fd(data_path)
+            if fd is not None:
+                _lock_range(fd, user_id)
+            observe_lock_wait("user", time.perf_counter() - start)
+            try:
+                yield
+            finally:
+                if fd is not None:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, user_id)
+
+    @contextmanager
+    def file_lock(self, data_path: str, filename: str) -> Iterator[None]:
+        """Эксклюзивное чтение-изменение-запись файла данных."""
+        start = time.perf_counter()
+        if fcntl is None:
+            with self._fds_lock:
+                lock = self._file_locks.setdefault(filename, threading.Lock())
+            with lock:
+                observe_lock_wait("file", time.perf_counter() - start)
+                yield
+            return
+        # свой дескриптор на каждый захват: flock исключает и потоки процесса
+        fd = os.open(
+            os.path.join(self._lock_dir(data_path), f"{filename}.lock"),
+            os.O_RDWR | os.O_CREAT,
+            0o644,
+        )
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            observe_lock_wait("file", time.perf_counter() - start)
+            yield
+        finally:
+            os.close(fd)
+
+    def _range_fd(self, data_path: str) -> Optional[int]:
+        if fcntl is None:
+            return None
+        key = os.path.abspath(data_path)
+        with self._fds_lock:
+            fd = self._range_fds.get(key)
+            if fd is None:
+                fd = os.open(
+                    os.path.join(self._lock_dir(data_path), USER_LOCK_FILE),
+                    os.O_RDWR | os.O_CREAT,
+                    0o644,
+                )
+                self._range_fds[key] = fd
+            return fd
+
+    @staticmethod
+    def _lock_dir(data_path: str) -> str:
+        path = os.path.join(data_path, LOCK_DIR)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+
+def _lock_range(fd: int, offset: int) -> None:
+    """fcntl-блокировка байта с повтором при EDEADLK.
+
+    Ядро считает владельцем POSIX-блокировки процесс, а не поток, поэтому
+    ожидание потоками разных процессов чужих пользователей может выглядеть
+    как взаимоблокировка, хотя её нет. В этом случае захват повторяется.
+    """
+    while True:
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, offset)
+            return
+        except OSError as e:
+            if e.errno != errno.EDEADLK:
+                raise
+            time.sleep(0.001)
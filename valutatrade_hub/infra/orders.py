@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from ..core.orders import Order, OrderBook
+from .database import DatabaseManager
+from .settings import SingletonMeta
+
+ORDERS_FILE = "orders.json"
+
+
+class OrderRepository(metaclass=SingletonMeta):
+    """orders.json и книга открытых ордеров в памяти.
+
+    Книга строится один раз и перестраивается, только если файл изменил
+    другой процесс (по mtime/размеру), поэтому проверка срабатываний при
+    обновлении курсов не перечитывает все ордера.
+    """
+
+    def __init__(self):
+        self._orders: Dict[int, Order] = {}
+        self._book = OrderBook()
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._loaded = False
+
+    def load(self) -> Tuple[Dict[int, Order], OrderBook]:
+        """Все ордера по id и книга открытых."""
+        db = DatabaseManager()
+        signature = db.signature(ORDERS_FILE)
+        if not self._loaded or signature != self._signature:
+            orders = [Order.from_dict(data) for data in db.load(ORDERS_FILE)]
+            self._orders = {order.order_id: order for order in orders}
+            self._book = OrderBook()
+            self._book.extend(orders)
+            self._signature = signature
+            self._loaded = True
+        return self._orders, self._book
+
+    @contextmanager
+    def locked(self) -> Iterator[Tuple[Dict[int, Order], OrderBook]]:
+        """Актуальные ордера под файловой блокировкой (для изменения и save)."""
+        with DatabaseManager().file_lock(ORDERS_FILE):
+            try:
+                yield self.load()
+            except BaseException:
+                # изменения в памяти не сохранены — перечитать при следующем load
+                self._loaded = False
+                raise
+
+    def save(self) -> None:
+        db = DatabaseManager()
+        db.save(ORDERS_FILE, [order.to_dict() for order in self._orders.values()])
+        self._signature = db.signature(ORDERS_FILE)
@@ -0,0 +1,233 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from ..core.utils import ensure_dir, to_seconds
+from .history_file import read_history
+from .locks import LockManager
+
+INDEX_DIR = "history_index"
+# Подпись файла истории, которому соответствует индекс
+META_FILE = "meta.json"
+# Запись индекса: время в секундах (int64) и курс (float64)
+ENTRY = struct.Struct("<qd")
+
+Signature = Tuple[int, int]
+
+
+class _PairView:
+    """Файл индекса пары, отображённый в память, и его inode/размер."""
+
+    __slots__ = ("mapped", "count", "inode", "size")
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.inode, self.size = stat.st_ino, stat.st_size
+            self.count = self.size // ENTRY.size
+            # пустой файл отобразить нельзя
+            self.mapped = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.count else None
+            )
+
+    def time_at(self, position: int) -> int:
+        return ENTRY.unpack_from(self.mapped, position * ENTRY.size)[0]
+
+    def close(self) -> None:
+        if self.mapped is not None:
+            self.mapped.close()
+
+
+class RateHistoryIndex:
+    """Индекс истории курсов по времени для запросов «курс на момент».
+
+    Для каждой пары ведётся файл history_index/<FROM>_<TO>.idx из записей
+    (секунды, курс), упорядоченных по времени. Файлы отображаются в память,
+    поиск — bisect по номеру записи, поэтому запрос стоит O(log n) и не
+    читает exchange_rates.json. Storage дописывает индекс вместе с
+    историей; если история изменена в обход Storage (подпись в meta.json
+    не совпала), индекс перестраивается одним потоковым проходом.
+    """
+
+    def __init__(self, history_path: str):
+        self.history_path = history_path
+        self.base_path = os.path.join(os.path.dirname(history_path), INDEX_DIR)
+        self._views: Dict[str, _PairView] = {}
+        self._checked: Optional[Signature] = None
+        self._lock = threading.Lock()
+
+    def rate_at(self, pair: str, at: datetime) -> Optional[Tuple[float, int]]:
+        """Последний курс пары не позже at: (курс, время в секундах) или None."""
+        if not self._ensure_current():
+            return None
+        seconds = to_seconds(at)
+        with self._lock:
+            view = self._view(pair)
+            if view is None:
+                return None
+            position = bisect_right(
+                range(view.count), seconds, key=view.time_at
+            ) - 1
+            if position < 0:
+                return None
+            moment, rate = ENTRY.unpack_from(view.mapped, position * ENTRY.size)
+            return rate, moment
+
+    def is_current(self) -> bool:
+        """Индекс соответствует текущему файлу истории."""
+        signature = self._signature()
+        return signature is not None and signature == self._stored_signature()
+
+    def add(self, records: Iterable[Mapping[str, Any]]) -> None:
+        """Записи, только что дописанные в историю (под блокировкой истории).
+
+        Обычно новые записи не раньше последних в индексе и дописываются в
+        конец файла пары; более ранние вливаются переписыванием файла.
+        """
+        ensure_dir(self.base_path)
+        for pair, (times, rates) in _group(records).items():
+            path = self._pair_path(pair)
+            last = _last_time(path)
+            if last is None or times[0] >= last:
+                with open(path, "ab") as f:
+                    f.write(_pack(times, rates))
+            else:
+                old_times, old_rates = _read_pair(path)
+                _write_pair(path, old_times + times, old_rates + rates)
+        self._store_signature()
+
+    def rebuild(self) -> None:
+        """Построение по exchange_rates.json целиком (под блокировкой истории)."""
+        ensure_dir(self.base_path)
+        pairs = _group(read_history(self.history_path))
+        for name in os.listdir(self.base_path):
+            if name.endswith(".idx") and name[:-4] not in pairs:
+                os.unlink(os.path.join(self.base_path, name))
+        for pair, (times, rates) in pairs.items():
+            _write_pair(self._pair_path(pair), times, rates)
+        self._store_signature()
+
+    def _ensure_current(self) -> bool:
+        """Проверка подписи истории; при расхождении — перестроение."""
+        signature = self._signature()
+        if signature is None:
+            return False
+        if signature == self._checked:
+            return True
+        if signature != self._stored_signature():
+            history_dir, history_file = os.path.split(self.history_path)
+            with LockManager().file_lock(history_dir, history_file):
+                if not self.is_current():
+                    self.rebuild()
+            signature = self._signature()
+        self._checked = signature
+        return True
+
+    def _view(self, pair: str) -> Optional[_PairView]:
+        """Отображение файла пары; заново, если файл дописан или заменён."""
+        view = self._views.get(pair)
+        try:
+            stat = os.stat(self._pair_path(pair))
+        except FileNotFoundError:
+            return None
+        if view is None or (view.inode, view.size) != (stat.st_ino, stat.st_size):
+            if view is not None:
+                view.close()
+            view = self._views[pair] = _PairView(self._pair_path(pair))
+        return view
+
+    def _signature(self) -> Optional[Signature]:
+        try:
+            stat = os.stat(self.history_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _stored_signature(self) -> Optional[Signature]:
+        try:
+            with open(self._meta_path(), "r", encoding="utf-8") as f:
+                return tuple(json.load(f)["history"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+
+    def _store_signature(self) -> None:
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"history": self._signature()}, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.base_path, META_FILE)
+
+    def _pair_path(self, pair: str) -> str:
+        return os.path.join(self.base_path, f"{pair}.idx")
+
+
+def _group(records: Iterable[Mapping[str, Any]]) -> Dict[str, Tuple[array, array]]:
+    """Записи истории → {пара: (времена, курсы)}, по времени внутри пары."""
+    pairs: Dict[str, Tuple[array, array]] = {}
+    # одно обновление пишет все пары с одной меткой времени
+    last_timestamp, seconds = None, 0
+    for record in records:
+        if record["timestamp"] != last_timestamp:
+            last_timestamp = record["timestamp"]
+            seconds = to_seconds(datetime.fromisoformat(last_timestamp))
+        pair = f"{record['from_currency']}_{record['to_currency']}"
+        series = pairs.get(pair)
+        if series is None:
+            series = pairs[pair] = (array("q"), array("d"))
+        series[0].append(seconds)
+        series[1].append(float(record["rate"]))
+    return {pair: _sorted(times, rates) for pair, (times, rates) in pairs.items()}
+
+
+def _sorted(times: array, rates: array) -> Tuple[array, array]:
+    """Устойчивая сортировка по времени: из равных позже записанная — последней."""
+    if all(a <= b for a, b in zip(times, times[1:])):
+        return times, rates
+    order = sorted(range(len(times)), key=times.__getitem__)
+    return array("q", map(times.__getitem__, order)), array(
+        "d", map(rates.__getitem__, order)
+    )
+
+
+def _pack(times: array, rates: array) -> bytes:
+    return b"".join(map(ENTRY.pack, times, rates))
+
+
+def _read_pair(path: str) -> Tuple[array, array]:
+    with open(path, "rb") as f:
+        data = f.read()
+    times, rates = array("q"), array("d")
+    for moment, rate in ENTRY.iter_unpack(data[:len(data) - len(data) % ENTRY.size]):
+        times.append(moment)
+        rates.append(rate)
+    return times, rates
+
+
+def _write_pair(path: str, times: array, rates: array) -> None:
+    """Атомарная замена файла пары: читатели видят смену inode."""
+    times, rates = _sorted(times, rates)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_pack(times, rates))
+    os.replace(tmp_path, path)
+
+
+def _last_time(path: str) -> Optional[int]:
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < ENTRY.size:
+                return None
+            f.seek(size - size % ENTRY.size - ENTRY.size)
+            return ENTRY.unpack(f.read(ENTRY.size))[0]
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,138 @@
+import heapq
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..core.currencies import CryptoCurrency, FiatCurrency, get_currency
+from ..core.exceptions import CurrencyNotFoundError
+from .database import DatabaseManager
+from .settings import SingletonMeta
+
+RateRow = Tuple[str, float]
+
+
+def asset_class(code: str) -> Optional[str]:
+    """Класс актива по коду валюты: 'crypto', 'fiat' или None."""
+    try:
+        currency = get_currency(code)
+    except CurrencyNotFoundError:
+        return None
+    if isinstance(currency, CryptoCurrency):
+        return "crypto"
+    if isinstance(currency, FiatCurrency):
+        return "fiat"
+    return None
+
+
+class RatesSnapshot:
+    """Снимок rates.json с ленивыми отсортированными представлениями по базе."""
+
+    def __init__(self, pairs: Dict[str, Dict[str, Any]], last_refresh: Optional[str]):
+        self.pairs = pairs
+        self.last_refresh = last_refresh
+        self._views: Dict[Tuple[str, Optional[str]], List[RateRow]] = {}
+
+    def usd_rate(self, code: str) -> Optional[float]:
+        """Курс CODE→USD из снимка (None, если пары нет)."""
+        if code == "USD":
+            return 1.0
+        pair = self.pairs.get(f"{code}_USD")
+        return float(pair["rate"]) if pair else None
+
+    def rate(self, code: str, base: str = "USD") -> Optional[float]:
+        """Курс CODE→BASE через USD."""
+        code_usd = self.usd_rate(code)
+        if code_usd is None:
+            return None
+        return code_usd / self._base_rate(base)
+
+    def view(self, base: str = "USD", asset: Optional[str] = None) -> List[RateRow]:
+        """Строки (код, курс к base), отсортированные по коду; строятся один раз."""
+        key = (base, asset)
+        rows = self._views.get(key)
+        if rows is None:
+            base_rate = self._base_rate(base)
+            rows = sorted(
+                (pair.split("_")[0], float(p["rate"]) / base_rate)
+                for pair, p in self.pairs.items()
+                if asset is None or asset_class(pair.split("_")[0]) == asset
+            )
+            self._views[key] = rows
+        return rows
+
+    def select(
+            self,
+            base: str = "USD",
+            prefix: Optional[str] = None,
+            asset: Optional[str] = None,
+        ) -> List[RateRow]:
+        """Строки представления с фильтром по префиксу кода (бинарный поиск)."""
+        rows = self.view(base, asset)
+        if not prefix:
+            return rows
+        prefix = prefix.upper()
+        lo = bisect_left(rows, prefix, key=itemgetter(0))
+        hi = bisect_left(rows, prefix + "\uffff", lo=lo, key=itemgetter(0))
+        return rows[lo:hi]
+
+    def top(
+            self,
+            base: str,
+            n: int,
+            prefix: Optional[str] = None,
+            asset: Optional[str] = None,
+        ) -> List[RateRow]:
+        """N самых дорогих валют (heapq.nlargest вместо полной сортировки)."""
+        return heapq.nlargest(n, self.select(base, prefix, asset), key=itemgetter(1))
+
+    def _base_rate(self, base: str) -> float:
+        base_rate = self.usd_rate(base)
+        if not base_rate:
+            raise ValueError(f"Курс {base}→USD не найден в кеше.")
+        return base_rate
+
+
+class RatesCache(metaclass=SingletonMeta):
+    """Кеш снимка rates.json, инвалидируемый по mtime/размеру файла."""
+
+    def __init__(self):
+        self._snapshot: Optional[RatesSnapshot] = None
+        self._signature: Optional[Tuple[Any, ...]] = None
+
+    def snapshot(self) -> RatesSnapshot:
+        db = DatabaseManager()
+        signature = db.signature("rates.json")
+        if self._snapshot is None or signature != self._signature:
+            data = db.load("rates.json")
+            if not isinstance(data, dict):
+                data = {}
+            self._snapshot = RatesSnapshot(
+                data.get("pairs") or {}, data.get("last_refresh")
+            )
+            self._signature = signature
+        return self._snapshot
+
+    def changes(
+            self,
+            interval: float,
+            stop: Optional[threading.Event] = None,
+        ) -> Iterator[RatesSnapshot]:
+        """Подписка на изменения rates.json: снимок сразу и после каждой смены.
+
+        Файл проверяется раз в interval секунд одним stat, перечитывается
+        только после изменения; несколько обновлений за интервал дают один
+        снимок. Останавливается по stop.
+        """
+        stop = stop or threading.Event()
+        snapshot = self.snapshot()
+        yield snapshot
+        while not stop.wait(interval):
+            current = self.snapshot()
+            if current is not snapshot:
+                snapshot = current
+                yield snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+        self._signature = None
@@ -0,0 +1,185 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from ..core.models import Wallet
+from ..core.utils import ensure_dir
+from .database import DatabaseManager
+from .rates_cache import RatesCache
+from .settings import SingletonMeta
+
+VALUATION_DIR = "valuation"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class ValuationTracker(metaclass=SingletonMeta):
+    """Инкрементальная оценка портфелей в USD и P&L по средней цене.
+
+    Для каждого пользователя хранится состояние valuation/<user_id>.json:
+    по валютам количество, себестоимость и курс последней оценки, плюс
+    текущая стоимость и реализованная прибыль. Инвариант: стоимость равна
+    сумме количество × курс оценки, поэтому сделка меняет её на
+    Δколичество × курс, а обновление курсов — на количество × Δкурс;
+    портфели с диска не перечитываются. Каждое событие дописывает точку
+    в ряд valuation/<user_id>.jsonl.
+    """
+
+    @property
+    def base_path(self) -> Path:
+        return Path(DatabaseManager().data_path) / VALUATION_DIR
+
+    def on_trade(
+            self,
+            user_id: int,
+            currency: str,
+            side: str,
+            amount: float,
+            rate: float,
+            timestamp: Optional[datetime] = None,
+        ) -> Dict[str, Any]:
+        """Учёт сделки (вызывается после сохранения портфеля)."""
+        db = DatabaseManager()
+        with db.user_lock(user_id):
+            state = self._load_state(user_id)
+            if state is None:
+                # первая сделка: оценка портфеля после неё по текущим курсам
+                state = self._bootstrap(user_id)
+            else:
+                self._apply_trade(state, currency, side, amount, rate)
+            return self._commit(state, side, timestamp)
+
+    def on_rates(
+            self,
+            rates: Mapping[str, float],
+            user_ids: Optional[Iterable[int]] = None,
+            timestamp: Optional[datetime] = None,
+        ) -> int:
+        """Переоценка портфелей по новым курсам {код: курс к USD}.
+
+        user_ids — держатели обновлённых валют; без него просматриваются
+        состояния всех пользователей.
+        """
+        if not self.base_path.exists():
+            return 0
+        if user_ids is None:
+            user_ids = [int(path.stem) for path in self.base_path.glob("*.json")]
+        db = DatabaseManager()
+        updated = 0
+        for user_id in user_ids:
+            with db.user_lock(user_id):
+                state = self._load_state(user_id)
+                if state is None:
+                    continue
+                changed = False
+                for code, holding in state["holdings"].items():
+                    new_rate = rates.get(code)
+                    if new_rate is None or new_rate == holding["rate"]:
+                        continue
+                    state["value"] += holding["amount"] * (new_rate - holding["rate"])
+                    holding["rate"] = new_rate
+                    changed = True
+                if changed:
+                    self._commit(state, "rates", timestamp)
+                    updated += 1
+        return updated
+
+    def series(
+            self,
+            user_id: int,
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+        ) -> List[Dict[str, Any]]:
+        """Точки ряда за период (по возрастанию времени) и последняя до него.
+
+        Первой в результат попадает последняя точка до date_from, если она
+        есть, — от неё отсчитывается изменение за период.
+        """
+        start = date_from.strftime(TIMESTAMP_FORMAT) if date_from else None
+        end = date_to.strftime(TIMESTAMP_FORMAT) if date_to else None
+        baseline = None
+        points = []
+        try:
+            with open(self.base_path / f"{user_id}.jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    point = json.loads(line)
+                    if end and point["timestamp"] > end:
+                        break
+                    if start and point["timestamp"] < start:
+                        baseline = point
+                    else:
+                        points.append(point)
+        except FileNotFoundError:
+            return []
+        return ([baseline] if baseline else []) + points
+
+    @staticmethod
+    def _apply_trade(
+            state: Dict[str, Any],
+            currency: str,
+            side: str,
+            amount: float,
+            rate: float,
+        ) -> None:
+        holding = state["holdings"].setdefault(
+            currency, {"amount": 0.0, "cost": 0.0, "rate": rate}
+        )
+        if side == "buy":
+            holding["amount"] += amount
+            holding["cost"] += amount * rate
+            state["value"] += amount * holding["rate"]
+            return
+        average = holding["cost"] / holding["amount"] if holding["amount"] else rate
+        sold = min(amount, holding["amount"])
+        state["realized"] += sold * (rate - average)
+        holding["cost"] -= sold * average
+        holding["amount"] -= sold
+        state["value"] -= sold * holding["rate"]
+
+    def _bootstrap(self, user_id: int) -> Dict[str, Any]:
+        """Начальное состояние из портфеля: себестоимость = текущая оценка."""
+        record = DatabaseManager().find_by_id("portfolios.json", "user_id", user_id)
+        snapshot = RatesCache().snapshot()
+        state = {"user_id": user_id, "holdings": {}, "value": 0.0, "realized": 0.0}
+        for code, w_data in (record or {}).get("wallets", {}).items():
+            currency_code = w_data.get("currency_code", code)
+            amount = Wallet._from_stored(currency_code, w_data).balance
+            rate = snapshot.usd_rate(currency_code) or 0.0
+            state["holdings"][currency_code] = {
+                "amount": amount, "cost": amount * rate, "rate": rate
+            }
+            state["value"] += amount * rate
+        return state
+
+    def _commit(
+            self,
+            state: Dict[str, Any],
+            event: str,
+            timestamp: Optional[datetime],
+        ) -> Dict[str, Any]:
+        cost = sum(holding["cost"] for holding in state["holdings"].values())
+        point = {
+            "timestamp": (timestamp or datetime.now()).strftime(TIMESTAMP_FORMAT),
+            "event": event,
+            "value": state["value"],
+            "cost": cost,
+            "realized": state["realized"],
+            "unrealized": state["value"] - cost,
+        }
+        user_id = state["user_id"]
+        ensure_dir(str(self.base_path))
+        tmp_path = self.base_path / f"{user_id}.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.base_path / f"{user_id}.json")
+        with open(self.base_path / f"{user_id}.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(point) + "\n")
+        return point
+
+    def _load_state(self, user_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.base_path / f"{user_id}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
@@ -1,10 +1,94 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import shutil
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
 
 from .core.utils import ensure_dir
 
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+_listeners: Dict[str, QueueListener] = {}
+_compressor: Optional['ThreadPoolExecutor'] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна JSON-запись на строку; структурные поля берутся из record.fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": self.formatTime(record, TIMESTAMP_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Человекочитаемый вывод в консоль: LEVEL: key="value" ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None)
+        if not fields:
+            return f"{record.levelname}: {record.getMessage()}"
+        timestamp = self.formatTime(record, TIMESTAMP_FORMAT)
+        pairs = [f'timestamp="{timestamp}"'] + [
+            f'{k}="{v}"' for k, v in fields.items() if v is not None
+        ]
+        return f"{record.levelname}: {' '.join(pairs)}"
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Кладёт запись в очередь как есть: форматирование — в потоке слушателя."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """Переименование при ротации; сжатие выполняется в отдельном потоке."""
+    global _compressor
+    plain = dest[:-len(".gz")] if dest.endswith(".gz") else f"{dest}.raw"
+    os.replace(source, plain)
+    if _compressor is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        _compressor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="log-gzip"
+        )
+    try:
+        _compressor.submit(_compress, plain, dest)
+    except RuntimeError:
+        # пул уже остановлен (завершение интерпретатора) — сжимаем сразу
+        _compress(plain, dest)
+
+
+def _compress(plain: str, dest: str) -> None:
+    import gzip
+
+    with open(plain, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(plain)
+
 
 def setup_logging(
         log_path: str = "logs",
@@ -12,25 +96,58 @@ def setup_logging(
         log_file: str = "actions.log",
         console: bool = True,
     ):
+    """Неблокирующий логгер: запись в очередь, вывод в фоновом QueueListener.
+
+    Файл пишется в формате JSON Lines, ротированные файлы сжимаются gzip
+    в отдельном потоке.
+    """
     ensure_dir(log_path)
     file_path = Path(log_path) / log_file
     file_handler = RotatingFileHandler(
         file_path, maxBytes=5*1024*1024, backupCount=5, encoding="utf-8"
     )
-    formatter = logging.Formatter('%(levelname)s: %(message)s')
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonLinesFormatter())
+    file_handler.namer = _gzip_namer
+    file_handler.rotator = _gzip_rotator
+    handlers = [file_handler]
+
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(KeyValueFormatter())
+        handlers.append(console_handler)
 
     logger_name = "ValutaTrade" if "parser" not in log_file else "ValutaTrade.Parser"
     logger = logging.getLogger(logger_name)
     logger.setLevel(getattr(logging, level))
 
+    previous = _listeners.pop(logger_name, None)
+    if previous is not None:
+        previous.stop()
+    log_queue: queue.Queue = queue.Queue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger_name] = listener
+
     logger.handlers.clear()
     logger.propagate = False
-    logger.addHandler(file_handler)
-
-    if console:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
 
     return logger
+
+
+def flush_logging() -> None:
+    """Ждёт, пока слушатели выведут все поставленные в очередь записи."""
+    for listener in list(_listeners.values()):
+        listener.queue.join()
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь и останавливает фоновые слушатели."""
+    while _listeners:
+        _, listener = _listeners.popitem()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,215 @@
+import functools
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .infra.settings import SingletonMeta
+
+# Границы корзин гистограмм задержек, секунды
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    __slots__ = ("name", "labels", "_value", "_lock")
+
+    def __init__(self, name: str, labels: Labels):
+        self.name = name
+        self.labels = labels
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (совместима с Prometheus)."""
+
+    __slots__ = ("name", "labels", "buckets", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, name: str, labels: Labels, buckets: Tuple[float, ...]):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # последняя корзина — +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative_counts(self) -> List[int]:
+        result, running = [], 0
+        for count in self._counts:
+            running += count
+            result.append(running)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля: верхняя граница корзины, в которую он попадает."""
+        if not self._count:
+            return None
+        rank = q * self._count
+        for bound, cumulative in zip(self.buckets, self.cumulative_counts()):
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+Metric = Union[Counter, Histogram]
+
+
+class MetricsRegistry(metaclass=SingletonMeta):
+    """Реестр метрик процесса: счётчики и гистограммы с метками."""
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Labels], Metric] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str = "", **labels: Any) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def histogram(
+            self,
+            name: str,
+            help_text: str = "",
+            buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+            **labels: Any,
+        ) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets)
+
+    def collect(self) -> List[Metric]:
+        with self._lock:
+            return sorted(
+                self._metrics.values(), key=lambda m: (m.name, m.labels)
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus."""
+        lines: List[str] = []
+        seen = set()
+        for metric in self.collect():
+            if metric.name not in seen:
+                seen.add(metric.name)
+                kind = "counter" if isinstance(metric, Counter) else "histogram"
+                if self._help.get(metric.name):
+                    lines.append(f"# HELP {metric.name} {self._help[metric.name]}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            if isinstance(metric, Counter):
+                lines.append(
+                    f"{metric.name}{_format_labels(metric.labels)} {metric.value}"
+                )
+                continue
+            bounds = [str(b) for b in metric.buckets] + ["+Inf"]
+            for bound, cumulative in zip(bounds, metric.cumulative_counts()):
+                labels = _format_labels(metric.labels + (("le", bound),))
+                lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(metric.labels)
+            lines.append(f"{metric.name}_sum{labels} {metric.sum}")
+            lines.append(f"{metric.name}_count{labels} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Атомарная запись для textfile collector node_exporter (*.prom)."""
+        dir_path = os.path.dirname(path) or "."
+        os.makedirs(dir_path, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w",
+            delete=False,
+            suffix=".tmp",
+            dir=dir_path,
+            encoding="utf-8",
+            ) as tmp:
+            tmp.write(self.render_prometheus())
+            tmp_path = tmp.name
+        os.replace(tmp_path, path)
+
+    def _get_or_create(self, cls, name, help_text, labels, *args) -> Metric:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(name, key[1], *args)
+                    self._metrics[key] = metric
+                    if help_text:
+                        self._help.setdefault(name, help_text)
+        return metric
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def observe_call(action: str, seconds: float, result: str) -> None:
+    """Учёт вызова use case: задержка и число вызовов по результату."""
+    registry = MetricsRegistry()
+    registry.histogram(
+        "valutatrade_usecase_duration_seconds",
+        "Длительность выполнения use case",
+        action=action,
+    ).observe(seconds)
+    registry.counter(
+        "valutatrade_usecase_calls_total",
+        "Число вызовов use case по результату",
+        action=action,
+        result=result,
+    ).inc()
+
+
+def track(action: str):
+    """Декоратор: метрики задержки и вызовов без записи в лог."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                observe_call(action, time.perf_counter() - start, "ERROR")
+                raise
+            observe_call(action, time.perf_counter() - start, "OK")
+            return result
+        return wrapper
+    return decorator
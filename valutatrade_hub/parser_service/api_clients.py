@@ -1,7 +1,5 @@
 import abc
-from typing import Any, Dict
-
-import requests
+from typing import Any, Callable, Dict, FrozenSet
 
 from ..core.exceptions import ApiRequestError
 from .config import ParserConfig
@@ -13,11 +11,22 @@ class BaseApiClient(abc.ABC):
         """Возвращает {pair: {'rate': float, 'meta': dict}}"""
         pass
 
+    @abc.abstractmethod
+    def pairs(self) -> FrozenSet[str]:
+        """Пары, которые провайдер отдаёт при текущих настройках."""
+        pass
+
 class CoinGeckoClient(BaseApiClient):
     def __init__(self, config: ParserConfig):
         self.config = config
 
+    def pairs(self) -> FrozenSet[str]:
+        base = self.config.BASE_CURRENCY
+        return frozenset(f"{code}_{base}" for code in self.config.CRYPTO_CURRENCIES)
+
     def fetch_rates(self) -> Dict[str, Dict[str, Any]]:
+        import requests
+
         ids = ",".join(
             self.config.CRYPTO_ID_MAP[code] for code in self.config.CRYPTO_CURRENCIES
         )
@@ -53,9 +62,15 @@ class ExchangeRateApiClient(BaseApiClient):
     def __init__(self, config: ParserConfig):
         self.config = config
 
+    def pairs(self) -> FrozenSet[str]:
+        base = self.config.BASE_CURRENCY
+        return frozenset(f"{code}_{base}" for code in self.config.FIAT_CURRENCIES)
+
     def fetch_rates(self) -> Dict[str, Dict[str, Any]]:
         if not self.config.EXCHANGERATE_API_KEY:
             raise ValueError("EXCHANGERATE_API_KEY не установлен")
+        import requests
+
         url = (
             f"{self.config.EXCHANGERATE_API_URL}/"
             f"{self.config.EXCHANGERATE_API_KEY}/latest/"
@@ -86,3 +101,10 @@ class ExchangeRateApiClient(BaseApiClient):
             return rates
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"ExchangeRate-API: {str(e)}")
+
+# Клиенты по имени источника — из них собираются запасные провайдеры
+# (ParserConfig.SECONDARY_PROVIDERS); новый провайдер добавляется сюда
+PROVIDER_CLIENTS: Dict[str, Callable[[ParserConfig], BaseApiClient]] = {
+    "CoinGecko": CoinGeckoClient,
+    "ExchangeRate-API": ExchangeRateApiClient,
+}
@@ -4,11 +4,15 @@ from typing import Dict, Tuple
 
 from ..core.utils import load_env_file
 
-load_env_file()
+
+def _api_key_from_env() -> str:
+    """Ключ API читается из окружения; .env подгружается при первом обращении."""
+    load_env_file()
+    return os.getenv("EXCHANGERATE_API_KEY")
 
 @dataclass
 class ParserConfig:
-    EXCHANGERATE_API_KEY: str = os.getenv("EXCHANGERATE_API_KEY")
+    EXCHANGERATE_API_KEY: str = field(default_factory=_api_key_from_env)
 
     COINGECKO_URL: str = "https://api.coingecko.com/api/v3/simple/price"
     EXCHANGERATE_API_URL: str = "https://v6.exchangerate-api.com/v6"
@@ -26,3 +30,25 @@ class ParserConfig:
     HISTORY_FILE_PATH: str = "data/exchange_rates.json"
 
     REQUEST_TIMEOUT: int = 10
+
+    # Запасные провайдеры (RatesUpdater.secondaries): запрос дублируется, если
+    # основной не ответил за HEDGE_PERCENTILE своей обычной задержки
+    HEDGE_PERCENTILE: float = 0.95
+    HEDGE_DEFAULT_DELAY: float = 1.0
+    HEDGE_MIN_DELAY: float = 0.01
+    # Ответов, из которых берётся медиана (1 — первый корректный ответ)
+    QUORUM: int = 1
+    # Запасные провайдеры по имени основного источника:
+    # {"CoinGecko": ("<имя>", ...)}, имена — из api_clients.PROVIDER_CLIENTS.
+    # Задаются по источнику, а не по паре: провайдер отдаёт все свои пары
+    # одним запросом, и задержку определяет этот запрос
+    SECONDARY_PROVIDERS: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    # Фоновая запись истории: обновлений в очереди до обратного давления,
+    # записей в пакете и ожидание следующих обновлений перед записью (с)
+    HISTORY_QUEUE_SIZE: int = 16
+    HISTORY_BATCH_SIZE: int = 5000
+    HISTORY_LINGER: float = 0.5
+    # Записей, удерживаемых для повтора после неудачной записи истории;
+    # сверх этого отбрасываются самые старые
+    HISTORY_MAX_RETAINED: int = 50000
@@ -0,0 +1,250 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from ..core.exceptions import ApiRequestError
+from ..infra.settings import SingletonMeta
+from .api_clients import PROVIDER_CLIENTS, BaseApiClient
+from .config import ParserConfig
+
+logger = logging.getLogger("ValutaTrade.Parser")
+
+Rates = Dict[str, Dict[str, Any]]
+# (имя источника, клиент)
+Provider = Tuple[str, BaseApiClient]
+
+LATENCY_WINDOW = 200
+# Меньше отметок — перцентиль ненадёжен, используется задержка по умолчанию
+MIN_SAMPLES = 20
+
+
+class LatencyTracker(metaclass=SingletonMeta):
+    """Скользящее окно задержек успешных ответов каждого провайдера.
+
+    Учитываются и ответы, которые пришли после победы другого провайдера,
+    иначе медленный хвост не попадал бы в окно и перцентиль занижался бы.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, source: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(source)
+            if samples is None:
+                samples = self._samples[source] = deque(maxlen=self._window)
+            samples.append(seconds)
+
+    def percentile(self, source: str, q: float) -> Optional[float]:
+        """q-перцентиль задержки (0 < q ≤ 1) или None, пока отметок мало."""
+        with self._lock:
+            samples = sorted(self._samples.get(source, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+def is_valid(rates: Any, pairs: Optional[FrozenSet[str]] = None) -> bool:
+    """Ответ годится, если он непустой, все курсы — положительные числа и,
+    при заданных pairs, в нём есть каждая из этих пар.
+    """
+    return (
+        isinstance(rates, dict)
+        and bool(rates)
+        and (pairs is None or pairs <= rates.keys())
+        and all(
+            isinstance(data.get("rate"), (int, float)) and data["rate"] > 0
+            for data in rates.values()
+        )
+    )
+
+
+class HedgedFetcher:
+    """Запрос курсов к основному провайдеру с подстраховкой запасными.
+
+    Сначала запрашивается основной провайдер (при кворуме — первые quorum
+    провайдеров). Если ответа нет дольше перцентиля его обычной задержки,
+    запрос дублируется следующему провайдеру; ошибка или некорректный ответ
+    сразу передают очередь следующему. При quorum=1 побеждает первый
+    корректный ответ, иначе курс каждой пары — медиана по первым quorum
+    ответам. Источник результата записывается в meta["source"].
+
+    Ответ должен покрывать пары основного провайдера (его pairs()), а в
+    результат попадают только они: запасной с другим набором пар не
+    подменит курсы основного своими.
+    """
+
+    def __init__(
+            self,
+            providers: Sequence[Provider],
+            percentile: float = 0.95,
+            default_delay: float = 1.0,
+            min_delay: float = 0.01,
+            quorum: int = 1,
+        ):
+        if not providers:
+            raise ValueError("Нужен хотя бы один провайдер")
+        if not 1 <= quorum <= len(providers):
+            raise ValueError(f"quorum должен быть от 1 до {len(providers)}")
+        self.providers = list(providers)
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.quorum = quorum
+        self.pairs = self.providers[0][1].pairs()
+
+    def hedge_delay(self) -> float:
+        """Сколько ждать основного провайдера, прежде чем дублировать запрос."""
+        observed = LatencyTracker().percentile(self.providers[0][0], self.percentile)
+        if observed is None:
+            return self.default_delay
+        return max(self.min_delay, observed)
+
+    def fetch(self) -> Rates:
+        queue = list(self.providers)
+        pending: Dict[Future, str] = {}
+        answers: List[Tuple[str, Rates]] = []
+        errors: List[str] = []
+        pool = ThreadPoolExecutor(
+            max_workers=len(self.providers), thread_name_prefix="rates-hedge"
+        )
+
+        def launch() -> None:
+            name, client = queue.pop(0)
+            future = pool.submit(_timed_fetch, client)
+            future.add_done_callback(lambda f, name=name: _observe(name, f))
+            pending[future] = name
+
+        try:
+            for _ in range(self.quorum):
+                launch()
+            while pending and len(answers) < self.quorum:
+                done, _ = wait(
+                    pending,
+                    timeout=self.hedge_delay() if queue else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    name = queue[0][0]
+                    logger.info(f"Hedging rates request to {name}")
+                    launch()
+                    continue
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        rates, _ = future.result()
+                    except Exception as e:
+                        errors.append(f"{name}: {e}")
+                        rates = None
+                    if is_valid(rates, self.pairs):
+                        answers.append((name, rates))
+                        continue
+                    if rates is not None:
+                        errors.append(f"{name}: некорректный ответ")
+                    if queue:
+                        launch()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if len(answers) < self.quorum:
+            raise ApiRequestError(
+                f"получено {len(answers)} из {self.quorum} ответов "
+                f"({'; '.join(errors) or 'нет ответа'})"
+            )
+        launched = len(self.providers) - len(queue)
+        return self._combine(answers[:self.quorum], hedged=launched > self.quorum)
+
+    def _combine(self, answers: List[Tuple[str, Rates]], hedged: bool) -> Rates:
+        if len(answers) == 1:
+            name, rates = answers[0]
+            return {
+                pair: {
+                    "rate": data["rate"],
+                    "meta": {**data.get("meta", {}), "source": name, "hedged": hedged},
+                }
+                for pair, data in rates.items()
+                if pair in self.pairs
+            }
+        combined: Rates = {}
+        for pair in sorted(self.pairs):
+            quotes = {
+                name: rates[pair]["rate"] for name, rates in answers if pair in rates
+            }
+            if len(quotes) < self.quorum:
+                logger.warning(
+                    f"Pair {pair} skipped: {len(quotes)} of {self.quorum} quotes"
+                )
+                continue
+            combined[pair] = {
+                "rate": statistics.median(quotes.values()),
+                "meta": {
+                    "source": "+".join(quotes),
+                    "aggregation": "median",
+                    "quotes": quotes,
+                    "hedged": hedged,
+                },
+            }
+        return combined
+
+
+def _timed_fetch(client: BaseApiClient) -> Tuple[Rates, float]:
+    start = time.perf_counter()
+    rates = client.fetch_rates()
+    return rates, time.perf_counter() - start
+
+
+def _observe(name: str, future: Future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    rates, elapsed = future.result()
+    if is_valid(rates):
+        LatencyTracker().observe(name, elapsed)
+
+
+def build_secondaries(config: ParserConfig) -> Dict[str, List[Provider]]:
+    """Запасные провайдеры из config.SECONDARY_PROVIDERS для RatesUpdater.
+
+    Запасной должен отдавать все пары основного, иначе он не может его
+    подстраховать и отклоняется при сборке.
+    """
+    secondaries: Dict[str, List[Provider]] = {}
+    for primary, names in config.SECONDARY_PROVIDERS.items():
+        expected = _provider_client(primary, config).pairs()
+        providers = []
+        for name in names:
+            client = _provider_client(name, config)
+            missing = expected - client.pairs()
+            if missing:
+                raise ValueError(
+                    f"Провайдер {name} не отдаёт пары {primary}: "
+                    f"{', '.join(sorted(missing))}"
+                )
+            providers.append((name, client))
+        secondaries[primary] = providers
+    return secondaries
+
+
+def _provider_client(name: str, config: ParserConfig) -> BaseApiClient:
+    factory = PROVIDER_CLIENTS.get(name)
+    if factory is None:
+        raise ValueError(f"Неизвестный провайдер курсов: {name}")
+    return factory(config)
@@ -0,0 +1,201 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..metrics import MetricsRegistry
+from .storage import Storage
+
+logger = logging.getLogger("ValutaTrade.Parser")
+
+# Признак остановки в очереди: всё, что поставлено до него, будет записано
+_STOP = object()
+
+_writers: Dict[str, 'HistoryWriter'] = {}
+_writers_lock = threading.Lock()
+
+
+class HistoryWriter:
+    """Фоновая запись истории курсов (write-behind).
+
+    RatesUpdater публикует курсы в rates.json сразу, а записи истории
+    передаёт сюда. Поток записи собирает несколько обновлений в пакет
+    (до batch_size записей или linger секунд ожидания) и дописывает их
+    одним append_history — одна перезапись файла вместо нескольких.
+    Очередь ограничена max_pending обновлениями: если запись не успевает,
+    submit блокируется (обратное давление), а не копит записи в памяти.
+    Пакет, который не удалось записать, повторяется со следующим, но
+    удерживается не больше max_retained записей: при долгом сбое (диск
+    заполнен, нет прав) самые старые отбрасываются с ошибкой в логе и
+    метрике. При завершении процесса очередь дописывается до конца.
+    """
+
+    def __init__(
+            self,
+            storage: Storage,
+            max_pending: int = 16,
+            batch_size: int = 5000,
+            linger: float = 0.5,
+            max_retained: int = 50000,
+        ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retained = max_retained
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        # пакет, который не удалось записать, повторяется со следующим
+        self._failed: List[Dict[str, Any]] = []
+
+    def submit(self, records: List[Dict[str, Any]]) -> None:
+        """Ставит записи в очередь; ждёт, только если очередь заполнена."""
+        self._ensure_started()
+        start = time.perf_counter()
+        self._queue.put(list(records))
+        MetricsRegistry().histogram(
+            "valutatrade_history_submit_wait_seconds",
+            "Ожидание места в очереди фоновой записи истории",
+        ).observe(time.perf_counter() - start)
+
+    def flush(self) -> None:
+        """Ждёт, пока поставленные в очередь записи будут обработаны."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Дописывает очередь и останавливает поток записи."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="history-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            taken = 0
+            item = self._queue.get()
+            deadline = time.monotonic() + self.linger
+            while True:
+                taken += 1
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.extend(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+            if stopping:
+                # поставленное до остановки дописывается без ожидания
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is not _STOP:
+                        batch.extend(item)
+            self._write(batch, final=stopping)
+            for _ in range(taken):
+                self._queue.task_done()
+
+    def _write(self, batch: List[Dict[str, Any]], final: bool) -> None:
+        batch = self._failed + batch
+        self._failed = []
+        if not batch:
+            return
+        metrics = MetricsRegistry()
+        start = time.perf_counter()
+        try:
+            self.storage.append_history(batch)
+        except Exception as e:
+            metrics.counter(
+                "valutatrade_history_write_errors_total",
+                "Неудачные фоновые записи истории курсов",
+            ).inc()
+            if final:
+                self._drop(len(batch))
+                logger.error(
+                    f"History write failed, {len(batch)} records lost: {e}"
+                )
+            else:
+                logger.error(f"History write failed, will retry: {e}")
+                excess = len(batch) - self.max_retained
+                if excess > 0:
+                    self._drop(excess)
+                    logger.error(
+                        f"History retry buffer full ({self.max_retained} records), "
+                        f"{excess} oldest records dropped"
+                    )
+                    batch = batch[excess:]
+                self._failed = batch
+            return
+        metrics.histogram(
+            "valutatrade_history_write_duration_seconds",
+            "Длительность фоновой записи пакета истории курсов",
+        ).observe(time.perf_counter() - start)
+        metrics.counter(
+            "valutatrade_history_records_written_total",
+            "Записи истории курсов, сохранённые фоновой записью",
+        ).inc(len(batch))
+
+    @staticmethod
+    def _drop(count: int) -> None:
+        MetricsRegistry().counter(
+            "valutatrade_history_records_dropped_total",
+            "Записи истории курсов, отброшенные после неудачных записей",
+        ).inc(count)
+
+
+def get_history_writer(storage: Storage) -> HistoryWriter:
+    """Общий для процесса писатель файла истории storage."""
+    config = storage.config
+    with _writers_lock:
+        writer = _writers.get(storage.history_path)
+        if writer is None:
+            writer = _writers[storage.history_path] = HistoryWriter(
+                storage,
+                max_pending=config.HISTORY_QUEUE_SIZE,
+                batch_size=config.HISTORY_BATCH_SIZE,
+                linger=config.HISTORY_LINGER,
+                max_retained=config.HISTORY_MAX_RETAINED,
+            )
+        return writer
+
+
+def flush_history_writers() -> None:
+    """Ждёт записи всей поставленной в очередь истории."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def shutdown_history_writers() -> None:
+    """Дописывает очереди и останавливает потоки записи истории."""
+    while True:
+        with _writers_lock:
+            if not _writers:
+                return
+            _, writer = _writers.popitem()
+        writer.close()
+
+
+atexit.register(shutdown_history_writers)
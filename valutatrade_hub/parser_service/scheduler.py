@@ -2,13 +2,14 @@ import logging
 import time
 
 from .config import ParserConfig
+from .hedging import build_secondaries
 from .updater import RatesUpdater
 
 logger = logging.getLogger("ValutaTrade")
 
 class RateScheduler:
     def __init__(self, config: ParserConfig, interval_seconds: int = 3600):
-        self.updater = RatesUpdater(config)
+        self.updater = RatesUpdater(config, secondaries=build_secondaries(config))
         self.interval = interval_seconds
 
     def start(self):
@@ -2,8 +2,11 @@ import json
 import os
 import tempfile
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
+from ..infra.history_file import read_history, rewrite_history
+from ..infra.locks import LockManager
+from ..infra.rate_index import RateHistoryIndex
 from .config import ParserConfig
 
 
@@ -12,6 +15,7 @@ class Storage:
         self.config = config
         self.rates_path = config.RATES_FILE_PATH
         self.history_path = config.HISTORY_FILE_PATH
+        self.index = RateHistoryIndex(self.history_path)
         os.makedirs(os.path.dirname(self.rates_path), exist_ok=True)
 
     def save_rates(self, pairs: Dict[str, Dict[str, Any]]):
@@ -22,18 +26,27 @@ class Storage:
         self._atomic_write(self.rates_path, data)
 
     def append_history(self, records: List[Dict[str, Any]]):
-        existing = self._load_json(self.history_path, default=[])
-        new_ids = {r["id"] for r in records}
-        filtered_existing = [e for e in existing if e["id"] not in new_ids]
-        updated = filtered_existing + records
-        self._atomic_write(self.history_path, updated)
-
-    def _load_json(self, path: str, default: Any = None):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return default
+        """Дописывает записи в историю, заменяя записи с теми же id.
+
+        Метаданные получения пишутся один раз в таблицу пакетов, строки
+        истории ссылаются на пакет (формат — в infra/history_file).
+        История переписывается потоком: в памяти находятся только новые
+        записи и одна читаемая, а не весь файл. Индекс по времени
+        обновляется под той же блокировкой.
+        """
+        dir_path, file_name = os.path.split(self.history_path)
+        os.makedirs(dir_path, exist_ok=True)
+        with LockManager().file_lock(dir_path, file_name):
+            index_current = self.index.is_current()
+            rewrite_history(self.history_path, records)
+            if index_current:
+                self.index.add(records)
+            else:
+                self.index.rebuild()
+
+    def iter_history(self) -> Iterator[Dict[str, Any]]:
+        """Записи истории по одной в полном виде (и прежнего формата)."""
+        return read_history(self.history_path)
 
     def _atomic_write(self, path: str, data: Any):
         dir_path = os.path.dirname(path)
@@ -1,22 +1,40 @@
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from .api_clients import CoinGeckoClient, ExchangeRateApiClient
+from ..metrics import MetricsRegistry
+from .api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient
 from .config import ParserConfig
+from .hedging import HedgedFetcher, Provider
+from .history_writer import get_history_writer
 from .storage import Storage
 
 logger = logging.getLogger("ValutaTrade.Parser")
 
+# Слушатель получает записанные пары {pair: {"rate", "updated_at", "source"}}
+RatesListener = Callable[[Dict[str, Dict[str, Any]]], Any]
+
 class RatesUpdater:
-    def __init__(self, config: ParserConfig):
+    def __init__(
+            self,
+            config: ParserConfig,
+            listeners: Optional[List[RatesListener]] = None,
+            secondaries: Optional[Dict[str, List[Provider]]] = None,
+        ):
+        self.config = config
         self.cg_client = CoinGeckoClient(config)
         self.er_client = ExchangeRateApiClient(config)
         self.storage = Storage(config)
+        self.history_writer = get_history_writer(self.storage)
         self.clients = {"CoinGecko": self.cg_client, "ExchangeRate-API": self.er_client}
+        self.listeners: List[RatesListener] = list(listeners or [])
+        # Запасные провайдеры по имени основного: {"CoinGecko": [(имя, клиент)]}
+        self.secondaries: Dict[str, List[Provider]] = dict(secondaries or {})
 
     def run_update(self, sources: Optional[List[str]] = None) -> int:
         logger.info("Starting rates update...")
+        update_start = time.perf_counter()
         all_rates: Dict[str, Dict[str, Any]] = {}
         all_records: List[Dict[str, Any]] = []
         timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
@@ -26,8 +44,15 @@ class RatesUpdater:
             cleaned_source_name = source_name.lower().replace("-", "").replace(" ", "")
             if source_filters and cleaned_source_name not in source_filters:
                 continue
+            metrics = MetricsRegistry()
+            start = time.perf_counter()
             try:
-                client_rates = client.fetch_rates()
+                client_rates = self._fetch(source_name, client)
+                metrics.histogram(
+                    "valutatrade_provider_fetch_duration_seconds",
+                    "Длительность запроса курсов к провайдеру",
+                    source=source_name,
+                ).observe(time.perf_counter() - start)
                 logger.info(
                     f"Fetching from {source_name}... OK ({len(client_rates)} rates)"
                 )
@@ -39,23 +64,62 @@ class RatesUpdater:
                         "to_currency": to_cur,
                         "rate": data["rate"],
                         "timestamp": timestamp,
-                        "source": source_name,
+                        "source": data["meta"].get("source", source_name),
                         "meta": data["meta"]
                     }
                     all_records.append(record)
                     all_rates[pair] = {
                         "rate": data["rate"],
                         "updated_at": timestamp,
-                        "source": source_name
+                        "source": record["source"]
                     }
             except Exception:
+                metrics.counter(
+                    "valutatrade_provider_fetch_errors_total",
+                    "Неудачные запросы курсов к провайдеру",
+                    source=source_name,
+                ).inc()
                 logger.error(f"Failed to fetch from {source_name}: Network error.")
                 continue
 
         if all_rates:
-            self.storage.append_history(all_records)
+            # курсы публикуются сразу, история дописывается в фоне
             self.storage.save_rates(all_rates)
             logger.info(f"Writing {len(all_rates)} rates to data/rates.json...")
+            self.history_writer.submit(all_records)
+            self._notify(all_rates)
 
+        MetricsRegistry().histogram(
+            "valutatrade_rates_update_duration_seconds",
+            "Длительность полного обновления курсов",
+        ).observe(time.perf_counter() - update_start)
         total = len(all_rates)
         return total
+
+    def _fetch(
+            self,
+            source_name: str,
+            client: BaseApiClient,
+        ) -> Dict[str, Dict[str, Any]]:
+        """Курсы источника; при заданных запасных — хеджированный запрос."""
+        secondaries = self.secondaries.get(source_name)
+        if not secondaries:
+            return client.fetch_rates()
+        providers = [(source_name, client)] + list(secondaries)
+        fetcher = HedgedFetcher(
+            providers,
+            percentile=self.config.HEDGE_PERCENTILE,
+            default_delay=self.config.HEDGE_DEFAULT_DELAY,
+            min_delay=self.config.HEDGE_MIN_DELAY,
+            quorum=min(self.config.QUORUM, len(providers)),
+        )
+        return fetcher.fetch()
+
+    def _notify(self, rates: Dict[str, Dict[str, Any]]) -> None:
+        """Вызов слушателей после записи курсов; их ошибки не срывают обновление."""
+        for listener in self.listeners:
+            try:
+                listener(rates)
+            except Exception as e:
+                name = getattr(listener, "__name__", repr(listener))
+                logger.error(f"Rates listener {name} failed: {e}")
@@ -0,0 +1,189 @@
+import http.client
+import json
+import select
+import socket
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+# Методы без побочных эффектов: их можно повторить после обрыва соединения
+IDEMPOTENT_METHODS = frozenset({"get_rate", "show_portfolio"})
+
+
+class ServiceError(ValueError):
+    """Ошибка, возвращённая сервисом (или недоступность сервиса)."""
+
+    def __init__(self, error_type: str, message: str):
+        self.error_type = error_type
+        super().__init__(message)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._unix_path)
+
+
+def _closed_by_peer(sock: Optional[socket.socket]) -> bool:
+    """Соединение закрыто другой стороной (EOF ждёт в сокете)."""
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except OSError:
+        return True
+
+
+class ServiceClient:
+    """Тонкий клиент сервиса с интерфейсом use case.
+
+    Методы повторяют сигнатуры register/login/show_portfolio/buy/sell/get_rate
+    из core.usecases, поэтому CLI вызывает их одинаково в обоих режимах.
+    Сессия хранится на сервере, клиент держит только токен.
+    Адрес: http://host:port или unix:/path/to/socket.
+    """
+
+    def __init__(self, address: str, timeout: float = 30.0):
+        self.address = address
+        self.timeout = timeout
+        self._token: Optional[str] = None
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is not None and _closed_by_peer(self._conn.sock):
+            # сервер закрыл простаивавшее соединение (например, перезапуск) —
+            # переподключаемся до отправки, а не повтором после неё
+            self.close()
+        if self._conn is None:
+            if self.address.startswith("unix:"):
+                self._conn = _UnixHTTPConnection(self.address[5:], self.timeout)
+            else:
+                host = self.address.removeprefix("http://").rstrip("/")
+                self._conn = http.client.HTTPConnection(host, timeout=self.timeout)
+        return self._conn
+
+    def _request(
+            self,
+            method: str,
+            path: str,
+            body: Optional[bytes] = None,
+            idempotent: bool = False,
+        ) -> Any:
+        """Запрос с одним повтором после обрыва keep-alive соединения.
+
+        Обрыв при ожидании ответа (RemoteDisconnected) не говорит, выполнил
+        ли сервер запрос, поэтому повторяются только идемпотентные запросы.
+        Остальные повторяются, лишь если запрос не удалось отправить по
+        переиспользованному соединению (сервер закрыл его раньше).
+        """
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            reused = self._conn is not None and self._conn.sock is not None
+            conn = self._connection()
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+                payload = json.loads(response.read() or b"{}")
+                break
+            except (
+                    http.client.RemoteDisconnected,
+                    BrokenPipeError,
+                    ConnectionResetError,
+                ) as e:
+                self.close()
+                if attempt or not (idempotent or (reused and not sent)):
+                    raise self._unavailable(e)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self.close()
+                raise self._unavailable(e)
+        if not payload.get("ok"):
+            error = payload.get("error", {})
+            raise ServiceError(
+                error.get("type", "ServiceError"),
+                error.get("message", f"HTTP {response.status}"),
+            )
+        return payload["result"]
+
+    def call(self, method: str, **params: Any) -> Any:
+        body = json.dumps(params, ensure_ascii=False).encode("utf-8")
+        return self._request(
+            "POST", f"/api/{method}", body, idempotent=method in IDEMPOTENT_METHODS
+        )
+
+    def _unavailable(self, error: Exception) -> ServiceError:
+        return ServiceError(
+            "ServiceUnavailable", f"Сервис {self.address} недоступен: {error}"
+        )
+
+    def health(self) -> bool:
+        return self._request("GET", "/health", idempotent=True)["status"] == "ok"
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def register(self, username: str, password: str) -> int:
+        return self.call("register", username=username, password=password)["user_id"]
+
+    def login(self, username: str, password: str) -> int:
+        result = self.call("login", username=username, password=password)
+        self._token = result["token"]
+        return result["user_id"]
+
+    def open_session(self, user_id: int) -> None:
+        """Сессия живёт на сервере; локального состояния нет."""
+        return None
+
+    def show_portfolio(
+            self,
+            user_id: int,
+            base: str = "USD",
+            session: Any = None,
+        ) -> str:
+        return self.call("show_portfolio", token=self._token, base=base)["message"]
+
+    def buy(
+            self,
+            user_id: int,
+            currency: str,
+            amount: float,
+            verbose: bool = False,
+            session: Any = None,
+        ) -> str:
+        return self.call(
+            "buy", token=self._token, currency=currency, amount=amount,
+            verbose=verbose,
+        )["message"]
+
+    def sell(
+            self,
+            user_id: int,
+            currency: str,
+            amount: float,
+            verbose: bool = False,
+            session: Any = None,
+        ) -> str:
+        return self.call(
+            "sell", token=self._token, currency=currency, amount=amount,
+            verbose=verbose,
+        )["message"]
+
+    def get_rate(
+            self,
+            from_cur: str,
+            to_cur: str = "USD",
+            at: Optional[datetime] = None,
+        ) -> Tuple[float, str]:
+        params = {"from": from_cur, "to": to_cur}
+        if at is not None:
+            params["at"] = at.strftime("%Y-%m-%dT%H:%M:%S")
+        result = self.call("get_rate", **params)
+        return result["rate"], result["updated_at"]
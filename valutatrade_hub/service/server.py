@@ -0,0 +1,299 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..core import usecases
+from ..core.currencies import get_currency
+from ..core.session import UserSession
+from ..core.utils import parse_datetime
+
+logger = logging.getLogger("ValutaTrade.Service")
+
+MAX_BODY_BYTES = 64 * 1024
+API_PREFIX = "/api/"
+
+
+class AuthorizationError(ValueError):
+    def __init__(self):
+        super().__init__("Требуется вход: выполните login")
+
+
+class ServiceApp:
+    """Методы API поверх use case с «горячим» состоянием в памяти.
+
+    Настройки, реестр валют и снимок курсов загружаются один раз при старте;
+    сессии вошедших пользователей (UserSession) живут между запросами и
+    разделяются всеми токенами одного пользователя.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, int] = {}
+        self._sessions: Dict[int, UserSession] = {}
+        self.methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "register": self.register,
+            "login": self.login,
+            "logout": self.logout,
+            "show_portfolio": self.show_portfolio,
+            "buy": self.buy,
+            "sell": self.sell,
+            "get_rate": self.get_rate,
+        }
+
+    def warm_up(self) -> None:
+        """Загрузка настроек, валют и курсов до первого запроса."""
+        usecases.get_db()
+        get_currency("USD")
+        usecases.get_rates_snapshot()
+
+    def call(self, method: str, params: Dict[str, Any]) -> Any:
+        return self.methods[method](params)
+
+    def register(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = usecases.register(
+            _require(params, "username"), _require(params, "password")
+        )
+        return {"user_id": user_id}
+
+    def login(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = usecases.login(
+            _require(params, "username"), _require(params, "password")
+        )
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._sessions[user_id] = usecases.open_session(user_id)
+        token = secrets.token_urlsafe(24)
+        self._tokens[token] = user_id
+        return {"user_id": user_id, "username": session.user.username, "token": token}
+
+    def logout(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = self._tokens.pop(_require(params, "token"), None)
+        if user_id is not None and user_id not in self._tokens.values():
+            self._sessions.pop(user_id, None)
+        return {"logged_out": user_id is not None}
+
+    def show_portfolio(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        session = self._session(params)
+        message = usecases.show_portfolio(
+            session.user_id, params.get("base", "USD").upper(), session=session
+        )
+        return {"message": message}
+
+    def buy(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        session = self._session(params)
+        message = usecases.buy(
+            session.user_id,
+            _require(params, "currency"),
+            _amount(params),
+            verbose=bool(params.get("verbose", False)),
+            session=session,
+        )
+        return {"message": message}
+
+    def sell(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        session = self._session(params)
+        message = usecases.sell(
+            session.user_id,
+            _require(params, "currency"),
+            _amount(params),
+            verbose=bool(params.get("verbose", False)),
+            session=session,
+        )
+        return {"message": message}
+
+    def get_rate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        at = params.get("at")
+        rate, updated_at = usecases.get_rate(
+            params.get("from", "USD"),
+            _require(params, "to"),
+            at=parse_datetime(at) if at else None,
+        )
+        return {"rate": rate, "updated_at": updated_at}
+
+    def _session(self, params: Dict[str, Any]) -> UserSession:
+        user_id = self._tokens.get(params.get("token") or "")
+        if user_id is None:
+            raise AuthorizationError()
+        return self._sessions[user_id]
+
+
+def _require(params: Dict[str, Any], key: str) -> Any:
+    value = params.get(key)
+    if value in (None, ""):
+        raise ValueError(f"Не передан параметр '{key}'")
+    return value
+
+
+def _amount(params: Dict[str, Any]) -> float:
+    try:
+        return float(_require(params, "amount"))
+    except (TypeError, ValueError):
+        raise ValueError("'amount' должен быть положительным числом")
+
+
+class ServiceServer:
+    """HTTP/1.1 (keep-alive) с JSON поверх TCP localhost или Unix-сокета.
+
+    Цикл запросов работает в asyncio, use case выполняются в пуле потоков.
+    По умолчанию поток один: запросы к файлам данных идут последовательно.
+    """
+
+    def __init__(self, app: ServiceApp, workers: int = 1):
+        self.app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="service-worker"
+        )
+
+    async def handle_connection(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter,
+        ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, _error(
+                        "BadRequest", "Malformed request line"
+                    ), keep_alive=False)
+                    break
+                headers = await _read_headers(reader)
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        _error("BadRequest", "Body too large"),
+                                        keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # обрыв соединения или некорректные заголовки
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(
+            self,
+            method: str,
+            path: str,
+            body: bytes,
+        ) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"ok": True, "result": {"status": "ok"}}
+        if method != "POST" or not path.startswith(API_PREFIX):
+            return HTTPStatus.NOT_FOUND, _error("NotFound", f"{method} {path}")
+        name = path[len(API_PREFIX):]
+        if name not in self.app.methods:
+            return HTTPStatus.NOT_FOUND, _error("NotFound", f"Unknown method {name}")
+        try:
+            params = json.loads(body or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, _error(
+                "BadRequest", "Body must be a JSON object"
+            )
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self._executor, self.app.call, name, params
+            )
+        except AuthorizationError as e:
+            return HTTPStatus.UNAUTHORIZED, _error(type(e).__name__, str(e))
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, _error(type(e).__name__, str(e))
+        except Exception as e:
+            logger.exception(f"Unhandled error in {name}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, _error(type(e).__name__, str(e))
+        return HTTPStatus.OK, {"ok": True, "result": result}
+
+    async def _respond(
+            self,
+            writer: asyncio.StreamWriter,
+            status: HTTPStatus,
+            payload: Dict[str, Any],
+            keep_alive: bool,
+        ) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def _error(error_type: str, message: str) -> Dict[str, Any]:
+    return {"ok": False, "error": {"type": error_type, "message": message}}
+
+
+async def _serve(
+        server: ServiceServer,
+        host: str,
+        port: int,
+        unix_path: Optional[str],
+    ) -> None:
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.remove(unix_path)
+        listener = await asyncio.start_unix_server(
+            server.handle_connection, path=unix_path
+        )
+        address = f"unix:{unix_path}"
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port)
+        address = f"http://{host}:{port}"
+    logger.info(f"Service listening on {address}")
+    print(f"Сервис запущен: {address} (Ctrl+C для остановки)")
+    async with listener:
+        await listener.serve_forever()
+
+
+def serve(
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_path: Optional[str] = None,
+        workers: int = 1,
+    ) -> None:
+    """Запуск сервиса до Ctrl+C."""
+    app = ServiceApp()
+    app.warm_up()
+    server = ServiceServer(app, workers)
+    try:
+        asyncio.run(_serve(server, host, port, unix_path))
+    except KeyboardInterrupt:
+        print("\nСервис остановлен.")
+    finally:
+        server.close()
+        if unix_path and os.path.exists(unix_path):
+            os.remove(unix_path)